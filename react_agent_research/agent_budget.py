@@ -0,0 +1,323 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#   "langchain>=0.1.0",
+# ]
+# ///
+
+"""
+Agent Budget
+Step-budget controller for the ReAct loop. BudgetedAgentExecutor is an
+AgentExecutor that, between steps, checks a StepBudget: step count,
+wall-clock deadline, cumulative LLM tokens, repeated identical actions and
+(opt-in) confidence in the last observation. When a limit is hit it stops the
+loop and produces a final answer itself; every run reports why it stopped.
+"""
+
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from langchain.agents import AgentExecutor
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.outputs import LLMResult
+from langchain_core.utils.input import get_color_mapping
+from pydantic import Field
+
+# Why a run stopped
+STOP_FINAL_ANSWER = "final_answer"
+STOP_TOOL_RETURN = "tool_return"
+STOP_MAX_ITERATIONS = "max_iterations"
+STOP_DEADLINE = "deadline"
+STOP_TOKEN_BUDGET = "token_budget"
+STOP_REPEATED_ACTION = "repeated_action"
+STOP_CONFIDENT = "confident_observation"
+
+_STOP_DESCRIPTIONS = {
+    STOP_MAX_ITERATIONS: "the step limit was reached",
+    STOP_DEADLINE: "the time budget ran out",
+    STOP_TOKEN_BUDGET: "the token budget ran out",
+    STOP_REPEATED_ACTION: "the same action kept being repeated",
+    STOP_CONFIDENT: "the last observation already answers the question",
+}
+
+# Running out of time or tokens must not trigger another LLM call
+_NO_GENERATE = (STOP_DEADLINE, STOP_TOKEN_BUDGET)
+
+# (action, observation) pairs, as AgentExecutor keeps them
+Step = Tuple[AgentAction, Any]
+
+# Tool results that report a failure rather than data: the prefixes the tools in
+# react_agent_tools.py put on their error messages ("Search error: ...", "Error: ...")
+ERROR_OBSERVATION = re.compile(
+    r"(?:Error|(?:Search|Analysis|File analysis|Directory analysis|File system|Read|Write|Calculation"
+    r"|Python execution|API request|Request|Database) error):"
+)
+
+# Tools whose successful output is a definitive value rather than material to reason over
+CONFIDENT_TOOLS = ("calculator",)
+
+_GENERATE_PROMPT = """Question: {question}
+
+Steps taken so far:
+{transcript}
+
+You must stop using tools now because {reason}. Give the best final answer you can from the observations above."""
+
+
+def observation_confidence(action: AgentAction, observation: Any) -> float:
+    """Heuristic confidence that an observation settles the question
+
+    0 for error observations, 1 for a value from a deterministic tool
+    (CONFIDENT_TOOLS), 0.5 otherwise.
+    """
+    text = str(observation)
+    if ERROR_OBSERVATION.match(text):
+        return 0.0
+    return 1.0 if action.tool in CONFIDENT_TOOLS else 0.5
+
+
+def token_usage(response: LLMResult) -> Tuple[int, int]:
+    """(input, output) tokens reported for one LLM call; (0, 0) when the provider reports none"""
+    input_tokens = output_tokens = 0
+    reported = False
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+                reported = True
+    if not reported:
+        # Older integrations only report usage in llm_output
+        llm_output = response.llm_output or {}
+        usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+        input_tokens = usage.get("prompt_tokens", usage.get("input_tokens", 0)) or 0
+        output_tokens = usage.get("completion_tokens", usage.get("output_tokens", 0)) or 0
+    return input_tokens, output_tokens
+
+
+class UsageCollector(BaseCallbackHandler):
+    """Adds up LLM calls and token usage for one run"""
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> Any:
+        input_tokens, output_tokens = token_usage(response)
+        with self._lock:
+            self.llm_calls += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+
+
+@dataclass
+class StepBudget:
+    """Limits for one agent run; None disables a limit
+
+    ``max_repeats``: stop once the same tool has been called with the same
+    input in this many steps (identical calls within one step count once).
+    ``confidence_threshold``: stop once
+    ``confidence(action, observation)`` for the latest step reaches it.
+    """
+    max_iterations: int = 10
+    max_seconds: Optional[float] = None
+    max_tokens: Optional[int] = None
+    max_repeats: Optional[int] = None
+    confidence_threshold: Optional[float] = None
+    confidence: Callable[[AgentAction, Any], float] = observation_confidence
+
+
+@dataclass
+class RunReport:
+    """How a run ended; ``forced`` means the controller, not the agent, produced the answer"""
+    stop_reason: str
+    iterations: int
+    elapsed: float
+    llm_calls: int
+    tokens: int
+    forced: bool
+
+    def format(self) -> str:
+        text = (f"Stopped: {self.stop_reason} after {self.iterations} steps, {self.elapsed:.1f}s, "
+                f"{self.llm_calls} LLM calls, {self.tokens} tokens")
+        return text + (" (final answer produced by the budget controller)" if self.forced else "")
+
+
+class _RunBudget:
+    """Per-run counters checked between steps"""
+
+    def __init__(self, budget: StepBudget, run_manager: Any):
+        self.budget = budget
+        self.start = time.monotonic()
+        self.iterations = 0
+        self.usage = UsageCollector()
+        self.actions: Dict[Tuple[str, str], int] = {}
+        if run_manager is not None:
+            # Inherited by the child managers handed to the agent's LLM calls
+            run_manager.inheritable_handlers.append(self.usage)
+
+    def record(self, steps: List[Step]) -> Optional[str]:
+        """Account for the steps just taken; returns a stop reason they trigger"""
+        budget = self.budget
+        self.iterations += 1
+        reason = None
+        for key in {(action.tool, str(action.tool_input)) for action, _ in steps}:
+            self.actions[key] = self.actions.get(key, 0) + 1
+            if budget.max_repeats and self.actions[key] >= budget.max_repeats:
+                reason = STOP_REPEATED_ACTION
+        if (reason is None and budget.confidence_threshold is not None and steps
+                and budget.confidence(*steps[-1]) >= budget.confidence_threshold):
+            reason = STOP_CONFIDENT
+        return reason
+
+    def exhausted(self) -> Optional[str]:
+        """Reason the budget allows no further step, if any"""
+        budget = self.budget
+        if self.iterations >= budget.max_iterations:
+            return STOP_MAX_ITERATIONS
+        if budget.max_seconds is not None and time.monotonic() - self.start >= budget.max_seconds:
+            return STOP_DEADLINE
+        if budget.max_tokens is not None and self.usage.total_tokens >= budget.max_tokens:
+            return STOP_TOKEN_BUDGET
+        return None
+
+    def report(self, reason: str, forced: bool) -> RunReport:
+        return RunReport(
+            stop_reason=reason,
+            iterations=self.iterations,
+            elapsed=time.monotonic() - self.start,
+            llm_calls=self.usage.llm_calls,
+            tokens=self.usage.total_tokens,
+            forced=forced,
+        )
+
+
+class BudgetedAgentExecutor(AgentExecutor):
+    """AgentExecutor whose loop is bounded by a StepBudget
+
+    The output gains ``stop_reason`` and ``run_report``. When the budget stops
+    the loop early, the final answer is generated by ``final_answer_llm``
+    from the steps so far, except after a deadline or token-budget stop (or
+    without an LLM), where the last observation is returned as is. Budgets
+    are checked between steps, so one slow step can overrun the deadline.
+    """
+
+    budget: StepBudget = Field(default_factory=StepBudget)
+    final_answer_llm: Optional[Any] = None
+
+    # AgentExecutor streams through its own step iterator, which knows nothing
+    # of the budget. Run the budgeted loop instead; step and token events still
+    # arrive through callbacks (astream_events()), the output comes once at the end.
+    def stream(self, input: Dict[str, Any], config: Optional[Dict[str, Any]] = None,
+               **kwargs: Any) -> Iterator[Dict[str, Any]]:
+        yield self.invoke(input, config, **kwargs)
+
+    async def astream(self, input: Dict[str, Any], config: Optional[Dict[str, Any]] = None,
+                      **kwargs: Any) -> AsyncIterator[Dict[str, Any]]:
+        yield await self.ainvoke(input, config, **kwargs)
+
+    def _prepare(self, run_manager: Any) -> Tuple[Dict[str, Any], Dict[str, str], List, _RunBudget]:
+        name_to_tool_map = {tool.name: tool for tool in self.tools}
+        color_mapping = get_color_mapping([tool.name for tool in self.tools], excluded_colors=["green", "red"])
+        return name_to_tool_map, color_mapping, [], _RunBudget(self.budget, run_manager)
+
+    def _finished(self, output: Union[AgentFinish, List[Step]]) -> Optional[Tuple[AgentFinish, str]]:
+        """(finish, reason) if the step output ends the run by itself"""
+        if isinstance(output, AgentFinish):
+            return output, STOP_FINAL_ANSWER
+        if len(output) == 1:
+            tool_return = self._get_tool_return(output[0])
+            if tool_return is not None:
+                return tool_return, STOP_TOOL_RETURN
+        return None
+
+    def _stopped_prompt(self, reason: str, steps: List[Step], inputs: Dict[str, Any]) -> Optional[str]:
+        if self.final_answer_llm is None or reason in _NO_GENERATE or not steps:
+            return None
+        transcript = "\n".join(f"Action: {action.tool}\nAction Input: {action.tool_input}\n"
+                               f"Observation: {str(observation)[:2000]}" for action, observation in steps)
+        return _GENERATE_PROMPT.format(question=inputs.get("input", ""), transcript=transcript,
+                                       reason=_STOP_DESCRIPTIONS[reason])
+
+    @staticmethod
+    def _forced(reason: str, steps: List[Step], answer: Optional[str] = None) -> AgentFinish:
+        if answer is None:
+            answer = f"Stopped before reaching a final answer because {_STOP_DESCRIPTIONS[reason]}."
+            if steps:
+                answer += f" Last observation: {steps[-1][1]}"
+        return AgentFinish({"output": answer}, "")
+
+    def _report(self, output: AgentFinish, steps: List[Step], run_manager: Any, tracker: _RunBudget,
+                reason: str, forced: bool) -> Dict[str, Any]:
+        result = self._return(output, steps, run_manager=run_manager)
+        result["stop_reason"] = reason
+        result["run_report"] = tracker.report(reason, forced)
+        return result
+
+    def _call(self, inputs: Dict[str, str], run_manager: Any = None) -> Dict[str, Any]:
+        name_to_tool_map, color_mapping, steps, tracker = self._prepare(run_manager)
+        while True:
+            reason = tracker.exhausted()
+            if reason:
+                break
+            output = self._take_next_step(name_to_tool_map, color_mapping, inputs, steps, run_manager=run_manager)
+            finished = self._finished(output)
+            if finished:
+                return self._report(finished[0], steps, run_manager, tracker, finished[1], forced=False)
+            steps.extend(output)
+            reason = tracker.record(output)
+            if reason:
+                break
+
+        prompt = self._stopped_prompt(reason, steps, inputs)
+        answer = None
+        if prompt is not None:
+            callbacks = run_manager.get_child() if run_manager else None
+            message = self.final_answer_llm.invoke(prompt, {"callbacks": callbacks})
+            answer = getattr(message, "content", message)
+        return self._report(self._forced(reason, steps, answer), steps, run_manager, tracker, reason, forced=True)
+
+    async def _acall(self, inputs: Dict[str, str], run_manager: Any = None) -> Dict[str, Any]:
+        name_to_tool_map, color_mapping, steps, tracker = self._prepare(run_manager)
+        while True:
+            reason = tracker.exhausted()
+            if reason:
+                break
+            output = await self._atake_next_step(name_to_tool_map, color_mapping, inputs, steps,
+                                                 run_manager=run_manager)
+            finished = self._finished(output)
+            if finished:
+                return await self._areport(finished[0], steps, run_manager, tracker, finished[1], forced=False)
+            steps.extend(output)
+            reason = tracker.record(output)
+            if reason:
+                break
+
+        prompt = self._stopped_prompt(reason, steps, inputs)
+        answer = None
+        if prompt is not None:
+            callbacks = run_manager.get_child() if run_manager else None
+            message = await self.final_answer_llm.ainvoke(prompt, {"callbacks": callbacks})
+            answer = getattr(message, "content", message)
+        return await self._areport(self._forced(reason, steps, answer), steps, run_manager, tracker, reason,
+                                   forced=True)
+
+    async def _areport(self, output: AgentFinish, steps: List[Step], run_manager: Any, tracker: _RunBudget,
+                       reason: str, forced: bool) -> Dict[str, Any]:
+        result = await self._areturn(output, steps, run_manager=run_manager)
+        result["stop_reason"] = reason
+        result["run_report"] = tracker.report(reason, forced)
+        return result
@@ -0,0 +1,182 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#   "langchain-core>=0.2.0",
+# ]
+# ///
+
+"""
+Agent Events
+Typed events for streaming a LangChainReactAgent run: reasoning tokens as the
+LLM produces them, tool actions with their timings and observations, and the
+final answer. Events serialise to dicts or Server-Sent Events frames, and
+from_langchain_events() turns an AgentExecutor.astream_events() stream into them.
+"""
+
+import asyncio
+import json
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+
+@dataclass
+class AgentEvent:
+    """Base class; ``type`` names the event in dicts and SSE frames"""
+    type: str = field(init=False, default="event")
+    step: int = 0
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def to_sse(self) -> str:
+        """Encode as one Server-Sent Events frame"""
+        return f"event: {self.type}\ndata: {json.dumps(self.to_dict(), ensure_ascii=False, default=str)}\n\n"
+
+
+@dataclass
+class ThoughtToken(AgentEvent):
+    """A chunk of LLM output (reasoning, action text or the answer as it is written)"""
+    type: str = field(init=False, default="thought_token")
+    text: str = ""
+
+
+@dataclass
+class ActionStart(AgentEvent):
+    type: str = field(init=False, default="action_start")
+    tool: str = ""
+    tool_input: Any = None
+    call_id: str = ""
+
+
+@dataclass
+class ActionEnd(AgentEvent):
+    type: str = field(init=False, default="action_end")
+    tool: str = ""
+    call_id: str = ""
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class Observation(AgentEvent):
+    """What a tool returned, as the agent will see it"""
+    type: str = field(init=False, default="observation")
+    tool: str = ""
+    call_id: str = ""
+    text: str = ""
+
+
+@dataclass
+class FinalAnswer(AgentEvent):
+    type: str = field(init=False, default="final_answer")
+    text: str = ""
+    elapsed: float = 0.0
+    stop_reason: Optional[str] = None
+
+
+@dataclass
+class AgentError(AgentEvent):
+    type: str = field(init=False, default="error")
+    message: str = ""
+
+
+def _text(value: Any) -> str:
+    """Plain text from a message chunk, message, or string (Anthropic content may be a list of blocks)"""
+    content = getattr(value, "content", value)
+    if isinstance(content, list):
+        return "".join(block.get("text", "") if isinstance(block, dict) else str(block) for block in content)
+    return content if isinstance(content, str) else str(content)
+
+
+async def from_langchain_events(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[AgentEvent]:
+    """Translate ``astream_events(version="v2")`` output of an AgentExecutor into AgentEvents
+
+    Each LLM call starts a new step. Tool timings are measured here with a
+    monotonic clock from the start/end events of each tool run.
+    """
+    start = time.monotonic()
+    step = 0
+    tool_started: Dict[str, float] = {}
+    async for event in events:
+        kind = event["event"]
+        if kind in ("on_chat_model_start", "on_llm_start"):
+            step += 1
+        elif kind in ("on_chat_model_stream", "on_llm_stream"):
+            text = _text(event["data"].get("chunk"))
+            if text:
+                yield ThoughtToken(step=step, text=text)
+        elif kind == "on_tool_start":
+            tool_started[event["run_id"]] = time.monotonic()
+            yield ActionStart(step=step, tool=event["name"], tool_input=event["data"].get("input"),
+                              call_id=event["run_id"])
+        elif kind in ("on_tool_end", "on_tool_error"):
+            elapsed = time.monotonic() - tool_started.pop(event["run_id"], time.monotonic())
+            error = event["data"].get("error") if kind == "on_tool_error" else None
+            yield ActionEnd(step=step, tool=event["name"], call_id=event["run_id"], elapsed=elapsed,
+                            error=str(error) if error is not None else None)
+            if error is None:
+                yield Observation(step=step, tool=event["name"], call_id=event["run_id"],
+                                  text=_text(event["data"].get("output")))
+        elif kind == "on_chain_end" and not event.get("parent_ids"):
+            output = event["data"].get("output")
+            if isinstance(output, dict):
+                yield FinalAnswer(step=step, text=output.get("output", ""), elapsed=time.monotonic() - start,
+                                  stop_reason=output.get("stop_reason"))
+            else:
+                yield FinalAnswer(step=step, text=_text(output), elapsed=time.monotonic() - start)
+
+
+_DONE = object()
+
+
+def iterate_in_thread(make_stream: Callable[[], AsyncIterator[Any]]) -> Iterator[Any]:
+    """Consume an async iterator from synchronous code
+
+    The iterator runs on its own event loop in a background thread; items are
+    handed over through a queue as they arrive. Closing the generator early
+    cancels the background run.
+    """
+    items: "queue.Queue[Any]" = queue.Queue()
+
+    async def pump():
+        async for item in make_stream():
+            items.put(item)
+
+    # Created before the thread starts, so an early close can always cancel the run
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(pump())
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+        except BaseException as e:
+            items.put(e)
+        finally:
+            items.put(_DONE)
+            loop.close()
+
+    thread = threading.Thread(target=run, name="agent-stream", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        if thread.is_alive():
+            try:
+                loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass  # loop already closed
+        thread.join()
@@ -0,0 +1,314 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#   "langchain>=0.1.0",
+# ]
+# ///
+
+"""
+Agent Tracing
+A callback handler that records a timed span for every step of an agent run:
+LLM calls (with model and token counts), tool calls, prompt formatting,
+output parsing and the chains around them. A finished trace prints as a
+flame-style timing report and exports as Chrome trace JSON (open it in
+chrome://tracing or https://ui.perfetto.dev) or as OpenTelemetry OTLP/JSON.
+"""
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid4
+
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from agent_budget import token_usage
+
+# Span kinds; the first four are what the timing report breaks a run down into
+KIND_LLM = "llm"
+KIND_TOOL = "tool"
+KIND_PROMPT = "prompt"
+KIND_PARSER = "parser"
+KIND_CHAIN = "chain"
+
+_REPORTED_KINDS = (KIND_LLM, KIND_TOOL, KIND_PROMPT, KIND_PARSER)
+
+# OTLP SpanKind: model and tool calls are calls out of the agent
+_OTEL_SPAN_KIND = {KIND_LLM: 3, KIND_TOOL: 3}
+_OTEL_INTERNAL = 1
+
+
+@dataclass
+class Span:
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    kind: str
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        """Seconds; 0 for a span that never finished"""
+        return (self.end_ns - self.start_ns) / 1e9 if self.end_ns is not None else 0.0
+
+
+def _span_id(run_id: UUID) -> str:
+    # LangChain run ids are uuid7, whose leading bits are a timestamp; the tail is random
+    return run_id.hex[-16:]
+
+
+def _preview(value: Any, limit: int = 200) -> str:
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, default=str)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class AgentTracer(BaseCallbackHandler):
+    """Records spans from LangChain callbacks
+
+    Pass it in a run's config (``{"callbacks": [tracer]}``) so nested runs
+    inherit it; LangChainReactAgent(tracing=True) does this for every run and
+    keeps the result in ``last_trace``. Handlers run inline on the event
+    loop, so async timings are not skewed by a thread hop.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self.trace_id = uuid4().hex
+        self.spans: Dict[str, Span] = {}
+        self._lock = threading.Lock()
+
+    # --- Recording --------------------------------------------------------
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: str, kind: str, **attributes: Any):
+        span = Span(span_id=_span_id(run_id), parent_id=_span_id(parent_run_id) if parent_run_id else None,
+                    name=name, kind=kind, start_ns=time.time_ns(),
+                    attributes={k: v for k, v in attributes.items() if v is not None})
+        with self._lock:
+            self.spans[span.span_id] = span
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **attributes: Any):
+        with self._lock:
+            span = self.spans.get(_span_id(run_id))
+            if span is None:
+                return
+            span.end_ns = time.time_ns()
+            span.attributes.update({k: v for k, v in attributes.items() if v is not None})
+            if error is not None:
+                span.error = f"{type(error).__name__}: {error}"
+
+    @staticmethod
+    def _name(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any], default: str) -> str:
+        if kwargs.get("name"):
+            return kwargs["name"]
+        serialized = serialized or {}
+        return serialized.get("name") or (serialized.get("id") or [default])[-1]
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, **kwargs: Any) -> Any:
+        # Prompt templates and output parsers report themselves as chains of run_type prompt/parser
+        kind = kwargs.get("run_type") if kwargs.get("run_type") in (KIND_PROMPT, KIND_PARSER) else KIND_CHAIN
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "chain"), kind)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._end(run_id, error)
+
+    def _on_model_start(self, serialized: Dict[str, Any], run_id: UUID, parent_run_id: Optional[UUID],
+                        kwargs: Dict[str, Any]):
+        metadata = kwargs.get("metadata") or {}
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "llm"), KIND_LLM,
+                    **{"gen_ai.system": metadata.get("ls_provider"),
+                       "gen_ai.request.model": metadata.get("ls_model_name"),
+                       "gen_ai.request.temperature": metadata.get("ls_temperature")})
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID,
+                     parent_run_id: Optional[UUID] = None, **kwargs: Any) -> Any:
+        self._on_model_start(serialized, run_id, parent_run_id, kwargs)
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID,
+                            parent_run_id: Optional[UUID] = None, **kwargs: Any) -> Any:
+        self._on_model_start(serialized, run_id, parent_run_id, kwargs)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> Any:
+        input_tokens, output_tokens = token_usage(response)
+        self._end(run_id, **{"gen_ai.usage.input_tokens": input_tokens,
+                             "gen_ai.usage.output_tokens": output_tokens})
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID,
+                      parent_run_id: Optional[UUID] = None, **kwargs: Any) -> Any:
+        self._start(run_id, parent_run_id, self._name(serialized, kwargs, "tool"), KIND_TOOL,
+                    **{"tool.input": _preview(input_str)})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._end(run_id, **{"tool.output": _preview(getattr(output, "content", output))})
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> Any:
+        self._end(run_id, error)
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+
+    # --- Reporting --------------------------------------------------------
+
+    def _snapshot(self) -> List[Span]:
+        """Spans sorted by start; unfinished ones end where the trace ends"""
+        with self._lock:
+            spans = [Span(**vars(span)) for span in self.spans.values()]
+        end = max((span.end_ns or span.start_ns for span in spans), default=0)
+        for span in spans:
+            if span.end_ns is None:
+                span.end_ns = end
+        return sorted(spans, key=lambda span: (span.start_ns, -span.end_ns))
+
+    def breakdown(self) -> Dict[str, Dict[str, Any]]:
+        """Seconds, call count and tokens per span kind; ``other`` is root time not in any of them"""
+        spans = self._snapshot()
+        ids = {span.span_id for span in spans}
+        total = sum(span.duration for span in spans if span.parent_id not in ids)
+        result: Dict[str, Dict[str, Any]] = {}
+        for kind in _REPORTED_KINDS:
+            of_kind = [span for span in spans if span.kind == kind]
+            result[kind] = {"seconds": sum(span.duration for span in of_kind), "calls": len(of_kind)}
+        result[KIND_LLM]["input_tokens"] = sum(span.attributes.get("gen_ai.usage.input_tokens", 0)
+                                               for span in spans if span.kind == KIND_LLM)
+        result[KIND_LLM]["output_tokens"] = sum(span.attributes.get("gen_ai.usage.output_tokens", 0)
+                                                for span in spans if span.kind == KIND_LLM)
+        # Parallel tool calls overlap, so the kinds can add up to more than the run
+        result["other"] = {"seconds": max(total - sum(result[kind]["seconds"] for kind in _REPORTED_KINDS), 0.0)}
+        result["total"] = {"seconds": total}
+        return result
+
+    def format_report(self, width: int = 30, max_lines: int = 60) -> str:
+        """Time breakdown by kind followed by the span tree with proportional bars"""
+        spans = self._snapshot()
+        if not spans:
+            return "No spans recorded"
+        breakdown = self.breakdown()
+        total = breakdown["total"]["seconds"] or 1e-9
+        lines = [f"Agent run: {breakdown['total']['seconds']:.3f}s"]
+        for kind in _REPORTED_KINDS + ("other",):
+            item = breakdown[kind]
+            line = f"  {kind:<7}{item['seconds']:>9.3f}s {item['seconds'] / total:>5.0%}"
+            if "calls" in item:
+                line += f"  {item['calls']} calls"
+            if kind == KIND_LLM:
+                line += f", {item['input_tokens']} in / {item['output_tokens']} out tokens"
+            lines.append(line)
+
+        children: Dict[Optional[str], List[Span]] = {}
+        ids = {span.span_id for span in spans}
+        for span in spans:
+            children.setdefault(span.parent_id if span.parent_id in ids else None, []).append(span)
+        origin = spans[0].start_ns
+        tree: List[str] = []
+
+        def walk(span: Span, depth: int):
+            if len(tree) >= max_lines:
+                return
+            offset = int((span.start_ns - origin) / 1e9 / total * width)
+            bar = " " * offset + "█" * max(1, int(span.duration / total * width))
+            label = ("  " * depth + span.name)[:40]
+            error = "  !" if span.error else ""
+            tree.append(f"{label:<40} {span.duration:>8.3f}s |{bar:<{width + 1}}|{error}")
+            for child in children.get(span.span_id, []):
+                walk(child, depth + 1)
+
+        for root in children.get(None, []):
+            walk(root, 0)
+        if len(tree) >= max_lines:
+            tree.append(f"... ({len(spans) - max_lines} more spans)")
+        return "\n".join(lines + [""] + tree)
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Chrome trace event format; overlapping siblings are put on separate lanes (tids)"""
+        spans = self._snapshot()
+        parents = {span.span_id: span.parent_id for span in spans}
+
+        def is_ancestor(candidate: str, span_id: Optional[str]) -> bool:
+            while span_id is not None:
+                if span_id == candidate:
+                    return True
+                span_id = parents.get(span_id)
+            return False
+
+        # Complete ("X") events on one tid must nest, so a span goes on the first
+        # lane whose innermost open span is one of its ancestors (or none is open)
+        lanes: List[List[Span]] = []
+        events = []
+        origin = spans[0].start_ns if spans else 0
+        for span in spans:
+            for tid, stack in enumerate(lanes):
+                while stack and stack[-1].end_ns <= span.start_ns:
+                    stack.pop()
+                if not stack or (is_ancestor(stack[-1].span_id, span.parent_id) and stack[-1].end_ns >= span.end_ns):
+                    break
+            else:
+                lanes.append([])
+                tid, stack = len(lanes) - 1, lanes[-1]
+            stack.append(span)
+            args = dict(span.attributes)
+            if span.error:
+                args["error"] = span.error
+            events.append({
+                "name": span.name, "cat": span.kind, "ph": "X", "pid": 1, "tid": tid + 1,
+                "ts": (span.start_ns - origin) / 1e3, "dur": (span.end_ns - span.start_ns) / 1e3, "args": args,
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_otel(self, service_name: str = "react-agent") -> Dict[str, Any]:
+        """OTLP/JSON (ExportTraceServiceRequest) with one trace for all recorded spans"""
+        spans = self._snapshot()
+        ids = {span.span_id for span in spans}
+
+        def attribute(key: str, value: Any) -> Dict[str, Any]:
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        otel_spans = []
+        for span in spans:
+            record = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": _OTEL_SPAN_KIND.get(span.kind, _OTEL_INTERNAL),
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [attribute("agent.span.kind", span.kind)]
+                              + [attribute(key, value) for key, value in span.attributes.items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            if span.parent_id in ids:
+                record["parentSpanId"] = span.parent_id
+            otel_spans.append(record)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [attribute("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": "agent_tracing"}, "spans": otel_spans}],
+        }]}
+
+    def export(self, path: str, format: str = "chrome") -> str:
+        """Write the trace as "chrome" or "otel" JSON; returns the path"""
+        if format not in ("chrome", "otel"):
+            raise ValueError(f"Unsupported trace format: {format}")
+        data = self.to_chrome_trace() if format == "chrome" else self.to_otel()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        return path
@@ -0,0 +1,310 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#   "langchain>=0.1.0",
+#   "langchain-openai>=0.1.0",
+#   "langchain-anthropic>=0.1.0",
+#   "python-dotenv>=1.0.0",
+#   "rich>=13.0.0",
+# ]
+# ///
+
+"""
+Batch Runner
+Answers many questions concurrently across a pool of LangChainReactAgent
+instances. The agents share one set of tools (and with it the pooled HTTP
+client), LLM requests are rate limited per provider, and results are
+streamed out as JSONL, one line per question with its latency and token usage.
+
+    python batch_runner.py questions.txt --provider deepseek --model deepseek-chat -o results.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, TextIO, Tuple, Union
+
+from langchain_core.rate_limiters import InMemoryRateLimiter
+
+from agent_budget import UsageCollector
+from langchain_react_agent import LangChainReactAgent
+from llm_router import RoutedChatModel
+from react_agent_tools import get_basic_tools
+
+# LLM requests per second allowed for each provider, shared by all agents in a runner
+DEFAULT_RATE_LIMITS = {
+    "openai": 5.0,
+    "anthropic": 2.0,
+    "deepseek": 5.0,
+}
+
+_FAILED = "Agent execution failed"
+
+# A ValueError stands in for an input line that could not be read
+Question = Union[str, Dict[str, Any], ValueError]
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one question; ``index`` is its position in the input"""
+    index: int
+    id: Any
+    question: str
+    answer: Optional[str]
+    error: Optional[str]
+    latency: float
+    llm_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    provider: str = ""
+    model: str = ""
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def to_json(self) -> str:
+        record = asdict(self)
+        record["latency"] = round(self.latency, 3)
+        record["total_tokens"] = self.total_tokens
+        return json.dumps(record, ensure_ascii=False, default=str)
+
+
+@dataclass
+class BatchSummary:
+    questions: int = 0
+    errors: int = 0
+    wall_time: float = 0.0
+    latencies: List[float] = field(default_factory=list, repr=False)
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    def add(self, result: BatchResult):
+        self.questions += 1
+        self.errors += result.error is not None
+        self.latencies.append(result.latency)
+        self.input_tokens += result.input_tokens
+        self.output_tokens += result.output_tokens
+
+    def format(self) -> str:
+        if not self.latencies:
+            return "No questions"
+        latencies = sorted(self.latencies)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return (f"{self.questions} questions ({self.errors} failed) in {self.wall_time:.1f}s; "
+                f"latency p50 {statistics.median(latencies):.2f}s, p95 {p95:.2f}s; "
+                f"tokens {self.input_tokens} in / {self.output_tokens} out")
+
+
+class BatchRunner:
+    """Run questions concurrently over a fixed pool of agents
+
+    Each question takes an idle agent from the pool, so at most ``pool_size``
+    questions are in flight; the agent's memory is cleared first so answers
+    do not depend on which questions the agent saw before. Agents are built
+    by ``agent_factory`` or, by default, as LangChainReactAgent instances that
+    all get the same tool objects. Every agent's chat model is given the rate
+    limiter of its provider (``rate_limits`` maps provider to requests per
+    second; a provider that is missing or None is not limited).
+    """
+
+    def __init__(self, llm_provider: str = "openai", model_name: str = "gpt-4", pool_size: int = 4,
+                 rate_limits: Optional[Dict[str, Optional[float]]] = None, tools: Optional[List[Any]] = None,
+                 agent_factory: Optional[Callable[[], LangChainReactAgent]] = None, **agent_kwargs: Any):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self.llm_provider = llm_provider
+        self.model_name = model_name
+        self.pool_size = pool_size
+        self.rate_limits = DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits
+        self.agent_factory = agent_factory
+        self.agent_kwargs = agent_kwargs
+        self._tools = tools
+        self._limiters: Dict[str, InMemoryRateLimiter] = {}
+        self._agents: List[LangChainReactAgent] = []
+
+    def rate_limiter(self, provider: str) -> Optional[InMemoryRateLimiter]:
+        """The limiter shared by all of this runner's agents for ``provider``"""
+        rate = self.rate_limits.get(provider)
+        if not rate:
+            return None
+        if provider not in self._limiters:
+            self._limiters[provider] = InMemoryRateLimiter(
+                requests_per_second=rate,
+                check_every_n_seconds=min(0.1, 0.5 / rate),
+                max_bucket_size=max(1.0, rate),
+            )
+        return self._limiters[provider]
+
+    def _make_agent(self) -> LangChainReactAgent:
+        if self.agent_factory:
+            agent = self.agent_factory()
+        else:
+            if self._tools is None:
+                self._tools = get_basic_tools()
+            agent = LangChainReactAgent(llm_provider=self.llm_provider, model_name=self.model_name,
+                                        verbose=False, **self.agent_kwargs)
+            agent.add_tools(self._tools)
+        # A routed agent's requests are limited per provider it routes to
+        models = (agent.llm.models if isinstance(agent.llm, RoutedChatModel)
+                  else {getattr(agent, "llm_provider", self.llm_provider): agent.llm})
+        for provider, model in models.items():
+            limiter = self.rate_limiter(provider)
+            if limiter is not None and hasattr(model, "rate_limiter"):
+                model.rate_limiter = limiter
+        return agent
+
+    @property
+    def agents(self) -> List[LangChainReactAgent]:
+        """The agent pool (built on first use)"""
+        while len(self._agents) < self.pool_size:
+            self._agents.append(self._make_agent())
+        return self._agents
+
+    async def astream(self, questions: Iterable[Question]) -> AsyncIterator[BatchResult]:
+        """Yield a BatchResult per question, in completion order
+
+        ``questions`` may be any iterable, including a lazy iterator; it is
+        consumed only as agents become free. Items are strings or dicts with a
+        "question" and an optional "id".
+        """
+        idle: asyncio.Queue = asyncio.Queue()
+        for agent in self.agents:
+            idle.put_nowait(agent)
+
+        items = enumerate(questions)
+        pending = set()
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(pending) < self.pool_size:
+                    try:
+                        index, item = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.ensure_future(self._ask(idle, index, item)))
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _ask(self, idle: asyncio.Queue, index: int, item: Question) -> BatchResult:
+        try:
+            question_id, question = self._parse(index, item)
+        except ValueError as e:
+            # A malformed item costs its own line, not the batch
+            return BatchResult(index=index, id=item.get("id", index) if isinstance(item, dict) else index,
+                               question="", answer=None, error=f"Invalid question: {e}", latency=0.0)
+        agent = await idle.get()
+        try:
+            agent.memory.clear()
+            usage = UsageCollector()
+            start = time.perf_counter()
+            try:
+                answer = await agent.arun(question, callbacks=[usage])
+                error = answer if answer.startswith(_FAILED) else None
+            except Exception as e:
+                answer, error = None, f"{_FAILED}: {str(e)}"
+            latency = time.perf_counter() - start
+        finally:
+            idle.put_nowait(agent)
+        return BatchResult(
+            index=index,
+            id=question_id,
+            question=question,
+            answer=None if error else answer,
+            error=error,
+            latency=latency,
+            llm_calls=usage.llm_calls,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            provider=getattr(agent, "llm_provider", self.llm_provider),
+            model=getattr(agent, "model_name", self.model_name),
+        )
+
+    @staticmethod
+    def _parse(index: int, item: Question) -> Tuple[Any, str]:
+        if isinstance(item, ValueError):
+            raise item
+        if isinstance(item, dict):
+            if "question" not in item:
+                raise ValueError(f"Question {index} has no 'question' field")
+            return item.get("id", index), item["question"]
+        return index, str(item)
+
+    async def awrite_jsonl(self, questions: Iterable[Question], out: TextIO) -> BatchSummary:
+        """Write one JSON line per question to ``out`` as answers arrive"""
+        summary = BatchSummary()
+        start = time.perf_counter()
+        async for result in self.astream(questions):
+            out.write(result.to_json() + "\n")
+            out.flush()
+            summary.add(result)
+        summary.wall_time = time.perf_counter() - start
+        return summary
+
+    def run(self, questions: Iterable[Question], output: Union[str, TextIO, None] = None) -> BatchSummary:
+        """Synchronous entry point; ``output`` is a path, an open file, or None for stdout"""
+        if isinstance(output, str):
+            with open(output, "w", encoding="utf-8") as out:
+                return asyncio.run(self.awrite_jsonl(questions, out))
+        return asyncio.run(self.awrite_jsonl(questions, output or sys.stdout))
+
+
+def read_questions(stream: TextIO) -> Iterable[Question]:
+    """Questions from a text stream: one per line, either plain text or a JSON object
+
+    A line that is not valid JSON is passed on as a ValueError, which the
+    runner reports as that question's error.
+    """
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith("{"):
+            yield line
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"line {number} is not valid JSON: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions concurrently, writing JSONL results")
+    parser.add_argument("questions", nargs="?", help="Questions file (one per line or JSONL); default stdin")
+    parser.add_argument("-o", "--output", help="Output JSONL file (default stdout)")
+    parser.add_argument("--provider", default="openai", choices=["openai", "anthropic", "deepseek"])
+    parser.add_argument("--model", default="gpt-4")
+    parser.add_argument("--pool-size", type=int, default=4, help="Number of agents (questions in flight)")
+    parser.add_argument("--rate", type=float, help="LLM requests per second for the provider (0 = unlimited)")
+    parser.add_argument("--agent-mode", default="react", choices=["react", "tool_calling"])
+    args = parser.parse_args()
+
+    rate_limits = dict(DEFAULT_RATE_LIMITS)
+    if args.rate is not None:
+        rate_limits[args.provider] = args.rate or None
+    runner = BatchRunner(llm_provider=args.provider, model_name=args.model, pool_size=args.pool_size,
+                         rate_limits=rate_limits, agent_mode=args.agent_mode)
+
+    if args.questions:
+        with open(args.questions, encoding="utf-8") as stream:
+            summary = runner.run(read_questions(stream), args.output)
+    else:
+        summary = runner.run(read_questions(sys.stdin), args.output)
+    print(summary.format(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#   "rich>=13.0.0",
+# ]
+# ///
+
+"""
+MCP Client Benchmark
+Compares one persistent, multiplexed stdio connection against spawning a
+fresh mcp_calculator_server.py process for every agent session.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+from rich.console import Console
+from rich.table import Table
+
+from mcp_stdio_client import StdioMCPClient
+
+console = Console()
+
+
+def _expressions(sessions: int, calls_per_session: int) -> List[List[str]]:
+    return [[f"{s} * {c} + sqrt({c + 1})" for c in range(calls_per_session)] for s in range(sessions)]
+
+
+async def bench_spawn_per_session(workload: List[List[str]]) -> float:
+    """Each session spawns its own server, initializes, lists tools and calls sequentially"""
+    start = time.perf_counter()
+    for expressions in workload:
+        async with StdioMCPClient() as client:
+            await client.list_tools()
+            for expression in expressions:
+                await client.call_tool("calculate", {"expression": expression})
+    return time.perf_counter() - start
+
+
+async def bench_persistent_sequential(workload: List[List[str]]) -> float:
+    """One shared connection, calls issued one at a time"""
+    async with StdioMCPClient() as client:
+        start = time.perf_counter()
+        for expressions in workload:
+            await client.list_tools()
+            for expression in expressions:
+                await client.call_tool("calculate", {"expression": expression})
+        return time.perf_counter() - start
+
+
+async def bench_persistent_multiplexed(workload: List[List[str]], concurrency: int) -> float:
+    """One shared connection, sessions run concurrently with many requests in flight"""
+    async with StdioMCPClient() as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call(expression: str):
+            async with semaphore:
+                await client.call_tool("calculate", {"expression": expression})
+
+        async def session(expressions: List[str]):
+            await client.list_tools()
+            await asyncio.gather(*(call(e) for e in expressions))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(session(expressions) for expressions in workload))
+        return time.perf_counter() - start
+
+
+async def run_benchmark(sessions: int, calls_per_session: int, concurrency: int) -> Dict[str, float]:
+    workload = _expressions(sessions, calls_per_session)
+    return {
+        "spawn per session": await bench_spawn_per_session(workload),
+        "persistent, sequential": await bench_persistent_sequential(workload),
+        "persistent, multiplexed": await bench_persistent_multiplexed(workload, concurrency),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MCP client connection strategies")
+    parser.add_argument("--sessions", type=int, default=10, help="Number of agent sessions to simulate")
+    parser.add_argument("--calls-per-session", type=int, default=20, help="Tool calls per session")
+    parser.add_argument("--concurrency", type=int, default=32, help="Max in-flight requests for the multiplexed client")
+    args = parser.parse_args()
+
+    total_calls = args.sessions * args.calls_per_session
+    console.print(f"[bold cyan]MCP client benchmark[/bold cyan]: {args.sessions} sessions x "
+                  f"{args.calls_per_session} calls = {total_calls} tool calls")
+
+    results = asyncio.run(run_benchmark(args.sessions, args.calls_per_session, args.concurrency))
+    baseline = results["spawn per session"]
+
+    table = Table(title="Results")
+    table.add_column("Strategy", style="cyan")
+    table.add_column("Total (s)", justify="right")
+    table.add_column("Per call (ms)", justify="right")
+    table.add_column("Calls/s", justify="right")
+    table.add_column("Speedup", justify="right", style="green")
+    for name, elapsed in results.items():
+        table.add_row(
+            name,
+            f"{elapsed:.3f}",
+            f"{elapsed / total_calls * 1000:.3f}",
+            f"{total_calls / elapsed:.0f}",
+            f"{baseline / elapsed:.1f}x",
+        )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#   "rich>=13.0.0",
+# ]
+# ///
+
+"""
+MCP Calculator Server Load Benchmark
+Spawns mcp_calculator_server.py and drives a configurable mix of initialize,
+tools/list and tools/call traffic at a fixed concurrency or a fixed request
+rate. Reports throughput and p50/p95/p99 latency and writes a JSON results
+file that can be compared across commits.
+
+Examples:
+    uv run benchmark_mcp_server.py --concurrency 16 --requests 5000
+    uv run benchmark_mcp_server.py --transport http --rate 500 --duration 10
+    uv run benchmark_mcp_server.py --mix tools/call=8,tools/list=1,initialize=1 \\
+        --output results.json --compare baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+from mcp_stdio_client import StdioMCPClient, PROTOCOL_VERSION
+
+console = Console()
+
+SERVER_SCRIPT = Path(__file__).parent / "mcp_calculator_server.py"
+METHODS = ("initialize", "tools/list", "tools/call")
+
+CALL_ARGUMENTS = [
+    {"name": "calculate", "arguments": {"expression": "2 + 3 * 4"}},
+    {"name": "calculate", "arguments": {"expression": "sqrt(144) + sin(pi / 2)"}},
+    {"name": "calculate", "arguments": {"expression": "log10(1000) * exp(1)"}},
+    {"name": "convert_units", "arguments": {"value": 100, "from_unit": "meters", "to_unit": "feet"}},
+    {"name": "convert_units", "arguments": {"value": 32, "from_unit": "fahrenheit", "to_unit": "celsius"}},
+]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse 'tools/call=8,tools/list=1,initialize=1' into normalised weights"""
+    weights: Dict[str, float] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        method, _, weight = part.partition("=")
+        method = method.strip()
+        if method not in METHODS:
+            raise argparse.ArgumentTypeError(f"Unknown method in mix: {method} (choose from {', '.join(METHODS)})")
+        weights[method] = float(weight or 1)
+    total = sum(weights.values())
+    if total <= 0:
+        raise argparse.ArgumentTypeError("Mix weights must sum to a positive number")
+    return {method: weight / total for method, weight in weights.items()}
+
+
+def request_params(method: str, rng: random.Random) -> Dict[str, Any]:
+    if method == "initialize":
+        return {"protocolVersion": PROTOCOL_VERSION, "capabilities": {},
+                "clientInfo": {"name": "benchmark", "version": "1.0.0"}}
+    if method == "tools/call":
+        return rng.choice(CALL_ARGUMENTS)
+    return {}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "requests": count,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(sum(values) / count * 1000, 4) if count else 0.0,
+            "p50": round(percentile(values, 50) * 1000, 4),
+            "p95": round(percentile(values, 95) * 1000, 4),
+            "p99": round(percentile(values, 99) * 1000, 4),
+            "max": round(values[-1] * 1000, 4) if count else 0.0,
+        },
+    }
+
+
+class HTTPConnection:
+    """Minimal keep-alive HTTP/1.1 JSON-RPC connection to the server's /mcp endpoint"""
+
+    def __init__(self, host: str, port: int, path: str = "/mcp"):
+        self.host = host
+        self.port = port
+        self.path = path
+        self._ids = 0
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method: str, params: Dict[str, Any]) -> Any:
+        self._ids += 1
+        body = json.dumps({"jsonrpc": "2.0", "id": self._ids, "method": method, "params": params}).encode()
+        self._writer.write(
+            f"POST {self.path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Accept: application/json, text/event-stream\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+        length = 0
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value.strip())
+        payload = await self._reader.readexactly(length)
+        if status != 200:
+            raise RuntimeError(f"HTTP {status}: {payload[:200]!r}")
+        message = json.loads(payload)
+        if "error" in message:
+            raise RuntimeError(message["error"].get("message", "JSON-RPC error"))
+        return message.get("result")
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for_port(port: int, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"HTTP server did not start on port {port}")
+            await asyncio.sleep(0.05)
+
+
+class LoadGenerator:
+    """Drives weighted JSON-RPC traffic against a freshly spawned server"""
+
+    def __init__(self, transport: str, mix: Dict[str, float], seed: int = 0, connections: int = 8):
+        self.transport = transport
+        self.mix = mix
+        self.connections = connections
+        self.rng = random.Random(seed)
+        self.latencies: Dict[str, List[float]] = {method: [] for method in mix}
+        self.errors: Dict[str, int] = {method: 0 for method in mix}
+        self._stdio: Optional[StdioMCPClient] = None
+        self._server: Optional[subprocess.Popen] = None
+        self._pool: Optional[asyncio.Queue] = None
+
+    async def start(self):
+        if self.transport == "stdio":
+            self._stdio = StdioMCPClient()
+            await self._stdio.start()
+            return
+
+        port = _free_port()
+        self._server = subprocess.Popen(
+            [sys.executable, str(SERVER_SCRIPT), "--transport", "http", "--port", str(port),
+             "--max-connections", str(max(self.connections, 64))],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        await _wait_for_port(port)
+        self._pool = asyncio.Queue()
+        for _ in range(self.connections):
+            connection = HTTPConnection("127.0.0.1", port)
+            await connection.connect()
+            self._pool.put_nowait(connection)
+
+    async def stop(self):
+        if self._stdio is not None:
+            await self._stdio.close()
+        if self._pool is not None:
+            while not self._pool.empty():
+                await self._pool.get_nowait().close()
+        if self._server is not None:
+            self._server.terminate()
+            self._server.wait(timeout=5)
+
+    def pick_method(self) -> str:
+        return self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+
+    async def _send(self, method: str, params: Dict[str, Any]):
+        if self._stdio is not None:
+            return await self._stdio.request(method, params)
+        connection = await self._pool.get()
+        try:
+            return await connection.request(method, params)
+        finally:
+            self._pool.put_nowait(connection)
+
+    async def issue(self, method: str, started: Optional[float] = None):
+        """Send one request; ``started`` lets rate mode measure from the scheduled time"""
+        params = request_params(method, self.rng)
+        start = started if started is not None else time.perf_counter()
+        try:
+            await self._send(method, params)
+        except Exception:
+            self.errors[method] += 1
+            return
+        self.latencies[method].append(time.perf_counter() - start)
+
+    async def run_fixed_concurrency(self, concurrency: int, total_requests: Optional[int],
+                                    duration: Optional[float]) -> float:
+        """Closed loop: ``concurrency`` workers each send the next request as soon as one completes"""
+        remaining = [total_requests] if total_requests else None
+        deadline = time.perf_counter() + duration if duration else None
+
+        async def worker():
+            while True:
+                if remaining is not None:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                await self.issue(self.pick_method())
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+    async def run_fixed_rate(self, rate: float, total_requests: Optional[int], duration: Optional[float],
+                             max_in_flight: int = 10000) -> float:
+        """Open loop: requests are scheduled at a fixed rate regardless of completions
+
+        Latency is measured from each request's scheduled send time, so a
+        stalled server shows up in the percentiles instead of silently
+        lowering the offered load (coordinated omission).
+        """
+        count = total_requests or int(rate * (duration or 10))
+        interval = 1.0 / rate
+        in_flight = asyncio.Semaphore(max_in_flight)
+        tasks = []
+
+        async def scheduled(method: str, at: float):
+            async with in_flight:
+                await self.issue(method, started=at)
+
+        start = time.perf_counter()
+        for i in range(count):
+            at = start + i * interval
+            delay = at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(scheduled(self.pick_method(), at)))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    def results(self, elapsed: float) -> Dict[str, Any]:
+        all_latencies = [value for values in self.latencies.values() for value in values]
+        return {
+            "overall": summarize(all_latencies, sum(self.errors.values()), elapsed),
+            "by_method": {
+                method: summarize(self.latencies[method], self.errors[method], elapsed)
+                for method in self.mix
+            },
+            "elapsed_s": round(elapsed, 4),
+        }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    generator = LoadGenerator(args.transport, args.mix, seed=args.seed,
+                              connections=args.connections or args.concurrency)
+    await generator.start()
+    try:
+        if args.warmup:
+            await generator.run_fixed_concurrency(args.concurrency, args.warmup, None)
+            generator.latencies = {method: [] for method in args.mix}
+            generator.errors = {method: 0 for method in args.mix}
+
+        if args.rate:
+            elapsed = await generator.run_fixed_rate(args.rate, args.requests, args.duration)
+        else:
+            elapsed = await generator.run_fixed_concurrency(args.concurrency, args.requests, args.duration)
+    finally:
+        await generator.stop()
+
+    return {
+        "benchmark": "mcp_calculator_server",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "transport": args.transport,
+            "mode": "fixed_rate" if args.rate else "fixed_concurrency",
+            "concurrency": None if args.rate else args.concurrency,
+            "rate": args.rate,
+            "requests": args.requests,
+            "duration": args.duration,
+            "mix": args.mix,
+            "seed": args.seed,
+        },
+        "results": generator.results(elapsed),
+    }
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    config = report["config"]
+    mode = f"rate {config['rate']}/s" if config["rate"] else f"concurrency {config['concurrency']}"
+    table = Table(title=f"MCP server load ({config['transport']}, {mode})")
+    table.add_column("Method", style="cyan")
+    table.add_column("Requests", justify="right")
+    table.add_column("Errors", justify="right")
+    table.add_column("Req/s", justify="right")
+    table.add_column("p50 ms", justify="right")
+    table.add_column("p95 ms", justify="right")
+    table.add_column("p99 ms", justify="right")
+    if baseline:
+        table.add_column("Δ p99", justify="right")
+        table.add_column("Δ req/s", justify="right")
+
+    results = report["results"]
+    rows: List[Tuple[str, Dict[str, Any], Optional[Dict[str, Any]]]] = [
+        (method, stats, (baseline or {}).get("results", {}).get("by_method", {}).get(method))
+        for method, stats in results["by_method"].items()
+    ]
+    rows.append(("overall", results["overall"], (baseline or {}).get("results", {}).get("overall")))
+
+    for name, stats, base in rows:
+        latency = stats["latency_ms"]
+        row = [name, str(stats["requests"]), str(stats["errors"]), f"{stats['throughput_rps']:.0f}",
+               f"{latency['p50']:.3f}", f"{latency['p95']:.3f}", f"{latency['p99']:.3f}"]
+        if baseline:
+            if base:
+                row.append(_delta(latency["p99"], base["latency_ms"]["p99"], lower_is_better=True))
+                row.append(_delta(stats["throughput_rps"], base["throughput_rps"], lower_is_better=False))
+            else:
+                row += ["-", "-"]
+        table.add_row(*row)
+    console.print(table)
+
+
+def _delta(current: float, previous: float, lower_is_better: bool) -> str:
+    if not previous:
+        return "-"
+    change = (current - previous) / previous * 100
+    better = change < 0 if lower_is_better else change > 0
+    color = "green" if better else "red"
+    return f"[{color}]{change:+.1f}%[/{color}]"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark for mcp_calculator_server.py")
+    parser.add_argument("--transport", choices=["stdio", "http"], default="stdio")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("tools/call=8,tools/list=1,initialize=1"),
+                        help="Weighted request mix, e.g. 'tools/call=8,tools/list=1,initialize=1'")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=8, help="Closed-loop workers (default mode)")
+    load.add_argument("--rate", type=float, help="Open-loop requests per second")
+    parser.add_argument("--requests", type=int, help="Total requests to send")
+    parser.add_argument("--duration", type=float, help="Seconds to run (when --requests is not set)")
+    parser.add_argument("--connections", type=int, help="HTTP keep-alive connections (default: concurrency)")
+    parser.add_argument("--warmup", type=int, default=200, help="Requests sent before measuring")
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed for the request mix")
+    parser.add_argument("--output", type=Path, help="Write JSON results to this file")
+    parser.add_argument("--compare", type=Path, help="Previous JSON results to show deltas against")
+    args = parser.parse_args()
+
+    if args.requests is None and args.duration is None:
+        args.requests = 2000
+
+    report = asyncio.run(run_benchmark(args))
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    print_report(report, baseline)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        console.print(f"[green]Results written to {args.output}[/green]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = []
+# ///
+
+"""
+Code Index
+A persistent SQLite index of definitions, references and imports for a
+repository. It is built once and then refreshed incrementally by
+(mtime, size), so "where is X defined" and "who imports Y" are index
+lookups instead of a walk over every file. Also exports repomap.json.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from code_metrics import JS_EXTENSIONS, PYTHON_EXTENSIONS, analyze_path, language_for
+from directory_analyzer import DirectoryAnalyzer
+
+INDEXED_EXTENSIONS = PYTHON_EXTENSIONS + JS_EXTENSIONS
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    language TEXT,
+    loc INTEGER,
+    sloc INTEGER,
+    complexity INTEGER,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    qualname TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    line INTEGER,
+    end_line INTEGER,
+    complexity INTEGER
+);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols(name);
+CREATE TABLE IF NOT EXISTS imports (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    module TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS imports_module ON imports(module);
+CREATE TABLE IF NOT EXISTS refs (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    line INTEGER
+);
+CREATE INDEX IF NOT EXISTS refs_name ON refs(name);
+CREATE VIRTUAL TABLE IF NOT EXISTS symbol_search USING fts5(
+    qualname, words, path UNINDEXED, symbol_id UNINDEXED
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def _index_file(path: str) -> Dict[str, Any]:
+    """Analyse one file for the index (module-level so it can run in a worker process)"""
+    try:
+        metrics = analyze_path(path, references=True)
+    except OSError as e:
+        return {"error": str(e), "symbols": [], "imports": [], "references": []}
+    # One row per (name, line) is enough for "who uses X"
+    references = sorted(set(metrics.references))
+    return {
+        "language": metrics.language,
+        "loc": metrics.loc,
+        "sloc": metrics.sloc,
+        "complexity": metrics.complexity,
+        "error": metrics.error,
+        "symbols": [(s.name, s.qualname, s.kind, s.line, s.end_line, s.complexity) for s in metrics.symbols],
+        "imports": list(dict.fromkeys(metrics.imports)),
+        "references": references,
+    }
+
+
+def _index_batch(paths: List[str]) -> List[Dict[str, Any]]:
+    return [_index_file(path) for path in paths]
+
+
+class CodeIndex:
+    """On-disk symbol/import/reference index for one repository root
+
+    Paths are stored relative to ``root``. ``update()`` re-analyses only
+    files whose (mtime, size) changed and drops deleted ones; with
+    ``max_staleness`` the query helpers call it at most that often.
+    """
+
+    def __init__(self, root: str = ".", db_path: Optional[str] = None, max_staleness: float = 30.0,
+                 workers: Optional[int] = None, parallel_threshold: int = 200):
+        self.root = Path(root).resolve()
+        self.db_path = str(db_path) if db_path else str(self.root / ".code_index.db")
+        self.max_staleness = max_staleness
+        self.parallel_threshold = parallel_threshold
+        self.workers = workers or os.cpu_count() or 1
+        self._walker = DirectoryAnalyzer(extensions=INDEXED_EXTENSIONS)
+        self._lock = threading.Lock()
+        self._last_update = 0.0
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        if self.db_path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is not None and int(row[0]) != SCHEMA_VERSION:
+                # Older layout: drop it and rebuild from scratch on the next update()
+                for table in ("symbol_search", "refs", "imports", "symbols", "files"):
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self.conn.executescript(_SCHEMA)
+            self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self) -> "CodeIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # --- Building ---------------------------------------------------------
+
+    def update(self) -> Dict[str, Any]:
+        """Bring the index up to date with the files on disk"""
+        start = time.perf_counter()
+        with self._lock:
+            known = {path: (file_id, mtime_ns, size) for file_id, path, mtime_ns, size
+                     in self.conn.execute("SELECT id, path, mtime_ns, size FROM files")}
+            seen = set()
+            stale: List[Tuple[str, int, int]] = []
+            for path, kind, stat in self._walker.walk(self.root):
+                if kind != "file" or not path.endswith(INDEXED_EXTENSIONS):
+                    continue
+                rel_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+                seen.add(rel_path)
+                entry = known.get(rel_path)
+                if entry is None or entry[1] != stat.st_mtime_ns or entry[2] != stat.st_size:
+                    stale.append((rel_path, stat.st_mtime_ns, stat.st_size))
+
+            removed = [known[path][0] for path in known.keys() - seen]
+            results = self._analyze([str(self.root / path) for path, _, _ in stale])
+
+            with self.conn:
+                for file_id in removed:
+                    self._delete_file(file_id)
+                for (rel_path, mtime_ns, size), data in zip(stale, results):
+                    entry = known.get(rel_path)
+                    if entry is not None:
+                        self._delete_file(entry[0])
+                    self._insert_file(rel_path, mtime_ns, size, data)
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('updated_at', ?)",
+                                  (datetime.datetime.now().isoformat(timespec="seconds"),))
+            self._last_update = time.monotonic()
+
+        return {
+            "files": len(seen),
+            "reindexed": len(stale),
+            "removed": len(removed),
+            "elapsed": round(time.perf_counter() - start, 3),
+        }
+
+    def _analyze(self, paths: List[str]) -> List[Dict[str, Any]]:
+        if len(paths) < self.parallel_threshold or self.workers <= 1:
+            return _index_batch(paths)
+        chunk = max(16, len(paths) // (self.workers * 4))
+        batches = [paths[i:i + chunk] for i in range(0, len(paths), chunk)]
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return [data for batch in pool.map(_index_batch, batches) for data in batch]
+
+    def _delete_file(self, file_id: int):
+        self.conn.execute("DELETE FROM symbol_search WHERE symbol_id IN (SELECT id FROM symbols WHERE file_id = ?)",
+                          (file_id,))
+        self.conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def _insert_file(self, rel_path: str, mtime_ns: int, size: int, data: Dict[str, Any]):
+        cursor = self.conn.execute(
+            "INSERT INTO files (path, mtime_ns, size, language, loc, sloc, complexity, error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (rel_path, mtime_ns, size, data.get("language") or language_for(Path(rel_path).suffix),
+             data.get("loc"), data.get("sloc"), data.get("complexity"), data.get("error")),
+        )
+        file_id = cursor.lastrowid
+        for symbol in data["symbols"]:
+            symbol_id = self.conn.execute(
+                "INSERT INTO symbols (file_id, name, qualname, kind, line, end_line, complexity) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (file_id, *symbol)).lastrowid
+            self.conn.execute("INSERT INTO symbol_search (qualname, words, path, symbol_id) VALUES (?, ?, ?, ?)",
+                              (symbol[1], _split_words(symbol[1]), rel_path, symbol_id))
+        self.conn.executemany("INSERT INTO imports (file_id, module) VALUES (?, ?)",
+                              [(file_id, module) for module in data["imports"]])
+        self.conn.executemany("INSERT INTO refs (file_id, name, line) VALUES (?, ?, ?)",
+                              [(file_id, name, line) for name, line in data["references"]])
+
+    def _refresh(self):
+        if self.max_staleness is not None and time.monotonic() - self._last_update >= self.max_staleness:
+            self.update()
+
+    def _query(self, sql: str, params: tuple) -> List[Tuple]:
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    # --- Queries ----------------------------------------------------------
+
+    def definitions(self, name: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Where ``name`` (a bare or dotted name, e.g. ``Tool.run``) is defined"""
+        self._refresh()
+        column = "qualname" if "." in name else "name"
+        rows = self._query(
+            f"SELECT f.path, s.qualname, s.kind, s.line, s.end_line FROM symbols s JOIN files f ON f.id = s.file_id "
+            f"WHERE s.{column} = ? ORDER BY f.path, s.line LIMIT ?", (name, limit))
+        return [dict(zip(("path", "qualname", "kind", "line", "end_line"), row)) for row in rows]
+
+    def importers(self, module: str, limit: int = 200) -> List[Dict[str, Any]]:
+        """Files importing ``module`` or one of its submodules"""
+        self._refresh()
+        rows = self._query(
+            "SELECT DISTINCT f.path, i.module FROM imports i JOIN files f ON f.id = i.file_id "
+            "WHERE i.module = ? OR i.module LIKE ? ESCAPE '\\' OR i.module LIKE ? ESCAPE '\\' "
+            "ORDER BY f.path LIMIT ?",
+            (module, _like_prefix(module) + ".%", "%/" + _like_prefix(module), limit))
+        return [{"path": path, "module": imported} for path, imported in rows]
+
+    def references(self, name: str, limit: int = 200) -> List[Dict[str, Any]]:
+        """Lines that use the identifier ``name``"""
+        self._refresh()
+        rows = self._query(
+            "SELECT f.path, r.line FROM refs r JOIN files f ON f.id = r.file_id "
+            "WHERE r.name = ? ORDER BY f.path, r.line LIMIT ?", (name, limit))
+        return [{"path": path, "line": line} for path, line in rows]
+
+    def search(self, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Full-text (prefix) search over symbol names and their camelCase/snake_case parts"""
+        self._refresh()
+        terms = [term for term in text.replace(".", " ").split() if term]
+        if not terms:
+            return []
+        match = " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+        rows = self._query(
+            "SELECT ss.path, s.qualname, s.kind, s.line FROM symbol_search ss JOIN symbols s ON s.id = ss.symbol_id "
+            "WHERE symbol_search MATCH ? ORDER BY rank LIMIT ?", (match, limit))
+        return [dict(zip(("path", "qualname", "kind", "line"), row)) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        counts = {}
+        for table in ("files", "symbols", "imports", "refs"):
+            counts[table] = self._query(f"SELECT COUNT(*) FROM {table}", ())[0][0]
+        return counts
+
+    # --- repomap.json -----------------------------------------------------
+
+    def repomap(self, project_name: Optional[str] = None, existing: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Build a repomap.json document from the index
+
+        Hand-written fields (``description``, ``type``, ``integrations``, ...)
+        from ``existing`` are kept for files that are still present.
+        """
+        self._refresh()
+        previous = {entry["path"]: entry for entry in (existing or {}).get("files", [])}
+        symbols: Dict[str, List[str]] = {}
+        for path, qualname, kind in self._query(
+                "SELECT f.path, s.qualname, s.kind FROM symbols s JOIN files f ON f.id = s.file_id "
+                "WHERE s.kind IN ('class', 'function') AND instr(s.qualname, '.') = 0 ORDER BY f.path, s.line", ()):
+            symbols.setdefault(path, []).append(qualname)
+        imports: Dict[str, List[str]] = {}
+        for path, module in self._query(
+                "SELECT f.path, i.module FROM imports i JOIN files f ON f.id = i.file_id ORDER BY f.path, i.rowid", ()):
+            imports.setdefault(path, []).append(module)
+
+        files = []
+        for path, language, sloc in self._query("SELECT path, language, sloc FROM files ORDER BY path", ()):
+            entry = dict(previous.get(path, {}))
+            entry["path"] = path
+            entry.setdefault("type", _file_type(path))
+            entry["language"] = language
+            entry["sloc"] = sloc
+            entry["symbols"] = symbols.get(path, [])
+            entry["imports"] = imports.get(path, [])
+            files.append(entry)
+
+        structure: Dict[str, int] = {}
+        for entry in files:
+            key = f"{entry['type']}_files" if entry["type"] == "test" else f"{entry['type']}_scripts"
+            structure[key] = structure.get(key, 0) + 1
+
+        return {
+            "project_name": project_name or (existing or {}).get("project_name") or self.root.name,
+            "files": files,
+            "structure": structure,
+            "last_updated": datetime.date.today().isoformat(),
+        }
+
+    def export_repomap(self, output: str, project_name: Optional[str] = None) -> Dict[str, Any]:
+        """Write repomap.json, merging with the current file if it exists"""
+        output_path = Path(output)
+        existing = None
+        if output_path.exists():
+            try:
+                existing = json.loads(output_path.read_text(encoding="utf-8"))
+            except ValueError:
+                existing = None
+        document = self.repomap(project_name, existing)
+        output_path.write_text(json.dumps(document, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        return document
+
+
+_WORD_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+
+
+def _split_words(qualname: str) -> str:
+    """'PooledHTTPClient.get_stats' -> 'Pooled HTTP Client get stats' so search matches parts"""
+    return " ".join(_WORD_BOUNDARY.sub(" ", part) for part in re.split(r"[._$]+", qualname) if part)
+
+
+def _like_prefix(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _file_type(path: str) -> str:
+    name = Path(path).name
+    if name.startswith("test_") or name.endswith(("_test.py", ".test.js", ".test.ts")) or "/tests/" in f"/{path}":
+        return "test"
+    if name.startswith("benchmark_"):
+        return "benchmark"
+    return "module"
+
+
+def format_results(results: List[Dict[str, Any]], empty: str) -> str:
+    """Render query results one per line, as the code_analysis tool returns them"""
+    if not results:
+        return empty
+    lines = []
+    for result in results:
+        location = f"{result['path']}:{result['line']}" if result.get("line") else result["path"]
+        detail = result.get("qualname") or result.get("module") or ""
+        kind = f" ({result['kind']})" if result.get("kind") else ""
+        lines.append(f"{location}  {detail}{kind}".rstrip())
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the code index")
+    parser.add_argument("command", choices=["build", "where", "importers", "refs", "search", "repomap"])
+    parser.add_argument("name", nargs="?", help="Symbol/module name, search text, or repomap output path")
+    parser.add_argument("--root", default=".", help="Repository root")
+    parser.add_argument("--db", help="Index database (default: <root>/.code_index.db)")
+    args = parser.parse_args()
+
+    with CodeIndex(args.root, args.db, max_staleness=0) as index:
+        if args.command == "build":
+            print(index.update(), index.stats())
+        elif args.command == "where":
+            print(format_results(index.definitions(args.name), f"No definition of {args.name}"))
+        elif args.command == "importers":
+            print(format_results(index.importers(args.name), f"Nothing imports {args.name}"))
+        elif args.command == "refs":
+            print(format_results(index.references(args.name), f"No references to {args.name}"))
+        elif args.command == "search":
+            print(format_results(index.search(args.name), f"No symbols match {args.name}"))
+        else:
+            document = index.export_repomap(args.name or "repomap.json")
+            print(f"Wrote {len(document['files'])} files to {args.name or 'repomap.json'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = []
+# ///
+
+"""
+Code Metrics
+Single-pass source analysis: symbol tables, LOC/SLOC, cyclomatic complexity
+and imports. Python is parsed with ``ast``; JavaScript/TypeScript go
+through a small tokenizer so comments, strings and template literals can't
+produce false matches.
+"""
+
+import ast
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+PYTHON_EXTENSIONS = ('.py', '.pyi')
+JS_EXTENSIONS = ('.js', '.jsx', '.mjs', '.cjs', '.ts', '.tsx')
+
+
+@dataclass
+class Symbol:
+    """A function, method or class definition"""
+    name: str
+    kind: str  # "function", "method" or "class"
+    line: int
+    end_line: Optional[int] = None
+    parent: Optional[str] = None
+    is_async: bool = False
+    complexity: int = 1
+
+    @property
+    def qualname(self) -> str:
+        return f"{self.parent}.{self.name}" if self.parent else self.name
+
+
+@dataclass
+class CodeMetrics:
+    """Everything CodeAnalysisTool reports for one file"""
+    language: str
+    loc: int = 0
+    sloc: int = 0
+    complexity: int = 1
+    symbols: List[Symbol] = field(default_factory=list)
+    imports: List[str] = field(default_factory=list)
+    references: List[Tuple[str, int]] = field(default_factory=list)  # (name, line); opt-in
+    error: Optional[str] = None
+
+    @property
+    def functions(self) -> int:
+        return sum(s.kind in ("function", "method") for s in self.symbols)
+
+    @property
+    def classes(self) -> int:
+        return sum(s.kind == "class" for s in self.symbols)
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["functions"] = self.functions
+        data["classes"] = self.classes
+        return data
+
+
+def language_for(extension: str) -> Optional[str]:
+    if extension in PYTHON_EXTENSIONS:
+        return "python"
+    if extension in JS_EXTENSIONS:
+        return "javascript"
+    return None
+
+
+def analyze_source(source: str, extension: str, references: bool = False) -> CodeMetrics:
+    """Analyse ``source`` according to its file extension
+
+    With ``references`` the result also lists every identifier use as
+    (name, line), for building a cross-reference index.
+    """
+    language = language_for(extension)
+    if language == "python":
+        return _analyze_python(source, references)
+    if language == "javascript":
+        return _analyze_javascript(source, references)
+    metrics = CodeMetrics(language="unknown")
+    metrics.loc, metrics.sloc = _line_counts(source, ("//", "#", "/*", "*"))
+    return metrics
+
+
+def analyze_path(path: str, references: bool = False) -> CodeMetrics:
+    """Read and analyse one file"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        source = f.read()
+    return analyze_source(source, Path(path).suffix, references)
+
+
+def _line_counts(source: str, comment_prefixes: tuple) -> tuple:
+    lines = source.splitlines()
+    sloc = 0
+    for line in lines:
+        stripped = line.strip()
+        if stripped and not stripped.startswith(comment_prefixes):
+            sloc += 1
+    return len(lines), sloc
+
+
+# --- Python -----------------------------------------------------------------
+
+_PY_BRANCHES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler, ast.Assert)
+if sys.version_info >= (3, 10):
+    _PY_BRANCHES += (ast.match_case,)
+_PY_DEFINITIONS = {ast.FunctionDef: "function", ast.AsyncFunctionDef: "function", ast.ClassDef: "class"}
+
+
+def _walk_python(tree: ast.AST, metrics: CodeMetrics, references: bool = False):
+    """Collect symbols, imports and per-function complexity in one iterative walk
+
+    Dispatches on the node type directly rather than through NodeVisitor's
+    per-node method lookup; the walk is the hot path once the tree is parsed.
+    """
+    # Stack of (node, enclosing definition symbol or None), popped depth-first
+    stack: List[tuple] = [(tree, None)]
+    while stack:
+        node, scope = stack.pop()
+        node_type = type(node)
+        decisions = 0
+
+        kind = _PY_DEFINITIONS.get(node_type)
+        if kind is not None:
+            if kind == "function" and scope is not None and scope.kind == "class":
+                kind = "method"
+            symbol = Symbol(
+                name=node.name,
+                kind=kind,
+                line=node.lineno,
+                end_line=getattr(node, "end_lineno", None),
+                parent=scope.qualname if scope else None,
+                is_async=node_type is ast.AsyncFunctionDef,
+            )
+            metrics.symbols.append(symbol)
+            # Decorators are evaluated in the enclosing scope
+            decorators = node.decorator_list
+            body = [(child, symbol) for child in ast.iter_child_nodes(node) if child not in decorators]
+            stack.extend(reversed(body))
+            stack.extend((child, scope) for child in reversed(decorators))
+            continue
+
+        if node_type is ast.Import:
+            metrics.imports.extend(alias.name for alias in node.names)
+        elif node_type is ast.ImportFrom:
+            metrics.imports.append("." * node.level + (node.module or ""))
+        elif references and node_type is ast.Name:
+            metrics.references.append((node.id, node.lineno))
+        elif references and node_type is ast.Attribute:
+            metrics.references.append((node.attr, node.end_lineno or node.lineno))
+        elif node_type is ast.BoolOp:
+            decisions = len(node.values) - 1
+        elif node_type is ast.comprehension:
+            decisions = 1 + len(node.ifs)
+        elif isinstance(node, _PY_BRANCHES):
+            decisions = 1
+
+        if decisions:
+            metrics.complexity += decisions
+            if scope is not None and scope.kind != "class":
+                scope.complexity += decisions
+        # Push in reverse so nodes pop in source order
+        stack.extend((child, scope) for child in reversed(list(ast.iter_child_nodes(node))))
+
+
+def _analyze_python(source: str, references: bool = False) -> CodeMetrics:
+    metrics = CodeMetrics(language="python")
+    metrics.loc, metrics.sloc = _line_counts(source, ("#",))
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError) as e:
+        metrics.error = f"{type(e).__name__}: {e}"
+        return metrics
+    _walk_python(tree, metrics, references)
+    return metrics
+
+
+# --- JavaScript / TypeScript ------------------------------------------------
+
+_JS_TOKEN = re.compile(r"""
+    (?P<newline>\n)
+  | (?P<space>[ \t\r\f\v]+)
+  | (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*"|`(?:\\.|[^`\\])*`)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<number>\d[\w.]*)
+  | (?P<op>=>|\?\?=?|\?\.|&&=?|\|\|=?|[{}()\[\];,:?=.<>!+\-*/%&|^~@#])
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+_JS_KEYWORDS = frozenset({
+    "async", "await", "break", "case", "catch", "class", "const", "continue", "debugger", "default", "delete",
+    "do", "else", "export", "extends", "false", "finally", "for", "from", "function", "if", "import", "in",
+    "instanceof", "interface", "let", "new", "null", "return", "static", "super", "switch", "this", "throw",
+    "true", "try", "type", "typeof", "undefined", "var", "void", "while", "yield",
+})
+_JS_BRANCH_WORDS = frozenset({"if", "for", "while", "catch"})
+_JS_DECISION_OPS = frozenset({"&&", "||", "??"})
+_JS_NOT_METHODS = _JS_BRANCH_WORDS | {"switch", "function", "return", "typeof", "new", "super", "await"}
+_JS_METHOD_PREFIXES = frozenset({"{", "}", ";", "async", "static", "get", "set", "*",
+                                 "public", "private", "protected", "readonly", "override"})
+
+
+def _js_tokens(source: str):
+    """Yield (kind, text, line) for significant tokens, skipping whitespace and comments
+
+    Regex literals are not recognised; a quote inside one can swallow the
+    rest of its line as a string, which only affects that line's counts.
+    """
+    line = 1
+    for match in _JS_TOKEN.finditer(source):
+        kind = match.lastgroup
+        text = match.group()
+        if kind == "newline":
+            line += 1
+            continue
+        if kind not in ("space", "comment"):
+            yield kind, text, line
+        line += text.count("\n")
+
+
+def _analyze_javascript(source: str, references: bool = False) -> CodeMetrics:
+    metrics = CodeMetrics(language="javascript")
+    metrics.loc, metrics.sloc = _line_counts(source, ("//", "/*", "*"))
+    tokens = list(_js_tokens(source))
+
+    depth = 0
+    parens = 0
+    open_scopes: List[tuple] = []      # (symbol, brace depth of its body)
+    pending: Optional[Symbol] = None   # defined, waiting for its body's "{"
+    pending_parens = 0
+
+    def text_at(i: int) -> str:
+        return tokens[i][1] if 0 <= i < len(tokens) else ""
+
+    def kind_at(i: int) -> str:
+        return tokens[i][0] if 0 <= i < len(tokens) else ""
+
+    def define(name: str, kind: str, line: int, is_async: bool) -> Symbol:
+        parent = open_scopes[-1][0] if open_scopes else None
+        if kind == "function" and parent is not None and parent.kind == "class":
+            kind = "method"  # class field holding an arrow function
+        symbol = Symbol(name=name, kind=kind, line=line, is_async=is_async,
+                        parent=parent.qualname if parent else None)
+        metrics.symbols.append(symbol)
+        return symbol
+
+    def decision():
+        metrics.complexity += 1
+        for symbol, _ in reversed(open_scopes):
+            if symbol.kind != "class":
+                symbol.complexity += 1
+                break
+
+    for i, (kind, text, line) in enumerate(tokens):
+        prev = text_at(i - 1)
+        if references and kind == "name" and text not in _JS_KEYWORDS and prev not in ("function", "class"):
+            metrics.references.append((text, line))
+        if prev == ".":
+            continue
+
+        if kind == "name":
+            if text in _JS_BRANCH_WORDS and text_at(i + 1) in ("(", "{", "await"):
+                decision()
+            elif text == "case":
+                decision()
+            elif text == "function":
+                name_index = i + 2 if text_at(i + 1) == "*" else i + 1
+                binding = i - 2 if prev == "async" else i - 1
+                if kind_at(name_index) == "name":
+                    name = text_at(name_index)
+                elif text_at(binding) in ("=", ":") and kind_at(binding - 1) == "name":
+                    name = text_at(binding - 1)
+                else:
+                    name = "<anonymous>"
+                pending, pending_parens = define(name, "function", line, prev == "async"), parens
+            elif text == "class" and kind_at(i + 1) == "name":
+                pending, pending_parens = define(text_at(i + 1), "class", line, False), parens
+            elif text == "import" and text_at(i + 1) != "(":
+                _js_collect_import(tokens, i, metrics)
+            elif text == "export" and text_at(i + 1) in ("*", "{"):
+                _js_collect_import(tokens, i, metrics)
+            elif text == "require" and text_at(i + 1) == "(" and kind_at(i + 2) == "string":
+                metrics.imports.append(text_at(i + 2)[1:-1])
+            elif (text_at(i + 1) == "(" and text not in _JS_NOT_METHODS and open_scopes
+                    and open_scopes[-1][0].kind == "class" and open_scopes[-1][1] == depth
+                    and prev in _JS_METHOD_PREFIXES):
+                # Method: name(...) { directly inside a class body
+                pending, pending_parens = define(text, "method", line, prev == "async"), parens
+        elif kind == "op":
+            if text == "(":
+                parens += 1
+            elif text == ")":
+                parens -= 1
+            elif text == "{":
+                depth += 1
+                if pending is not None and parens == pending_parens:
+                    open_scopes.append((pending, depth))
+                    pending = None
+            elif text == "}":
+                if open_scopes and open_scopes[-1][1] == depth:
+                    open_scopes.pop()[0].end_line = line
+                depth -= 1
+            elif text == "=>":
+                # Arrow function bound to a name: const f = (a) => ..., handler: async x => ...
+                head_start = _js_arrow_head_start(tokens, i)
+                if text_at(head_start - 1) in ("=", ":") and kind_at(head_start - 2) == "name":
+                    symbol = define(text_at(head_start - 2), "function", line, text_at(head_start) == "async")
+                    if text_at(i + 1) == "{":
+                        pending, pending_parens = symbol, parens
+                    else:
+                        symbol.end_line = line
+            elif text in _JS_DECISION_OPS:
+                decision()
+            elif text == "?" and text_at(i + 1) not in (":", ")", ",", "=", ";"):
+                # Ternary (not a TypeScript optional member)
+                decision()
+            elif text == ";" and pending is not None and pending.kind != "class" and parens == pending_parens:
+                # Declaration without a body (TypeScript overload / abstract member)
+                pending = None
+    return metrics
+
+
+def _js_arrow_head_start(tokens: List[tuple], arrow: int) -> int:
+    """Index of the first token of an arrow function's parameter list"""
+    i = arrow - 1
+    if i >= 0 and tokens[i][1] == ")":
+        nesting = 0
+        while i >= 0:
+            if tokens[i][1] == ")":
+                nesting += 1
+            elif tokens[i][1] == "(":
+                nesting -= 1
+                if nesting == 0:
+                    break
+            i -= 1
+    if i >= 1 and tokens[i - 1][1] == "async":
+        i -= 1
+    return i
+
+
+def _js_collect_import(tokens: List[tuple], start: int, metrics: CodeMetrics):
+    """Record the module of an import / export-from statement starting at ``start``"""
+    for j in range(start + 1, min(start + 256, len(tokens))):
+        kind, text, _ = tokens[j]
+        if kind == "string" and tokens[j - 1][1] in ("from", "import"):
+            metrics.imports.append(text[1:-1])
+            return
+        if text == ";" or (text == "}" and j + 1 < len(tokens) and tokens[j + 1][1] != "from"):
+            return
+
+
+if __name__ == "__main__":
+    for target in sys.argv[1:] or [__file__]:
+        result = analyze_path(target)
+        print(f"{target}: {result.language}, {result.loc} LOC / {result.sloc} SLOC, "
+              f"complexity {result.complexity}, {result.functions} functions, {result.classes} classes")
+        for symbol in result.symbols:
+            print(f"  {symbol.kind:8} {symbol.qualname} (line {symbol.line}, complexity {symbol.complexity})")
+        if result.imports:
+            print(f"  imports: {', '.join(result.imports)}")
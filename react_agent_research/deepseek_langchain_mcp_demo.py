@@ -32,6 +32,8 @@ from mcp.client.stdio import stdio_client
 from langchain_mcp_adapters.tools import load_mcp_tools
 from langchain_mcp_adapters.client import MultiServerMCPClient
 from langgraph.prebuilt import create_react_agent
+from mcp_stdio_client import StdioMCPClient, load_langchain_tools
+from tool_result_cache import ToolResultCache, cache_pure_tools
 from langchain_openai import ChatOpenAI
 from langchain.callbacks.base import BaseCallbackHandler
 from langchain.schema import AgentAction, AgentFinish
@@ -39,6 +41,9 @@ from typing import Any
 
 console = Console()
 
+# 纯函数工具（calculate、convert_units）的结果缓存，在所有演示之间共享
+tool_cache = ToolResultCache(max_entries=512, default_ttl=3600)
+
 class ReactAgentCallback(BaseCallbackHandler):
     """回调处理器显示推理过程"""
     
@@ -76,8 +81,8 @@ async def demo_single_server():
                 # 初始化连接
                 await session.initialize()
                 
-                # 加载 MCP 工具
-                tools = await load_mcp_tools(session)
+                # 加载 MCP 工具（标注为纯函数的工具走缓存）
+                tools = cache_pure_tools(await load_mcp_tools(session), tool_cache)
                 console.print(f"[green]✅ 加载了 {len(tools)} 个工具[/green]")
                 
                 # 配置 DeepSeek
@@ -135,7 +140,7 @@ async def demo_multi_server():
     
     try:
         # 获取所有工具
-        tools = await client.get_tools()
+        tools = cache_pure_tools(await client.get_tools(), tool_cache)
         console.print(f"[green]✅ 从所有服务器加载了 {len(tools)} 个工具[/green]")
         
         # 显示工具
@@ -190,6 +195,46 @@ async def demo_multi_server():
         import traceback
         traceback.print_exc()
 
+async def demo_shared_connection():
+    """演示共享的持久 stdio 连接（多个问题并发复用同一个服务器进程）"""
+    console.print("\n[bold cyan]演示 3: 共享持久连接（StdioMCPClient）[/bold cyan]")
+    
+    try:
+        async with StdioMCPClient() as client:
+            # tools/list 结果会被缓存，所有工具共享同一个连接
+            tools = await load_langchain_tools(client, cache=tool_cache)
+            console.print(f"[green]✅ 加载了 {len(tools)} 个工具（单连接）[/green]")
+            
+            model = ChatOpenAI(
+                model="deepseek-chat",
+                base_url="https://api.deepseek.com",
+                api_key=os.getenv("DEEPSEEK_API_KEY"),
+                temperature=0,
+                max_tokens=4096
+            )
+            agent = create_react_agent(model, tools)
+            
+            questions = [
+                "计算 2 ** 10 - 24",
+                "将 5 kilometers 转换为 miles",
+            ]
+            
+            # 多个问题并发运行，工具调用在同一连接上按 JSON-RPC id 多路复用
+            responses = await asyncio.gather(*(
+                agent.ainvoke({"messages": [{"role": "user", "content": q}]})
+                for q in questions
+            ))
+            
+            for question, response in zip(questions, responses):
+                console.print(f"\n[yellow]❓ 问题: {question}[/yellow]")
+                if "messages" in response:
+                    console.print(f"[green]💡 答案: {response['messages'][-1].content}[/green]")
+    
+    except Exception as e:
+        console.print(f"[red]错误: {str(e)}[/red]")
+        import traceback
+        traceback.print_exc()
+
 async def main():
     """主程序"""
     
@@ -217,11 +262,17 @@ async def main():
         # 运行演示 2：多服务器
         await demo_multi_server()
         
+        console.print("\n" + "="*60 + "\n")
+        
+        # 运行演示 3：共享持久连接
+        await demo_shared_connection()
+        
     except Exception as e:
         console.print(f"[red]❌ 主程序错误: {str(e)}[/red]")
         import traceback
         traceback.print_exc()
     
+    console.print(f"\n[dim]{tool_cache.format_report()}[/dim]")
     console.print("\n[bold green]✨ 演示完成！[/bold green]")
 
 if __name__ == "__main__":
@@ -21,7 +21,11 @@ import os
 import sys
 import json
 import asyncio
-from typing import Any, Dict, List, Optional
+import threading
+from concurrent.futures import Future
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any, Awaitable, Dict, List, Optional
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.panel import Panel
@@ -33,25 +37,82 @@ from langchain_openai import ChatOpenAI
 from langchain.schema import AgentAction, AgentFinish
 from langchain.callbacks.base import BaseCallbackHandler
 
+from tool_result_cache import ToolResultCache, is_pure_tool
+
 console = Console()
 
+class BackgroundEventLoop:
+    """Sync-over-async bridge: one event loop running in a daemon thread
+    
+    Coroutines are submitted with ``run_coroutine_threadsafe`` so sync callers
+    (LangChain ``Tool.func``) can drive async MCP sessions without creating a
+    new event loop per call.
+    """
+    
+    def __init__(self, name: str = "mcp-event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+    
+    def in_loop_thread(self) -> bool:
+        """Whether the caller is running on the bridge's own thread"""
+        return threading.current_thread() is self._thread
+    
+    def submit(self, coro: Awaitable[Any]) -> Future:
+        """Schedule a coroutine on the background loop"""
+        if self.loop.is_closed():
+            coro.close()  # never scheduled; avoids a "never awaited" warning
+            raise RuntimeError("Background event loop is closed")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the background loop and block for its result"""
+        if self.in_loop_thread():
+            raise RuntimeError("run() would deadlock when called from the loop thread")
+        return self.submit(coro).result(timeout)
+    
+    def close(self):
+        """Stop the loop and join the thread"""
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        self.loop.close()
+
+
+_default_bridge: Optional[BackgroundEventLoop] = None
+_default_bridge_lock = threading.Lock()
+
+
+def get_default_bridge() -> BackgroundEventLoop:
+    """Shared bridge for MCP clients that don't own an event loop"""
+    global _default_bridge
+    with _default_bridge_lock:
+        if _default_bridge is None or _default_bridge.loop.is_closed():
+            _default_bridge = BackgroundEventLoop()
+        return _default_bridge
+
+
 class MCPToolWrapper:
     """Wrapper to integrate MCP tools with LangChain"""
     
-    def __init__(self, tool_name: str, tool_description: str, mcp_client):
+    def __init__(self, tool_name: str, tool_description: str, mcp_client, timeout: float = 30.0,
+                 cache: Optional[ToolResultCache] = None):
         self.tool_name = tool_name
         self.tool_description = tool_description
         self.mcp_client = mcp_client
-        self._loop = None
+        self.timeout = timeout
+        # Only set for tools annotated as pure
+        self.cache = cache
     
-    def _get_or_create_loop(self):
-        """Get or create event loop"""
-        try:
-            self._loop = asyncio.get_running_loop()
-        except RuntimeError:
-            self._loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(self._loop)
-        return self._loop
+    @property
+    def bridge(self) -> BackgroundEventLoop:
+        """Event loop the MCP client's coroutines must run on"""
+        return getattr(self.mcp_client, "bridge", None) or get_default_bridge()
     
     def call_tool(self, input_str: str) -> str:
         """Call MCP tool synchronously for LangChain compatibility"""
@@ -72,27 +133,177 @@ class MCPToolWrapper:
         else:
             args = {"input": input_str}
         
-        # Create new event loop for sync execution
+        # Run on the long-lived loop that owns the MCP session
+        def call() -> str:
+            return self.bridge.run(self._call_tool_raw(args), timeout=self.timeout)
+        
         try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            result = loop.run_until_complete(self._call_tool_async(args))
-            return result
+            if self.cache is not None:
+                return self.cache.get_or_call(self.tool_name, args, call)
+            return call()
+        except Exception as e:
+            return f"Error calling MCP tool: {str(e)}"
+    
+    async def _call_tool_raw(self, args: Dict[str, Any]) -> str:
+        """Call the MCP tool, letting errors propagate so they are never cached"""
+        result = await self.mcp_client.call_tool(self.tool_name, args)
+        if isinstance(result, dict) and "content" in result:
+            # Extract text from MCP response format
+            content = result["content"]
+            if isinstance(content, list) and len(content) > 0:
+                return content[0].get("text", str(content))
+        return str(result)
+
+def _connection_lost(error: Exception) -> bool:
+    """Whether a session call failed because the server went away"""
+    import anyio
+    from mcp.types import CONNECTION_CLOSED
+    
+    if isinstance(error, (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream)):
+        return True
+    return getattr(getattr(error, "error", None), "code", None) == CONNECTION_CLOSED
+
+
+class PersistentMCPClient:
+    """MCP client holding one long-lived ClientSession to mcp_calculator_server.py
+    
+    The stdio subprocess and ``ClientSession`` live on a ``BackgroundEventLoop``
+    for the lifetime of the client, so every tool call reuses the same
+    connection instead of paying loop and session setup each time. If the
+    server dies, the next call starts a new one and is retried once
+    (``reconnects`` counts how often that happened).
+    """
+    
+    def __init__(self, server_script: Optional[str] = None, command: Optional[str] = None):
+        self.server_script = server_script or str(Path(__file__).parent / "mcp_calculator_server.py")
+        self.command = command or sys.executable
+        self.tools = {}
+        self.bridge = BackgroundEventLoop(name="mcp-session-loop")
+        self._session = None
+        self._ready: Optional[asyncio.Event] = None
+        self._closing: Optional[asyncio.Event] = None
+        self._session_task: Optional[asyncio.Task] = None
+        # Created on the bridge loop, where all session work runs
+        self._reconnect_lock: Optional[asyncio.Lock] = None
+        self.reconnects = 0
+    
+    async def _on_bridge(self, coro):
+        """Await a coroutine on the bridge loop from whichever loop we're on"""
+        if self.bridge.in_loop_thread():
+            return await coro
+        return await asyncio.wrap_future(self.bridge.submit(coro))
+    
+    async def initialize(self):
+        """Spawn the server, open the session and load its tool list"""
+        await self._on_bridge(self._start_session())
+    
+    def initialize_sync(self):
+        """Blocking variant of initialize() for non-async callers"""
+        self.bridge.run(self._start_session())
+    
+    async def _start_session(self):
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._session_task = asyncio.create_task(self._session_main())
+        await self._ready.wait()
+        # Surface startup failures (e.g. server crashed) to the caller
+        if self._session_task.done():
+            self._session_task.result()
+    
+    async def _session_main(self):
+        """Own the stdio/session context managers for the session's lifetime
+        
+        anyio task groups must be entered and exited from the same task, so
+        the contexts are held open here until close() sets ``_closing``.
+        """
+        # Imported lazily so the simulated client works without the mcp package
+        from mcp import ClientSession, StdioServerParameters
+        from mcp.client.stdio import stdio_client
+        
+        server_params = StdioServerParameters(command=self.command, args=[self.server_script])
+        try:
+            async with AsyncExitStack() as stack:
+                read, write = await stack.enter_async_context(stdio_client(server_params))
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+                
+                listed = await session.list_tools()
+                self.tools = {
+                    tool.name: {
+                        "name": tool.name,
+                        "description": tool.description or "",
+                        "annotations": tool.annotations.model_dump(by_alias=True, exclude_none=True)
+                        if tool.annotations else {},
+                    }
+                    for tool in listed.tools
+                }
+                self._session = session
+                self._ready.set()
+                await self._closing.wait()
         finally:
-            loop.close()
+            self._session = None
+            self._ready.set()
+    
+    async def call_tool(self, tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Call a tool over the persistent session"""
+        return await self._on_bridge(self._call_tool(tool_name, args))
+    
+    async def _call_tool(self, tool_name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        if self._session_task is None:
+            raise RuntimeError("MCP session is not initialized")
+        session = self._session
+        if session is not None:
+            try:
+                return self._format_result(await session.call_tool(tool_name, args))
+            except Exception as e:
+                if not _connection_lost(e):
+                    raise
+        await self._reconnect(session)
+        return self._format_result(await self._session.call_tool(tool_name, args))
+    
+    async def _reconnect(self, lost):
+        """Replace the session ``lost`` with a new server and session (once, however many calls noticed)"""
+        if self._reconnect_lock is None:
+            self._reconnect_lock = asyncio.Lock()
+        async with self._reconnect_lock:
+            if self._session is lost:
+                await self._stop_session()
+                await self._start_session()
+                self.reconnects += 1
+        if self._session is None:
+            raise RuntimeError("MCP server connection was lost and could not be re-established")
     
-    async def _call_tool_async(self, args: Dict[str, Any]) -> str:
-        """Async method to call MCP tool"""
+    @staticmethod
+    def _format_result(result) -> Dict[str, Any]:
+        return {
+            "content": [
+                {"type": item.type, "text": getattr(item, "text", str(item))}
+                for item in result.content
+            ]
+        }
+    
+    def call_tool_sync(self, tool_name: str, args: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Blocking tool call for sync callers"""
+        return self.bridge.run(self._call_tool(tool_name, args), timeout=timeout)
+    
+    async def _stop_session(self):
+        if self._closing is not None:
+            self._closing.set()
+        if self._session_task is not None:
+            try:
+                await self._session_task
+            except Exception:
+                pass
+    
+    def close(self):
+        """Shut down the session, the server subprocess and the bridge loop"""
+        if self.bridge.loop.is_closed():
+            return
         try:
-            result = await self.mcp_client.call_tool(self.tool_name, args)
-            if isinstance(result, dict) and "content" in result:
-                # Extract text from MCP response format
-                content = result["content"]
-                if isinstance(content, list) and len(content) > 0:
-                    return content[0].get("text", str(content))
-            return str(result)
-        except Exception as e:
-            return f"Error calling MCP tool: {str(e)}"
+            self.bridge.run(self._stop_session(), timeout=10)
+        finally:
+            self.bridge.close()
+
 
 class SimpleMCPClient:
     """Simplified MCP client for demo purposes"""
@@ -107,10 +318,12 @@ class SimpleMCPClient:
             "calculate": {
                 "name": "calculate",
                 "description": "Perform mathematical calculations. Supports basic arithmetic (+, -, *, /, //, %, **), trigonometry (sin, cos, tan), and other math functions (sqrt, log, exp, abs).",
+                "annotations": {"pure": True},
             },
             "convert_units": {
                 "name": "convert_units",
-                "description": "Convert between different units (length, weight, temperature). Format: 'value from_unit to to_unit'"
+                "description": "Convert between different units (length, weight, temperature). Format: 'value from_unit to to_unit'",
+                "annotations": {"pure": True},
             }
         }
     
@@ -210,15 +423,19 @@ class ReactAgentCallback(BaseCallbackHandler):
         """Called when agent finishes"""
         console.print(f"\n[bold green]✅ 智能体完成[/bold green]")
 
-async def create_mcp_tools(mcp_client: SimpleMCPClient) -> List[Tool]:
-    """Create LangChain tools from MCP client"""
+async def create_mcp_tools(mcp_client, cache: Optional[ToolResultCache] = None) -> List[Tool]:
+    """Create LangChain tools from MCP client
+    
+    With a ``cache``, results of tools annotated as pure are memoized.
+    """
     tools = []
     
     for tool_name, tool_info in mcp_client.tools.items():
         wrapper = MCPToolWrapper(
             tool_name=tool_name,
             tool_description=tool_info["description"],
-            mcp_client=mcp_client
+            mcp_client=mcp_client,
+            cache=cache if cache is not None and is_pure_tool(tool_info) else None
         )
         
         tool = Tool(
@@ -283,14 +500,24 @@ async def main():
         border_style="cyan"
     ))
     
+    mcp_client = None
     try:
-        # 初始化 MCP 客户端
+        # 初始化 MCP 客户端（持久会话连接到 mcp_calculator_server.py）
         console.print("\n[yellow]正在初始化 MCP 客户端...[/yellow]")
-        mcp_client = SimpleMCPClient()
-        await mcp_client.initialize()
+        try:
+            mcp_client = PersistentMCPClient()
+            await mcp_client.initialize()
+            console.print("[green]✅ 已连接 MCP 计算器服务器（持久会话）[/green]")
+        except Exception as e:
+            console.print(f"[yellow]⚠️ 无法连接 MCP 服务器，使用模拟客户端: {str(e)}[/yellow]")
+            if mcp_client is not None:
+                mcp_client.close()
+            mcp_client = SimpleMCPClient()
+            await mcp_client.initialize()
         
-        # 创建 MCP 工具
-        tools = await create_mcp_tools(mcp_client)
+        # 创建 MCP 工具（纯函数工具的结果会被缓存）
+        tool_cache = ToolResultCache(max_entries=512, default_ttl=3600)
+        tools = await create_mcp_tools(mcp_client, cache=tool_cache)
         
         # 初始化 DeepSeek LLM
         llm = ChatOpenAI(
@@ -349,11 +576,16 @@ async def main():
             
             console.print("\n" + "="*50 + "\n")
         
+        console.print(f"[dim]{tool_cache.format_report()}[/dim]")
+        
     except Exception as e:
         console.print(f"[red]❌ 演示失败: {str(e)}[/red]")
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if isinstance(mcp_client, PersistentMCPClient):
+            mcp_client.close()
     
     console.print("\n[bold green]👋 演示完成！[/bold green]")
 
@@ -0,0 +1,285 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = []
+# ///
+
+"""
+Directory Analyzer
+Incremental, parallel code statistics for a directory tree: an os.scandir
+walk that honours ignore rules, per-file analysis across a process pool,
+and a cache keyed by (path, mtime, size) so re-runs only touch changed files.
+"""
+
+import fnmatch
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from code_metrics import analyze_source
+
+CODE_EXTENSIONS = ('.py', '.js', '.ts', '.java', '.cpp', '.c', '.h')
+
+DEFAULT_IGNORES = (
+    '.git', '.hg', '.svn', 'node_modules', '__pycache__', '.venv', 'venv', 'env',
+    '.tox', '.nox', '.mypy_cache', '.pytest_cache', '.ruff_cache', 'dist', 'build', '*.egg-info',
+)
+
+CACHE_VERSION = 2
+
+def analyze_file(path: str) -> Dict[str, Any]:
+    """Metrics for one source file (module-level so it can run in a worker process)"""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            content = f.read()
+    except OSError as e:
+        return {'error': str(e)}
+
+    extension = os.path.splitext(path)[1]
+    code = analyze_source(content, extension)
+    return {
+        'lines': content.count('\n') + 1,
+        'size': len(content),
+        'extension': extension,
+        'sloc': code.sloc,
+        'complexity': code.complexity,
+        'functions': code.functions,
+        'classes': code.classes,
+        'imports': len(code.imports),
+    }
+
+
+def _analyze_batch(paths: List[str]) -> List[Dict[str, Any]]:
+    return [analyze_file(path) for path in paths]
+
+
+class IgnoreRules:
+    """Directory/file ignore rules: built-in defaults plus a root .gitignore
+
+    Supports the common subset of gitignore syntax: glob patterns matched
+    against the name (or the root-relative path when they contain a slash),
+    a trailing ``/`` for directory-only patterns, and ``#`` comments.
+    Negation (``!pattern``) is not supported and such lines are skipped.
+    """
+
+    def __init__(self, patterns: Tuple[str, ...] = DEFAULT_IGNORES):
+        self._name_patterns: List[Tuple[str, bool]] = []
+        self._path_patterns: List[Tuple[str, bool]] = []
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, pattern: str):
+        pattern = pattern.strip()
+        if not pattern or pattern.startswith(('#', '!')):
+            return
+        dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        if '/' in pattern:
+            self._path_patterns.append((pattern.lstrip('/'), dir_only))
+        else:
+            self._name_patterns.append((pattern, dir_only))
+
+    @classmethod
+    def for_root(cls, root: Path, use_gitignore: bool = True) -> "IgnoreRules":
+        rules = cls()
+        gitignore = root / '.gitignore'
+        if use_gitignore and gitignore.is_file():
+            for line in gitignore.read_text(encoding='utf-8', errors='replace').splitlines():
+                rules.add(line)
+        return rules
+
+    def ignored(self, name: str, rel_path: str, is_dir: bool) -> bool:
+        for pattern, dir_only in self._name_patterns:
+            if (is_dir or not dir_only) and fnmatch.fnmatch(name, pattern):
+                return True
+        for pattern, dir_only in self._path_patterns:
+            if (is_dir or not dir_only) and fnmatch.fnmatch(rel_path, pattern):
+                return True
+        return False
+
+
+@dataclass
+class DirectoryReport:
+    """Result of one DirectoryAnalyzer.analyze() run"""
+    root: str
+    total_files: int = 0
+    subdirectories: int = 0
+    files: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    analyzed: int = 0
+    from_cache: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def code_files(self) -> int:
+        return len(self.files)
+
+    @property
+    def by_extension(self) -> Counter:
+        return Counter(metrics.get('extension', '') for metrics in self.files.values())
+
+    def totals(self) -> Dict[str, int]:
+        totals = Counter()
+        for metrics in self.files.values():
+            for key in ('lines', 'sloc', 'complexity', 'functions', 'classes', 'imports'):
+                totals[key] += metrics.get(key, 0)
+        return dict(totals)
+
+    def format(self) -> str:
+        result = f"Directory Analysis: {Path(self.root).name}\n"
+        result += f"Total files: {self.total_files}\n"
+        result += f"Code files: {self.code_files}\n"
+        result += f"Subdirectories: {self.subdirectories}\n"
+
+        if self.files:
+            result += "\nCode files by type:\n"
+            for ext, count in self.by_extension.items():
+                result += f"  {ext}: {count} files\n"
+
+            totals = self.totals()
+            result += f"\nLines of code: {totals.get('lines', 0)} ({totals.get('sloc', 0)} source)\n"
+            result += f"Functions: {totals.get('functions', 0)}\n"
+            result += f"Classes: {totals.get('classes', 0)}\n"
+
+        result += f"\nAnalyzed {self.analyzed} changed files, {self.from_cache} unchanged from cache ({self.elapsed:.2f}s)\n"
+        return result
+
+
+class DirectoryAnalyzer:
+    """Walks a tree and analyses code files, reusing cached results for unchanged files
+
+    Files whose (mtime, size) match the cache are not reopened. When at least
+    ``parallel_threshold`` files need analysing they are spread over a
+    process pool; smaller batches run inline, where process start-up would
+    cost more than it saves. With ``cache_path`` the cache is persisted as
+    JSON between runs.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, workers: Optional[int] = None,
+                 parallel_threshold: int = 200, extensions: Tuple[str, ...] = CODE_EXTENSIONS,
+                 use_gitignore: bool = True):
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self.extensions = tuple(extensions)
+        self.use_gitignore = use_gitignore
+        self._cache: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        if self.cache_path:
+            self._load_cache()
+
+    def _load_cache(self):
+        try:
+            data = json.loads(self.cache_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return
+        if data.get('version') != CACHE_VERSION:
+            return
+        self._cache = {path: tuple(entry) for path, entry in data.get('files', {}).items()}
+
+    def save_cache(self):
+        """Write the cache to ``cache_path`` (atomically, via a temp file)"""
+        if not self.cache_path:
+            return
+        with self._lock:
+            data = {'version': CACHE_VERSION, 'files': {path: list(entry) for path, entry in self._cache.items()}}
+        tmp_path = self.cache_path.with_name(self.cache_path.name + '.tmp')
+        tmp_path.write_text(json.dumps(data), encoding='utf-8')
+        os.replace(tmp_path, self.cache_path)
+
+    def walk(self, root: Path) -> Iterator[Tuple[str, str, os.stat_result]]:
+        """Yield (path, kind, stat) for every non-ignored entry under ``root``
+
+        ``kind`` is ``'dir'`` or ``'file'``; symlinks are not followed.
+        """
+        rules = IgnoreRules.for_root(root, self.use_gitignore)
+        stack = [str(root)]
+        root_prefix = len(str(root)) + 1
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                            if not is_dir and not entry.is_file(follow_symlinks=False):
+                                continue
+                            rel_path = entry.path[root_prefix:].replace(os.sep, '/')
+                            if rules.ignored(entry.name, rel_path, is_dir):
+                                continue
+                            if is_dir:
+                                stack.append(entry.path)
+                                yield entry.path, 'dir', None
+                            else:
+                                yield entry.path, 'file', entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def analyze(self, root: str) -> DirectoryReport:
+        """Analyse every code file under ``root`` and return a DirectoryReport"""
+        start = time.perf_counter()
+        root_path = Path(root).resolve()
+        report = DirectoryReport(root=str(root_path))
+        stale: List[Tuple[str, int, int]] = []
+
+        with self._lock:
+            for path, kind, stat in self.walk(root_path):
+                if kind == 'dir':
+                    report.subdirectories += 1
+                    continue
+                report.total_files += 1
+                if not path.endswith(self.extensions):
+                    continue
+                cached = self._cache.get(path)
+                if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                    report.files[path] = cached[2]
+                    report.from_cache += 1
+                else:
+                    stale.append((path, stat.st_mtime_ns, stat.st_size))
+
+        results = self._run([path for path, _, _ in stale])
+        with self._lock:
+            # Forget files under this root that have since been deleted or ignored
+            prefix = str(root_path) + os.sep
+            seen = {path for path, _, _ in stale}.union(report.files)
+            for path in [p for p in self._cache if p.startswith(prefix) and p not in seen]:
+                del self._cache[path]
+            for (path, mtime_ns, size), metrics in zip(stale, results):
+                report.files[path] = metrics
+                if 'error' not in metrics:
+                    self._cache[path] = (mtime_ns, size, metrics)
+        report.analyzed = len(stale)
+        report.elapsed = time.perf_counter() - start
+
+        if stale and self.cache_path:
+            self.save_cache()
+        return report
+
+    def _run(self, paths: List[str]) -> List[Dict[str, Any]]:
+        if len(paths) < self.parallel_threshold or self.workers <= 1:
+            return _analyze_batch(paths)
+        # Chunk the work so each task amortises the pickling round trip
+        chunk = max(16, len(paths) // (self.workers * 4))
+        batches = [paths[i:i + chunk] for i in range(0, len(paths), chunk)]
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return [metrics for batch in pool.map(_analyze_batch, batches) for metrics in batch]
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "."
+    analyzer = DirectoryAnalyzer(cache_path=sys.argv[2] if len(sys.argv) > 2 else None)
+    print(analyzer.analyze(target).format())
+    print(analyzer.analyze(target).format())
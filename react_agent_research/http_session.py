@@ -0,0 +1,434 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#   "requests>=2.31.0",
+#   "urllib3>=2.0.0",
+#   "httpx>=0.24.0",
+# ]
+# ///
+
+"""
+Pooled HTTP Session
+A shared keep-alive HTTP layer for the agent tools: per-host connection
+pools, retries with jittered backoff on 429/5xx, and per-request timing
+(DNS, connect, TLS, time to first byte) for instrumentation. A sync client
+(requests) and an async client (httpx) share the same policy.
+"""
+
+import asyncio
+import random
+import socket
+import threading
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Deque, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.exceptions import NameResolutionError, NewConnectionError, ConnectTimeoutError
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+DEFAULT_USER_AGENT = "react-agent-research/1.0"
+
+
+@dataclass
+class RequestTiming:
+    """Timing breakdown for one HTTP request, in milliseconds"""
+    method: str
+    url: str
+    host: str
+    status: Optional[int]
+    total_ms: float
+    ttfb_ms: float
+    dns_ms: Optional[float] = None
+    connect_ms: Optional[float] = None
+    tls_ms: Optional[float] = None
+    reused_connection: bool = True
+    attempts: int = 1
+    error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class _TimingConnectionMixin:
+    """Records DNS / TCP connect / TLS handshake durations on new connections"""
+
+    connect_timing: Optional[Dict[str, float]] = None
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        resolved = time.perf_counter()
+
+        # Connect to the addresses we just resolved so DNS is only paid once
+        original_host = self._dns_host
+        last_error: Optional[Exception] = None
+        try:
+            for address in dict.fromkeys(info[4][0] for info in addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    last_error = e
+            else:
+                raise last_error
+        finally:
+            self._dns_host = original_host
+
+        self.connect_timing = {
+            "dns_ms": (resolved - start) * 1000,
+            "connect_ms": (time.perf_counter() - resolved) * 1000,
+        }
+        return sock
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        if self.connect_timing is not None and isinstance(self, HTTPSConnection):
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.connect_timing["tls_ms"] = max(
+                0.0, elapsed_ms - self.connect_timing["dns_ms"] - self.connect_timing["connect_ms"]
+            )
+
+
+class TimingHTTPConnection(_TimingConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimingHTTPSConnection(_TimingConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimingHTTPConnection
+
+
+class TimingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimingHTTPSConnection
+
+
+class TimingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools record connection timings and time to first byte"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimingHTTPConnectionPool,
+            "https": TimingHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        start = time.perf_counter()
+        response = super().send(request, **kwargs)
+        # Headers are parsed but the body is not read yet
+        response.ttfb_ms = (time.perf_counter() - start) * 1000
+
+        connection = getattr(response.raw, "_connection", None)
+        timing = getattr(connection, "connect_timing", None)
+        if timing is not None:
+            # Consume so a later request reusing this connection reports it as reused
+            connection.connect_timing = None
+        response.connect_timing = timing
+
+        retries = getattr(response.raw, "retries", None)
+        response.attempts = len(retries.history) + 1 if retries is not None else 1
+        return response
+
+
+class _TimingRecorder:
+    """Bounded log of RequestTiming records plus listener fan-out"""
+
+    def __init__(self, max_timings: int):
+        self.timings: Deque[RequestTiming] = deque(maxlen=max_timings)
+        self._listeners: List[Callable[[RequestTiming], None]] = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[RequestTiming], None]):
+        """Call ``listener`` with each RequestTiming as requests complete"""
+        self._listeners.append(listener)
+
+    def _append(self, timing: RequestTiming):
+        with self._lock:
+            self.timings.append(timing)
+        for listener in self._listeners:
+            try:
+                listener(timing)
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregate view of the recorded timings"""
+        with self._lock:
+            timings = list(self.timings)
+        if not timings:
+            return {"requests": 0}
+        totals = sorted(t.total_ms for t in timings)
+        return {
+            "requests": len(timings),
+            "reused_connections": sum(t.reused_connection for t in timings),
+            "retried_requests": sum(t.attempts > 1 for t in timings),
+            "errors": sum(t.error is not None for t in timings),
+            "mean_total_ms": round(sum(totals) / len(totals), 3),
+            "max_total_ms": totals[-1],
+        }
+
+
+class PooledHTTPClient(_TimingRecorder):
+    """Thread-safe, keep-alive HTTP client shared by all tools
+
+    Args:
+        pool_maxsize: Max connections kept per host (blocking beyond it).
+        pool_connections: Number of per-host pools to cache.
+        retries: Retry attempts on connection errors and 429/5xx.
+        backoff_factor: Exponential backoff base in seconds.
+        backoff_jitter: Random jitter (seconds) added to every backoff.
+        timeout: Default (connect, read) timeout.
+        max_timings: How many recent RequestTiming records to keep.
+    """
+
+    def __init__(self, pool_maxsize: int = 10, pool_connections: int = 32, retries: int = 3,
+                 backoff_factor: float = 0.3, backoff_jitter: float = 0.3,
+                 timeout: Any = (5, 10), max_timings: int = 1000,
+                 retry_methods: Optional[frozenset] = None):
+        super().__init__(max_timings)
+        self.timeout = timeout
+        self.retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            status_forcelist=RETRY_STATUSES,
+            # POST is not idempotent, so by default it is only retried on connection errors
+            allowed_methods=retry_methods if retry_methods is not None else Retry.DEFAULT_ALLOWED_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = DEFAULT_USER_AGENT
+        adapter = TimingHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                    max_retries=self.retry, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the shared pool and record its timing"""
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        response = None
+        error = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+            return response
+        except requests.RequestException as e:
+            error = str(e)
+            raise
+        finally:
+            self._record(method, url, start, response, error)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _record(self, method: str, url: str, start: float, response: Optional[requests.Response],
+                error: Optional[str]):
+        total_ms = (time.perf_counter() - start) * 1000
+        connect_timing = getattr(response, "connect_timing", None)
+        if not isinstance(connect_timing, dict):
+            connect_timing = {}
+        ttfb_ms = getattr(response, "ttfb_ms", None)
+        attempts = getattr(response, "attempts", 1)
+        timing = RequestTiming(
+            method=method.upper(),
+            url=url,
+            host=urlsplit(url).netloc,
+            status=getattr(response, "status_code", None),
+            total_ms=round(total_ms, 3),
+            ttfb_ms=round(ttfb_ms if isinstance(ttfb_ms, (int, float)) else total_ms, 3),
+            dns_ms=_rounded(connect_timing.get("dns_ms")),
+            connect_ms=_rounded(connect_timing.get("connect_ms")),
+            tls_ms=_rounded(connect_timing.get("tls_ms")),
+            reused_connection=not connect_timing,
+            attempts=attempts if isinstance(attempts, int) else 1,
+            error=error,
+        )
+        self._append(timing)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncPooledHTTPClient(_TimingRecorder):
+    """Async counterpart of PooledHTTPClient built on httpx.AsyncClient
+
+    Same retry policy (jittered exponential backoff on connection errors and
+    429/5xx, POST only on connection errors) and per-host connection limit.
+    Timings come from httpcore trace events; DNS time is included in
+    ``connect_ms`` because httpcore resolves inside connect_tcp.
+    """
+
+    def __init__(self, pool_maxsize: int = 10, max_connections: int = 100, retries: int = 3,
+                 backoff_factor: float = 0.3, backoff_jitter: float = 0.3,
+                 timeout: Any = (5, 10), max_timings: int = 1000,
+                 retry_methods: Optional[frozenset] = None):
+        super().__init__(max_timings)
+        connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.retry_methods = retry_methods if retry_methods is not None else Retry.DEFAULT_ALLOWED_METHODS
+        self.pool_maxsize = pool_maxsize
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={"User-Agent": DEFAULT_USER_AGENT},
+        )
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    def _slot(self, host: str) -> asyncio.Semaphore:
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.pool_maxsize)
+        return self._host_slots[host]
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff_factor * (2 ** (attempt - 1)) + random.uniform(0, self.backoff_jitter)
+
+    async def request(self, method: str, url: str, timeout: Any = None, **kwargs) -> httpx.Response:
+        """Send a request through the shared pool, retrying per policy, and record its timing"""
+        method = method.upper()
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        phases: Dict[str, float] = {}
+
+        async def trace(event_name: str, info: Dict[str, Any]):
+            phases[event_name] = time.perf_counter()
+
+        start = time.perf_counter()
+        response: Optional[httpx.Response] = None
+        error: Optional[str] = None
+        attempt = 0
+        try:
+            async with self._slot(urlsplit(url).netloc):
+                while True:
+                    attempt += 1
+                    phases.clear()
+                    phases["start"] = time.perf_counter()
+                    try:
+                        response = await self.client.request(method, url, extensions={"trace": trace}, **kwargs)
+                    except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                        if attempt > self.retries:
+                            raise
+                        error = str(e)
+                        await asyncio.sleep(self._backoff(attempt, None))
+                        continue
+                    error = None
+                    if (response.status_code in RETRY_STATUSES and method in self.retry_methods
+                            and attempt <= self.retries):
+                        await asyncio.sleep(self._backoff(attempt, response))
+                        continue
+                    return response
+        except httpx.HTTPError as e:
+            error = str(e)
+            raise
+        finally:
+            self._record(method, url, start, response, error, attempt, phases)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    def _record(self, method: str, url: str, start: float, response: Optional[httpx.Response],
+                error: Optional[str], attempts: int, phases: Dict[str, float]):
+        def span(begin: str, end: str) -> Optional[float]:
+            if begin in phases and end in phases:
+                return (phases[end] - phases[begin]) * 1000
+            return None
+
+        connect_ms = span("connection.connect_tcp.started", "connection.connect_tcp.complete")
+        ttfb_ms = span("start", "http11.receive_response_headers.complete") or span(
+            "start", "http2.receive_response_headers.complete")
+        total_ms = (time.perf_counter() - start) * 1000
+        self._append(RequestTiming(
+            method=method,
+            url=url,
+            host=urlsplit(url).netloc,
+            status=response.status_code if response is not None else None,
+            total_ms=round(total_ms, 3),
+            ttfb_ms=round(ttfb_ms if ttfb_ms is not None else total_ms, 3),
+            connect_ms=_rounded(connect_ms),
+            tls_ms=_rounded(span("connection.start_tls.started", "connection.start_tls.complete")),
+            reused_connection=response is not None and "connection.connect_tcp.started" not in phases,
+            attempts=attempts,
+            error=error,
+        ))
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+_shared_client: Optional[PooledHTTPClient] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_client() -> PooledHTTPClient:
+    """Process-wide PooledHTTPClient used by tools that aren't given their own"""
+    global _shared_client
+    with _shared_lock:
+        if _shared_client is None:
+            _shared_client = PooledHTTPClient()
+        return _shared_client
+
+
+_shared_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncPooledHTTPClient]" = \
+    weakref.WeakKeyDictionary()
+
+
+def get_shared_async_client() -> AsyncPooledHTTPClient:
+    """AsyncPooledHTTPClient shared by all tools running on the current event loop
+
+    httpx connections are bound to the loop that opened them, so there is one
+    shared client per loop rather than per process.
+    """
+    loop = asyncio.get_running_loop()
+    with _shared_lock:
+        client = _shared_async_clients.get(loop)
+        if client is None:
+            client = AsyncPooledHTTPClient()
+            _shared_async_clients[loop] = client
+        return client
+
+
+if __name__ == "__main__":
+    client = get_shared_client()
+    for _ in range(3):
+        client.get("https://api.duckduckgo.com/", params={"q": "python", "format": "json"})
+    for timing in client.timings:
+        print(timing.as_dict())
+    print(client.stats())
@@ -14,26 +14,100 @@
 # ]
 # ///
 
+import asyncio
+import contextlib
+import contextvars
 import os
 import re
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, AsyncIterator, Iterator, Optional, Tuple, Union
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.syntax import Syntax
 from rich.panel import Panel
 from rich.table import Table
 
-from langchain.agents import Tool, AgentExecutor, create_react_agent
+from langchain.agents import Tool, create_react_agent, create_tool_calling_agent
 from langchain.schema import AgentAction, AgentFinish
 from langchain.memory import ConversationBufferMemory
 from langchain.callbacks.base import BaseCallbackHandler
 from langchain.callbacks.manager import CallbackManager
-from langchain import hub
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.tools import StructuredTool
+
+from agent_budget import ERROR_OBSERVATION, BudgetedAgentExecutor, RunReport, StepBudget
+from agent_events import AgentError, AgentEvent, from_langchain_events, iterate_in_thread
+from agent_tracing import AgentTracer
+from llm_cache import LLMResponseCache
+from llm_router import RoutedChatModel
+from prompt_registry import PromptRegistry, get_default_registry, with_chat_history
+from summarizing_memory import SummarizingMemory
+from tool_result_cache import ToolCacheMiddleware, ToolResultCache
 
 console = Console()
 
+# Model used for each provider when none is chosen explicitly, in failover order
+DEFAULT_MODELS = {
+    "deepseek": "deepseek-chat",
+    "openai": "gpt-4",
+    "anthropic": "claude-3-sonnet-20240229",
+}
+
+PROVIDER_API_KEYS = {
+    "deepseek": "DEEPSEEK_API_KEY",
+    "openai": "OPENAI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+}
+
+# Tools whose results the agent memoizes by default, with their TTL in seconds
+# (None = never expires). file_system only caches its read operations.
+DEFAULT_TOOL_TTLS = {
+    "web_search": 600.0,
+    "calculator": None,
+    "code_analysis": 60.0,
+    "file_system": 60.0,
+}
+
+_FILE_SYSTEM_READ = re.compile(r"\s*(?:read|read_bytes|read_lines|tail|grep):", re.IGNORECASE)
+
+
+def _cacheable_result(result: Any) -> bool:
+    """Error observations ("Search error: ...") are retried rather than cached"""
+    return not (isinstance(result, str) and ERROR_OBSERVATION.match(result))
+
+
+# Bounds how many of one run's tool calls execute at once (set by arun())
+_tool_slots: contextvars.ContextVar[Optional[asyncio.Semaphore]] = contextvars.ContextVar(
+    "tool_slots", default=None)
+
+
+def _limit_concurrency(tool: Any) -> Any:
+    """Return a copy of a tool whose async calls wait for a slot in the current run"""
+    coroutine = getattr(tool, "coroutine", None)
+    func = getattr(tool, "func", None)
+
+    async def call(*args, **kwargs):
+        slots = _tool_slots.get()
+        run = coroutine(*args, **kwargs) if coroutine else asyncio.to_thread(func, *args, **kwargs)
+        if slots is None:
+            return await run
+        async with slots:
+            return await run
+
+    if isinstance(tool, StructuredTool):
+        return StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            func=func,
+            coroutine=call,
+            response_format=getattr(tool, "response_format", "content"),
+            metadata=tool.metadata,
+        )
+    return Tool(name=tool.name, description=tool.description, func=func, coroutine=call, metadata=tool.metadata)
+
+
 class ReactAgentCallback(BaseCallbackHandler):
     """Custom callback handler for ReAct agent to display reasoning process"""
     
@@ -68,31 +142,111 @@ class ReactAgentCallback(BaseCallbackHandler):
 class LangChainReactAgent:
     """LangChain ReAct Agent implementation with custom tools and reasoning display"""
     
-    def __init__(self, llm_provider: str = "openai", model_name: str = "gpt-4", verbose: bool = True):
+    def __init__(self, llm_provider: str = "openai", model_name: str = "gpt-4", verbose: bool = True,
+                 tool_cache: Union[str, ToolResultCache, None] = "run",
+                 tool_ttls: Optional[Dict[str, Optional[float]]] = None,
+                 agent_mode: str = "react", max_parallel_tools: int = 4,
+                 prompt_registry: Optional[PromptRegistry] = None, prompt_name: str = "hwchase17/react",
+                 memory: str = "buffer", memory_token_limit: int = 2000,
+                 llm_cache: Union[str, LLMResponseCache, None] = None, budget: Optional[StepBudget] = None,
+                 tracing: bool = False):
         """
         Initialize the ReAct agent
         
         Args:
-            llm_provider: "openai", "anthropic", or "deepseek"
+            llm_provider: "openai", "anthropic", "deepseek", or "routed" to fail over across
+                every provider with an API key (DEFAULT_MODELS; model_name is ignored)
             model_name: Model name (e.g., "gpt-4", "claude-3-sonnet-20240229", "deepseek-chat")
             verbose: Whether to display reasoning process
+            tool_cache: "run" to memoize tool results within each run(), "agent" to keep
+                them across runs, a ToolResultCache to share across agents, or None to disable
+            tool_ttls: Tool name -> TTL in seconds for cached tools (default DEFAULT_TOOL_TTLS)
+            agent_mode: "react" for the text ReAct loop (one action per step), or "tool_calling"
+                to use the provider's native tool calling, where the model may request several
+                tools in one step and they run concurrently
+            max_parallel_tools: Cap on concurrently running tool calls within one step
+            prompt_registry: Where the ReAct prompt comes from (default: the shared registry,
+                which serves cached or bundled prompts without a network round trip)
+            prompt_name: Hub name of the ReAct prompt to use
+            memory: "buffer" keeps the whole conversation; "summary" keeps recent messages
+                within memory_token_limit and summarizes older ones in the background
+            memory_token_limit: Token budget for verbatim history with memory="summary"
+            llm_cache: Persistent LLM response cache: an LLMResponseCache, a database path, or
+                "default" for DEFAULT_DB_PATH. Enabling it runs the LLM at temperature 0 so
+                identical prompts give identical, cacheable answers, and without token streaming,
+                which would bypass the cache
+            budget: Step, time, token, repeated-action and confidence limits for each run
+                (default: StepBudget(), 10 steps; loop detection is opt-in with max_repeats)
+            tracing: Record span timings of every LLM, tool, prompt and parser call in each
+                run; the last run's AgentTracer is kept in last_trace for reports and export
         """
+        if agent_mode not in ("react", "tool_calling"):
+            raise ValueError(f"Unsupported agent_mode: {agent_mode}")
+        if memory not in ("buffer", "summary"):
+            raise ValueError(f"Unsupported memory: {memory}")
         load_dotenv()
         
         self.console = Console()
         self.verbose = verbose
+        self.agent_mode = agent_mode
+        self.max_parallel_tools = max_parallel_tools
+        self.budget = budget or StepBudget()
+        self.last_run_report: Optional[RunReport] = None
+        self.tracing = tracing
+        self.last_trace: Optional[AgentTracer] = None
+        self.llm_provider = llm_provider
+        self.model_name = model_name
         
         # Initialize LLM
-        self.llm = self._initialize_llm(llm_provider, model_name)
+        self.llm = self._initialize_llm(llm_provider, model_name, temperature=0 if llm_cache is not None else None)
+        self.llm_cache = None
+        if llm_cache is not None:
+            self.llm_cache = (llm_cache if isinstance(llm_cache, LLMResponseCache)
+                              else LLMResponseCache(None if llm_cache == "default" else llm_cache))
+            self.llm.cache = self.llm_cache
+            # BaseChatModel.stream() bypasses the cache, and the agent streams by default
+            self.llm.disable_streaming = True
+        self.last_llm_cache_stats = None
         
         # Initialize tools (will be set by subclasses or external setup)
         self.tools = []
+        # self.tools as handed to the executor (cache / concurrency wrappers applied)
+        self._agent_tools = []
+        
+        self.prompt_registry = prompt_registry or get_default_registry()
+        self.prompt_name = prompt_name
+        self._react_prompt = None
+        self._native_tool_calling = None
+        
+        # Tool result cache; identical concurrent calls are coalesced as well
+        self.tool_cache = None
+        if tool_cache is not None:
+            shared = isinstance(tool_cache, ToolResultCache)
+            self.tool_cache = ToolCacheMiddleware(
+                ttls=DEFAULT_TOOL_TTLS if tool_ttls is None else tool_ttls,
+                scope="agent" if shared or tool_cache == "agent" else "run",
+                cache=tool_cache if shared else None,
+                read_only={"file_system": _FILE_SYSTEM_READ.match},
+                should_cache=_cacheable_result,
+            )
+        self.last_tool_cache_stats = None
         
         # Initialize memory
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
-        )
+        if memory == "summary":
+            self.memory = SummarizingMemory(
+                llm=self.llm,
+                memory_key="chat_history",
+                return_messages=True,
+                output_key="output",
+                max_token_limit=memory_token_limit
+            )
+        else:
+            self.memory = ConversationBufferMemory(
+                memory_key="chat_history",
+                return_messages=True,
+                # astream_events() adds a "messages" output alongside "output"
+                output_key="output"
+            )
         
         # Initialize callback manager
         self.callback_manager = CallbackManager([ReactAgentCallback()]) if verbose else None
@@ -101,15 +255,15 @@ class LangChainReactAgent:
         self.agent = None
         self.agent_executor = None
     
-    def _initialize_llm(self, provider: str, model_name: str):
-        """Initialize the LLM based on provider"""
+    def _initialize_llm(self, provider: str, model_name: str, temperature: Optional[float] = None):
+        """Initialize the LLM based on provider (``temperature`` overrides the provider default)"""
         if provider == "openai":
             api_key = os.getenv("OPENAI_API_KEY")
             if not api_key:
                 raise ValueError("OPENAI_API_KEY not found in environment variables")
             return ChatOpenAI(
                 model=model_name,
-                temperature=0.1,
+                temperature=0.1 if temperature is None else temperature,
                 openai_api_key=api_key
             )
         elif provider == "anthropic":
@@ -118,7 +272,7 @@ class LangChainReactAgent:
                 raise ValueError("ANTHROPIC_API_KEY not found in environment variables")
             return ChatAnthropic(
                 model=model_name,
-                temperature=0.1,
+                temperature=0.1 if temperature is None else temperature,
                 anthropic_api_key=api_key
             )
         elif provider == "deepseek":
@@ -126,12 +280,18 @@ class LangChainReactAgent:
             if not api_key:
                 raise ValueError("DEEPSEEK_API_KEY not found in environment variables")
             return ChatOpenAI(
-                temperature=0,
+                temperature=0 if temperature is None else temperature,
                 model=model_name,
                 base_url="https://api.deepseek.com",
                 api_key=api_key,
                 max_tokens=8192
             )
+        elif provider == "routed":
+            models = {name: self._initialize_llm(name, default_model, temperature)
+                      for name, default_model in DEFAULT_MODELS.items() if os.getenv(PROVIDER_API_KEYS[name])}
+            if not models:
+                raise ValueError("No API key found. Please set DEEPSEEK_API_KEY, OPENAI_API_KEY, or ANTHROPIC_API_KEY")
+            return RoutedChatModel(models=models)
         else:
             raise ValueError(f"Unsupported provider: {provider}")
     
@@ -140,69 +300,116 @@ class LangChainReactAgent:
         self.tools.extend(tools)
         self._initialize_agent()
     
+    def _prepare_tools(self, tools: List[Tool]) -> List[Tool]:
+        """Apply the tool cache and, for native tool calling, the per-step concurrency cap"""
+        tools = self.tool_cache.wrap(tools) if self.tool_cache else list(tools)
+        if self._use_tool_calling():
+            tools = [_limit_concurrency(tool) for tool in tools]
+        return tools
+    
+    def _use_tool_calling(self) -> bool:
+        if self.agent_mode != "tool_calling":
+            return False
+        if self._native_tool_calling is None:
+            self._native_tool_calling = self._supports_tool_calling()
+            if not self._native_tool_calling and self.verbose:
+                self.console.print("[yellow]⚠️ This model does not support native tool calling; "
+                                   "using the ReAct text loop[/yellow]")
+        return self._native_tool_calling
+    
     def _initialize_agent(self):
-        """Initialize the ReAct agent with tools"""
+        """Initialize the ReAct agent with tools
+        
+        Only tools added since the last call are wrapped, and the prompt is
+        resolved once per agent, so add_tools() is cheap to call repeatedly.
+        """
         if not self.tools:
             raise ValueError("No tools provided. Add tools before initializing agent.")
         
-        # Get the ReAct prompt from hub
-        try:
-            react_prompt = hub.pull("hwchase17/react")
-        except Exception:
-            # Fallback to custom prompt if hub is not available
-            react_prompt = self._create_react_prompt()
+        if len(self._agent_tools) > len(self.tools):
+            # self.tools was replaced or shrunk externally; start over
+            self._agent_tools = []
+        self._agent_tools.extend(self._prepare_tools(self.tools[len(self._agent_tools):]))
+        tools = self._agent_tools
         
-        # Initialize agent
-        self.agent = create_react_agent(
-            llm=self.llm,
-            tools=self.tools,
-            prompt=react_prompt,
-        )
+        if self._use_tool_calling():
+            self.agent = create_tool_calling_agent(
+                llm=self.llm,
+                tools=tools,
+                prompt=self._create_tool_calling_prompt(),
+            )
+        else:
+            if self._react_prompt is None:
+                # The memory's history goes to the model as messages ahead of the question
+                self._react_prompt = with_chat_history(self.prompt_registry.get(self.prompt_name),
+                                                       self.memory.memory_key)
+            
+            # Initialize agent
+            self.agent = create_react_agent(
+                llm=self.llm,
+                tools=tools,
+                prompt=self._react_prompt,
+            )
         
         # Initialize agent executor
-        self.agent_executor = AgentExecutor(
+        self.agent_executor = BudgetedAgentExecutor(
             agent=self.agent,
-            tools=self.tools,
+            tools=tools,
             memory=self.memory,
             verbose=self.verbose,
-            max_iterations=10,
-            early_stopping_method="generate",
+            max_iterations=self.budget.max_iterations,
+            budget=self.budget,
+            # Writes the final answer when the budget stops the loop early
+            final_answer_llm=self.llm,
             callbacks=self.callback_manager.handlers if self.callback_manager else None,
             handle_parsing_errors=True,
             return_intermediate_steps=False
         )
     
-    def _create_react_prompt(self):
-        """Create a custom ReAct prompt template"""
-        from langchain.prompts import PromptTemplate
+    def _supports_tool_calling(self) -> bool:
+        """Whether the LLM implements bind_tools (native function/tool calling)"""
+        try:
+            self.llm.bind_tools(self.tools)
+        except NotImplementedError:
+            return False
+        return True
+    
+    def _create_tool_calling_prompt(self) -> ChatPromptTemplate:
+        """Prompt for the tool-calling agent; the tool schemas travel with the request, not the text"""
+        return ChatPromptTemplate.from_messages([
+            ("system",
+             "You are a helpful AI assistant. Use the available tools when they help answer the question. "
+             "When several tool calls are independent of each other, request them together in a single "
+             "step so they can run in parallel."),
+            MessagesPlaceholder("chat_history", optional=True),
+            ("human", "{input}"),
+            MessagesPlaceholder("agent_scratchpad"),
+        ])
+    
+    def run(self, question: str) -> str:
+        """Run the agent with a question"""
+        if not self.agent_executor:
+            raise ValueError("Agent not initialized. Add tools first.")
         
-        tool_descriptions = "\n".join([f"- {tool.name}: {tool.description}" for tool in self.tools])
+        if self.verbose:
+            self.console.print(f"\n[bold cyan]🚀 Starting ReAct Agent[/bold cyan]")
+            self.console.print(Panel(question, title="❓ Question", border_style="cyan"))
         
-        template = f"""You are a helpful AI assistant that uses a ReAct (Reasoning + Acting) approach to solve problems.
-
-You have access to the following tools:
-{tool_descriptions}
-
-Use the following format:
-
-Question: the input question you must answer
-Thought: you should always think about what to do
-Action: the action to take, should be one of [{', '.join([tool.name for tool in self.tools])}]
-Action Input: the input to the action
-Observation: the result of the action
-... (this Thought/Action/Action Input/Observation can repeat N times)
-Thought: I now know the final answer
-Final Answer: the final answer to the original input question
-
-Begin!
-
-Question: {{input}}
-Thought: {{agent_scratchpad}}"""
+        if self.agent_mode == "tool_calling":
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                # Tool calls from one step only overlap on the async path
+                return asyncio.run(self._arun(question))
         
-        return PromptTemplate.from_template(template)
+        with self._run_scope() as callbacks:
+            return self._invoke(question, callbacks)
     
-    def run(self, question: str) -> str:
-        """Run the agent with a question"""
+    async def arun(self, question: str, callbacks: Optional[List[BaseCallbackHandler]] = None) -> str:
+        """Async variant of run(); tool calls requested in the same step run concurrently
+
+        ``callbacks`` are attached to this run only (e.g. to collect its token usage).
+        """
         if not self.agent_executor:
             raise ValueError("Agent not initialized. Add tools first.")
         
@@ -210,11 +417,131 @@ Thought: {{agent_scratchpad}}"""
             self.console.print(f"\n[bold cyan]🚀 Starting ReAct Agent[/bold cyan]")
             self.console.print(Panel(question, title="❓ Question", border_style="cyan"))
         
+        return await self._arun(question, callbacks)
+    
+    async def _arun(self, question: str, callbacks: Optional[List[BaseCallbackHandler]] = None) -> str:
+        token = _tool_slots.set(asyncio.Semaphore(self.max_parallel_tools))
+        try:
+            with self._run_scope() as run_callbacks:
+                result = await self.agent_executor.ainvoke({"input": question},
+                                                           {"callbacks": (callbacks or []) + run_callbacks})
+            if isinstance(result, dict):
+                self._record_run(result)
+                return result.get("output", str(result))
+            return str(result)
+        except Exception as e:
+            error_msg = f"Agent execution failed: {str(e)}"
+            if self.verbose:
+                self.console.print(f"[bold red]❌ Error: {error_msg}[/bold red]")
+            return error_msg
+        finally:
+            _tool_slots.reset(token)
+
+    async def astream(self, question: str) -> AsyncIterator[AgentEvent]:
+        """Run the agent and yield typed events as they happen
+
+        Yields ThoughtToken for each chunk the LLM streams, ActionStart /
+        ActionEnd (with the tool's wall time) and Observation around every tool
+        call, and a FinalAnswer at the end. Failures are reported as an
+        AgentError event rather than raised, so a consumer forwarding the
+        events (e.g. as SSE with ``event.to_sse()``) always sees the run end.
+        """
+        if not self.agent_executor:
+            raise ValueError("Agent not initialized. Add tools first.")
+
+        # The run happens in a task of its own, which sets and resets the
+        # per-run context variables; a consumer that stops early (a closed SSE
+        # connection) just cancels it, whatever context closes this generator
+        events: asyncio.Queue = asyncio.Queue()
+        run = asyncio.ensure_future(self._astream_run(question, events))
+        try:
+            while True:
+                event = await events.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            if not run.done():
+                run.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await run
+
+    async def _astream_run(self, question: str, events: asyncio.Queue):
+        token = _tool_slots.set(asyncio.Semaphore(self.max_parallel_tools))
+        try:
+            with self._run_scope() as callbacks:
+                stream = self.agent_executor.astream_events({"input": question}, {"callbacks": callbacks},
+                                                            version="v2")
+                async for event in from_langchain_events(stream):
+                    events.put_nowait(event)
+        except Exception as e:
+            error_msg = f"Agent execution failed: {str(e)}"
+            if self.verbose:
+                self.console.print(f"[bold red]❌ Error: {error_msg}[/bold red]")
+            events.put_nowait(AgentError(message=error_msg))
+        finally:
+            _tool_slots.reset(token)
+            events.put_nowait(None)
+
+    def stream(self, question: str) -> Iterator[AgentEvent]:
+        """Synchronous variant of astream(); the run happens on a background event loop"""
+        if not self.agent_executor:
+            raise ValueError("Agent not initialized. Add tools first.")
+        return iterate_in_thread(lambda: self.astream(question))
+
+    @contextlib.contextmanager
+    def _run_scope(self):
+        """Record tool and LLM cache statistics (and the trace, if tracing) for one run
+
+        Yields the callbacks to pass in the run's config.
+        """
+        before = self.llm_cache.stats.snapshot() if self.llm_cache else None
+        tracer = AgentTracer() if self.tracing else None
+        try:
+            with self._tool_cache_scope():
+                yield [tracer] if tracer else []
+        finally:
+            if tracer is not None:
+                self.last_trace = tracer
+                if self.verbose:
+                    self.console.print(f"[dim]{tracer.format_report()}[/dim]")
+            if before is not None:
+                stats = self.llm_cache.stats.since(before)
+                self.last_llm_cache_stats = stats
+                if self.verbose:
+                    self.console.print(f"[dim]LLM cache: {stats.hits} hits, {stats.misses} misses "
+                                       f"({stats.hit_rate:.0%} hit rate)[/dim]")
+
+    @contextlib.contextmanager
+    def _tool_cache_scope(self):
+        """Run the block in a tool cache scope and record its statistics afterwards"""
+        if not self.tool_cache:
+            yield
+            return
+        scope = None
+        try:
+            with self.tool_cache.run_scope() as scope:
+                yield
+        finally:
+            # The scope fills in its stats on exit, so report after leaving it
+            if scope is not None:
+                self.last_tool_cache_stats = scope.stats
+                if self.verbose:
+                    self.console.print(f"[dim]{scope.format()}[/dim]")
+    
+    def _record_run(self, result: Dict[str, Any]):
+        """Keep the executor's report of why the run stopped"""
+        self.last_run_report = result.get("run_report")
+        if self.verbose and self.last_run_report:
+            self.console.print(f"[dim]{self.last_run_report.format()}[/dim]")
+    
+    def _invoke(self, question: str, callbacks: Optional[List[BaseCallbackHandler]] = None) -> str:
         try:
             # Use invoke instead of run for newer LangChain versions
-            result = self.agent_executor.invoke({"input": question})
+            result = self.agent_executor.invoke({"input": question}, {"callbacks": callbacks or []})
             # Extract the output from the result
             if isinstance(result, dict):
+                self._record_run(result)
                 return result.get("output", str(result))
             return str(result)
         except AttributeError:
@@ -235,6 +562,13 @@ Thought: {{agent_scratchpad}}"""
     
     def get_memory_summary(self) -> str:
         """Get a summary of the conversation history"""
+        if isinstance(self.memory, SummarizingMemory):
+            stats = self.memory.stats()
+            if not stats["full_history_tokens"]:
+                return "No conversation history"
+            return (f"Conversation history: {stats['verbatim_messages'] + stats['pending_messages']} recent messages, "
+                    f"{stats['summarized_messages']} summarized "
+                    f"(~{stats['full_history_tokens']} tokens in full)")
         if self.memory.chat_memory.messages:
             return f"Conversation history contains {len(self.memory.chat_memory.messages)} messages"
         return "No conversation history"
@@ -257,28 +591,27 @@ Thought: {{agent_scratchpad}}"""
         return table
 
 
-def create_basic_react_agent() -> LangChainReactAgent:
-    """Create a basic ReAct agent with common tools"""
+def create_basic_react_agent(hedge: bool = False) -> LangChainReactAgent:
+    """Create a basic ReAct agent with common tools
+
+    With API keys for more than one provider, the agent fails over between
+    them; ``hedge`` also sends a backup request when the first one is slow.
+    """
     from react_agent_tools import get_basic_tools
     
     # Choose provider based on available API keys
-    if os.getenv("DEEPSEEK_API_KEY"):
-        provider = "deepseek"
-        model = "deepseek-chat"
-    elif os.getenv("OPENAI_API_KEY"):
-        provider = "openai"
-        model = "gpt-4"
-    elif os.getenv("ANTHROPIC_API_KEY"):
-        provider = "anthropic"
-        model = "claude-3-sonnet-20240229"
-    else:
+    available = [name for name in DEFAULT_MODELS if os.getenv(PROVIDER_API_KEYS[name])]
+    if not available:
         raise ValueError("No API key found. Please set DEEPSEEK_API_KEY, OPENAI_API_KEY, or ANTHROPIC_API_KEY")
+    provider = "routed" if len(available) > 1 else available[0]
     
     agent = LangChainReactAgent(
         llm_provider=provider,
-        model_name=model,
+        model_name=DEFAULT_MODELS.get(provider, ""),
         verbose=True
     )
+    if isinstance(agent.llm, RoutedChatModel):
+        agent.llm.hedge = hedge
     
     # Add basic tools
     tools = get_basic_tools()
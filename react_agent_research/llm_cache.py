@@ -0,0 +1,261 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#   "langchain-core>=0.2.0",
+# ]
+# ///
+
+"""
+LLM Response Cache
+A persistent SQLite cache for chat model responses, so regression runs that
+re-send identical prompts get answers without the latency or cost of a
+provider call. Entries are keyed by the model's identity and parameters plus
+the normalized messages; only deterministic (temperature 0) calls are cached,
+and the database is kept within entry-count and size limits by LRU eviction.
+"""
+
+import ast
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import warnings
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+from tool_result_cache import CacheStats
+
+DEFAULT_DB_PATH = Path(os.getenv("REACT_AGENT_LLM_CACHE", Path.home() / ".cache" / "react_agent" / "llm_cache.db"))
+
+# Per-message fields that differ between otherwise identical conversations
+_VOLATILE_FIELDS = ("id", "response_metadata", "usage_metadata")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+# Eviction frees room in batches: down to this fraction of each limit
+_LOW_WATER = 0.9
+
+# Keeps the most recently used entries while both running totals fit (and
+# always the newest one); deletes the rest in a single statement
+_EVICT = """
+DELETE FROM responses WHERE key IN (
+    SELECT key FROM (
+        SELECT key,
+               ROW_NUMBER() OVER (ORDER BY last_used DESC, key) AS position,
+               SUM(size) OVER (ORDER BY last_used DESC, key) AS running_bytes
+        FROM responses
+    )
+    WHERE position > 1 AND (position > ? OR running_bytes > ?)
+)
+"""
+
+
+def _strip_volatile(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_strip_volatile(item) for item in value]
+    if isinstance(value, dict):
+        kwargs = value.get("kwargs")
+        if isinstance(kwargs, dict) and value.get("type") == "constructor":
+            kwargs = {k: v for k, v in kwargs.items() if k not in _VOLATILE_FIELDS}
+            value = {**value, "kwargs": kwargs}
+        return {k: _strip_volatile(v) for k, v in value.items()}
+    return value
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Canonical form of a serialized message list (volatile ids and metadata dropped)"""
+    try:
+        data = json.loads(prompt)
+    except ValueError:
+        return prompt.strip()  # completion-style prompt, not a message list
+    return json.dumps(_strip_volatile(data), sort_keys=True, ensure_ascii=False)
+
+
+def parse_llm_string(llm_string: str) -> Tuple[Dict[str, Any], str]:
+    """Split LangChain's llm_string into (model constructor dict, call options)
+
+    Serializable models give ``<constructor JSON>---<options>``; others give
+    the repr of their sorted parameters, which is mapped to the same shape.
+    """
+    model, _, options = llm_string.rpartition("---")
+    try:
+        return json.loads(model), options
+    except ValueError:
+        pass
+    try:
+        params = dict(ast.literal_eval(llm_string))
+    except (ValueError, SyntaxError, TypeError):
+        return {}, llm_string
+    return {"name": params.get("_type", "?"), "kwargs": params}, ""
+
+
+def _model_label(model: Dict[str, Any]) -> str:
+    kwargs = model.get("kwargs", {})
+    name = kwargs.get("model_name") or kwargs.get("model") or "?"
+    return f"{model.get('name', '?')}:{name}"
+
+
+class LLMResponseCache(BaseCache):
+    """SQLite-backed LangChain cache for deterministic chat model calls
+
+    Install it on a model (``llm.cache = LLMResponseCache()``) or let
+    LangChainReactAgent do so with ``llm_cache=``. Calls whose temperature
+    is not 0 are passed through uncached (counted as ``skipped``) unless
+    ``deterministic_only`` is False. Once the cache holds more than
+    ``max_entries`` responses or ``max_bytes`` of serialized data, the least
+    recently used entries are evicted; entries older than ``ttl`` seconds
+    are treated as misses.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = 10_000,
+                 max_bytes: int = 256 * 1024 * 1024, ttl: Optional[float] = None, deterministic_only: bool = True):
+        self.db_path = str(db_path) if db_path else str(DEFAULT_DB_PATH)
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.deterministic_only = deterministic_only
+        self.stats = CacheStats()
+        self.skipped = 0
+        self.hits_by_model: Counter = Counter()
+        self.misses_by_model: Counter = Counter()
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        if self.db_path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+        # Running totals, so an insert does not have to scan the table
+        self._entries, self._bytes = self._totals()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self) -> "LLMResponseCache":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _totals(self) -> Tuple[int, int]:
+        return self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+
+    def _key(self, prompt: str, llm_string: str) -> Optional[Tuple[str, str]]:
+        """(cache key, model label), or None when the call must not be cached"""
+        model, options = parse_llm_string(llm_string)
+        if self.deterministic_only and model.get("kwargs", {}).get("temperature") != 0:
+            return None
+        identity = json.dumps(model, sort_keys=True) + "---" + options
+        digest = hashlib.sha256(f"{identity}\0{normalize_prompt(prompt)}".encode()).hexdigest()
+        return digest, _model_label(model)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        keyed = self._key(prompt, llm_string)
+        if keyed is None:
+            with self._lock:
+                self.skipped += 1
+            return None
+        key, label = keyed
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT value, created, size FROM responses WHERE key = ?",
+                                    (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                with self.conn:
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._entries -= 1
+                self._bytes -= row[2]
+                self.stats.expirations += 1
+                row = None
+            if row is None:
+                self.stats.misses += 1
+                self.misses_by_model[label] += 1
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self.stats.hits += 1
+            self.hits_by_model[label] += 1
+        with warnings.catch_warnings():
+            # loads() is flagged beta; the input is our own dumps() output
+            warnings.simplefilter("ignore")
+            return loads(row[0])
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        keyed = self._key(prompt, llm_string)
+        if keyed is None:
+            return
+        key, label = keyed
+        value = dumps(return_val)
+        now = time.time()
+        with self._lock, self.conn:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute("INSERT OR REPLACE INTO responses (key, model, value, size, created, last_used) "
+                              "VALUES (?, ?, ?, ?, ?, ?)", (key, label, value, len(value), now, now))
+            self._entries += old is None
+            self._bytes += len(value) - (old[0] if old else 0)
+            if self._entries > self.max_entries or self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries down to the low-water mark (called under the lock)
+
+        Other processes may write to the same database, so the totals are
+        recounted before deciding.
+        """
+        self._entries, self._bytes = self._totals()
+        if self._entries <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        keep_entries = max(1, int(self.max_entries * _LOW_WATER))
+        keep_bytes = int(self.max_bytes * _LOW_WATER)
+        self.stats.evictions += self.conn.execute(_EVICT, (keep_entries, keep_bytes)).rowcount
+        self._entries, self._bytes = self._totals()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM responses")
+            self._entries = self._bytes = 0
+
+    def info(self) -> Dict[str, Any]:
+        """Hit counters plus what the database currently holds"""
+        with self._lock:
+            count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            models = {label: {"hits": self.hits_by_model[label], "misses": self.misses_by_model[label]}
+                      for label in sorted(set(self.hits_by_model) | set(self.misses_by_model))}
+            return {**self.stats.as_dict(), "skipped": self.skipped, "entries": count, "bytes": total,
+                    "models": models}
+
+    def format_report(self) -> str:
+        """One-line summary suitable for console output"""
+        s = self.stats
+        return (f"LLM cache: {s.hits}/{s.lookups} hits ({s.hit_rate:.0%}), {self.skipped} non-deterministic "
+                f"calls skipped, {s.evictions} evictions")
+
+
+if __name__ == "__main__":
+    import sys
+
+    with LLMResponseCache(sys.argv[1] if len(sys.argv) > 1 else None) as cache:
+        info = cache.info()
+        print(f"{cache.db_path}: {info['entries']} responses, {info['bytes'] / 1024:.0f} KB")
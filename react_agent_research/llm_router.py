@@ -0,0 +1,306 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#   "langchain-core>=0.2.0",
+# ]
+# ///
+
+"""
+LLM Router
+A chat model that spreads requests over several providers (the ones
+LangChainReactAgent can build: DeepSeek, OpenAI, Anthropic). It keeps rolling
+latency and error statistics per provider, takes failing providers out of
+rotation for a cool-down period, fails over to the next provider on errors,
+and can hedge: if the first provider has not answered within its recent p95
+latency, the same request is sent to the next one and the first answer wins.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableBinding
+from pydantic import Field
+
+# Inner calls run without callbacks: to the agent (and its usage accounting)
+# the router is the model, so nested provider runs would be counted twice
+_INNER_CONFIG = {"callbacks": []}
+
+
+def _model_identity(model: Any) -> str:
+    """What a response cache keys ``model`` by, including arguments bound to it (e.g. tools)"""
+    kwargs: Dict[str, Any] = {}
+    while isinstance(model, RunnableBinding):
+        kwargs = {**model.kwargs, **kwargs}
+        model = model.bound
+    if isinstance(model, BaseChatModel):
+        return model._get_llm_string(**kwargs)
+    return repr((model, sorted(kwargs.items())))
+
+
+class ProviderStats:
+    """Rolling window of one provider's outcomes"""
+
+    def __init__(self, window: int):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class ProviderHealth:
+    """Thread-safe statistics for a set of providers, shared by copies of a router
+
+    A provider is taken out of rotation for ``cooldown`` seconds after
+    ``failure_threshold`` consecutive errors, or when more than
+    ``max_error_rate`` of its last ``window`` requests failed (once at least
+    ``min_samples`` were made). After the cool-down it is tried again.
+    """
+
+    def __init__(self, window: int = 50, failure_threshold: int = 3, max_error_rate: float = 0.5,
+                 min_samples: int = 5, cooldown: float = 30.0):
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self._stats: Dict[str, ProviderStats] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str) -> ProviderStats:
+        if name not in self._stats:
+            self._stats[name] = ProviderStats(self.window)
+        return self._stats[name]
+
+    def record(self, name: str, latency: float, ok: bool):
+        with self._lock:
+            stats = self._get(name)
+            stats.requests += 1
+            stats.outcomes.append(ok)
+            if ok:
+                stats.latencies.append(latency)
+                stats.consecutive_failures = 0
+                return
+            stats.errors += 1
+            stats.consecutive_failures += 1
+            if (stats.consecutive_failures >= self.failure_threshold
+                    or (len(stats.outcomes) >= self.min_samples and stats.error_rate > self.max_error_rate)):
+                stats.open_until = time.monotonic() + self.cooldown
+
+    def record_hedge(self, name: str, won: bool):
+        with self._lock:
+            stats = self._get(name)
+            stats.hedges += 1
+            stats.hedge_wins += won
+
+    def order(self, names: Sequence[str]) -> List[str]:
+        """Providers in priority order, those cooling down last (soonest back first)"""
+        now = time.monotonic()
+        with self._lock:
+            cooling = {name: self._get(name).open_until for name in names if self._get(name).open_until > now}
+        return [name for name in names if name not in cooling] + sorted(cooling, key=cooling.get)
+
+    def hedge_delay(self, name: str, quantile: float, minimum: float, default: float) -> float:
+        """How long to wait for ``name`` before hedging: its recent ``quantile`` latency"""
+        with self._lock:
+            stats = self._get(name)
+            if len(stats.latencies) < self.min_samples:
+                return default
+            return max(minimum, stats.quantile(quantile))
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "requests": stats.requests,
+                    "errors": stats.errors,
+                    "error_rate": round(stats.error_rate, 3),
+                    "p50": stats.quantile(0.5),
+                    "p95": stats.quantile(0.95),
+                    "available": stats.open_until <= now,
+                    "hedges": stats.hedges,
+                    "hedge_wins": stats.hedge_wins,
+                }
+                for name, stats in self._stats.items()
+            }
+
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+        return _hedge_pool
+
+
+class RoutedChatModel(BaseChatModel):
+    """Chat model that fails over (and optionally hedges) across providers
+
+    ``models`` maps provider names to chat models, in priority order. Each
+    request goes to the first available provider; on an error it is retried
+    on the next. With ``hedge=True``, a provider that has not answered after
+    its ``hedge_quantile`` latency (at least ``hedge_min_delay`` seconds;
+    ``hedge_default_delay`` until enough samples exist) gets a backup request
+    to the next provider, and whichever answers first is used. A late sync
+    request is left to finish in the background (its latency still counts);
+    a late async one is cancelled.
+    """
+
+    models: Dict[str, Any]
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_delay: float = 0.2
+    hedge_default_delay: float = 2.0
+    health: ProviderHealth = Field(default_factory=ProviderHealth)
+
+    @property
+    def _llm_type(self) -> str:
+        return "routed"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        temperatures = {getattr(model, "temperature", None) for model in self.models.values()}
+        # Each provider's full identity, so a response cache never mixes up routers
+        # with different models or bound tools
+        return {"providers": list(self.models), "temperature": temperatures.pop() if len(temperatures) == 1 else None,
+                "models": {name: _model_identity(model) for name, model in self.models.items()}}
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "RoutedChatModel":
+        """Bind the tools on every provider; the copy shares this router's statistics"""
+        return self.model_copy(update={"models": {name: model.bind_tools(tools, **kwargs)
+                                                  for name, model in self.models.items()}})
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-provider requests, errors, latency quantiles, availability and hedges"""
+        return self.health.report()
+
+    def _hedge_delay(self, name: str) -> float:
+        return self.health.hedge_delay(name, self.hedge_quantile, self.hedge_min_delay, self.hedge_default_delay)
+
+    def _call(self, name: str, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: Dict[str, Any]):
+        start = time.perf_counter()
+        try:
+            message = self.models[name].invoke(messages, _INNER_CONFIG, stop=stop, **kwargs)
+        except Exception:
+            self.health.record(name, time.perf_counter() - start, ok=False)
+            raise
+        self.health.record(name, time.perf_counter() - start, ok=True)
+        return message
+
+    async def _acall(self, name: str, messages: List[BaseMessage], stop: Optional[List[str]],
+                     kwargs: Dict[str, Any]):
+        start = time.perf_counter()
+        try:
+            message = await self.models[name].ainvoke(messages, _INNER_CONFIG, stop=stop, **kwargs)
+        except Exception:
+            self.health.record(name, time.perf_counter() - start, ok=False)
+            raise
+        self.health.record(name, time.perf_counter() - start, ok=True)
+        return message
+
+    @staticmethod
+    def _result(name: str, message: BaseMessage) -> ChatResult:
+        message.response_metadata = {**message.response_metadata, "provider": name}
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output={"provider": name})
+
+    @staticmethod
+    def _exhausted(errors: List[Tuple[str, Exception]]) -> RuntimeError:
+        details = "; ".join(f"{name}: {error}" for name, error in errors) or "no providers configured"
+        error = RuntimeError(f"All LLM providers failed: {details}")
+        error.__cause__ = errors[-1][1] if errors else None
+        return error
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        order = self.health.order(list(self.models))
+        errors: List[Tuple[str, Exception]] = []
+        if not self.hedge:
+            for name in order:
+                try:
+                    return self._result(name, self._call(name, messages, stop, kwargs))
+                except Exception as e:
+                    errors.append((name, e))
+            raise self._exhausted(errors)
+
+        pool = _get_hedge_pool()
+        queue = deque(order)
+        pending: Dict[Future, str] = {}
+        hedged = None
+        while True:
+            if not pending:
+                if not queue:
+                    raise self._exhausted(errors)
+                primary = queue.popleft()
+                pending[pool.submit(self._call, primary, messages, stop, kwargs)] = primary
+            # At most one backup request per call
+            timeout = self._hedge_delay(primary) if hedged is None and queue else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedged = queue.popleft()
+                pending[pool.submit(self._call, hedged, messages, stop, kwargs)] = hedged
+                continue
+            for future in done:
+                name = pending.pop(future)
+                if future.exception() is None:
+                    if hedged is not None:
+                        self.health.record_hedge(hedged, won=name == hedged)
+                    return self._result(name, future.result())
+                errors.append((name, future.exception()))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        order = self.health.order(list(self.models))
+        errors: List[Tuple[str, Exception]] = []
+        queue = deque(order)
+        pending: Dict[asyncio.Task, str] = {}
+        hedged = None
+        try:
+            while True:
+                if not pending:
+                    if not queue:
+                        raise self._exhausted(errors)
+                    primary = queue.popleft()
+                    pending[asyncio.ensure_future(self._acall(primary, messages, stop, kwargs))] = primary
+                timeout = self._hedge_delay(primary) if self.hedge and hedged is None and queue else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = queue.popleft()
+                    pending[asyncio.ensure_future(self._acall(hedged, messages, stop, kwargs))] = hedged
+                    continue
+                for task in done:
+                    name = pending.pop(task)
+                    if task.exception() is None:
+                        if hedged is not None:
+                            self.health.record_hedge(hedged, won=name == hedged)
+                        return self._result(name, task.result())
+                    errors.append((name, task.exception()))
+        finally:
+            for task in pending:
+                task.cancel()
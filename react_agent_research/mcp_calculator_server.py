@@ -5,22 +5,40 @@ A simple calculator server implementing the Model Context Protocol
 """
 
 import asyncio
+import argparse
 import json
 import sys
+import uuid
 import logging
-from typing import Any, Dict, List, Optional
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
 import math
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class HTTPError(Exception):
+    """HTTP-level failure that ends the current request with an error status"""
+    
+    def __init__(self, status: HTTPStatus, message: str = ""):
+        super().__init__(message or status.phrase)
+        self.status = status
+        self.message = message or status.phrase
+
+
 class MCPCalculatorServer:
     """MCP Calculator Server implementation"""
     
+    # HTTP transport limits
+    MAX_BODY_BYTES = 1024 * 1024
+    MAX_HEADER_LINES = 100
+    
     def __init__(self):
         self.name = "calculator"
         self.version = "1.0.0"
+        self._connection_slots: Optional[asyncio.Semaphore] = None
+        self.active_connections = 0
         
     async def handle_initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Handle initialize request"""
@@ -51,6 +69,12 @@ class MCPCalculatorServer:
                             }
                         },
                         "required": ["expression"]
+                    },
+                    "annotations": {
+                        "title": "Calculator",
+                        "readOnlyHint": True,
+                        "idempotentHint": True,
+                        "openWorldHint": False
                     }
                 },
                 {
@@ -73,6 +97,12 @@ class MCPCalculatorServer:
                             }
                         },
                         "required": ["value", "from_unit", "to_unit"]
+                    },
+                    "annotations": {
+                        "title": "Unit converter",
+                        "readOnlyHint": True,
+                        "idempotentHint": True,
+                        "openWorldHint": False
                     }
                 }
             ]
@@ -277,7 +307,7 @@ class MCPCalculatorServer:
         protocol = asyncio.StreamReaderProtocol(reader)
         await asyncio.get_event_loop().connect_read_pipe(lambda: protocol, sys.stdin)
         
-        writer = sys.stdout
+        writer = sys.stdout.buffer
         
         while True:
             try:
@@ -290,6 +320,10 @@ class MCPCalculatorServer:
                 request = json.loads(line.decode('utf-8'))
                 logger.info(f"Received request: {request.get('method')}")
                 
+                # Notifications (no id) never get a response
+                if "id" not in request:
+                    continue
+                
                 # Handle request
                 response = await self.handle_request(request)
                 
@@ -303,10 +337,173 @@ class MCPCalculatorServer:
             except Exception as e:
                 logger.error(f"Server error: {e}")
 
+    async def run_http(self, host: str = "127.0.0.1", port: int = 8765, path: str = "/mcp",
+                       max_connections: int = 64, keepalive_timeout: float = 15.0,
+                       max_requests_per_connection: int = 1000):
+        """Run the MCP server over streamable HTTP
+        
+        Every agent POSTs JSON-RPC messages to ``path`` and gets a JSON
+        response back, so one server process serves many clients. Connections
+        are kept alive between requests up to ``keepalive_timeout`` seconds
+        idle and ``max_requests_per_connection`` requests; beyond
+        ``max_connections`` concurrent connections new clients get 503.
+        """
+        server = await self.start_http(host, port, path, max_connections, keepalive_timeout,
+                                       max_requests_per_connection)
+        bound = ", ".join(f"{sock.getsockname()[0]}:{sock.getsockname()[1]}" for sock in server.sockets)
+        logger.info(f"Starting MCP Calculator Server v{self.version} (http://{bound}{path})")
+        
+        async with server:
+            await server.serve_forever()
+    
+    async def start_http(self, host: str = "127.0.0.1", port: int = 8765, path: str = "/mcp",
+                         max_connections: int = 64, keepalive_timeout: float = 15.0,
+                         max_requests_per_connection: int = 1000) -> asyncio.AbstractServer:
+        """Bind the HTTP listener without blocking (port 0 picks a free port)"""
+        self._connection_slots = asyncio.Semaphore(max_connections)
+        
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            await self._handle_http_connection(reader, writer, path, keepalive_timeout, max_requests_per_connection)
+        
+        return await asyncio.start_server(handle, host, port)
+    
+    async def _handle_http_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                      path: str, keepalive_timeout: float, max_requests: int):
+        """Serve keep-alive HTTP/1.1 requests on one connection"""
+        if self._connection_slots.locked():
+            await self._write_http_response(writer, HTTPStatus.SERVICE_UNAVAILABLE,
+                                            b"Too many connections", keep_alive=False)
+            await self._close_writer(writer)
+            return
+        
+        async with self._connection_slots:
+            self.active_connections += 1
+            try:
+                for _ in range(max_requests):
+                    try:
+                        request = await asyncio.wait_for(self._read_http_request(reader), keepalive_timeout)
+                    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                        break
+                    if request is None:
+                        break
+                    
+                    method, target, headers, body = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    status, payload, extra_headers = await self._dispatch_http(method, target, headers, body, path)
+                    await self._write_http_response(writer, status, payload, keep_alive=keep_alive,
+                                                    extra_headers=extra_headers)
+                    if not keep_alive:
+                        break
+            except HTTPError as e:
+                await self._write_http_response(writer, e.status, e.message.encode("utf-8"), keep_alive=False)
+            except Exception as e:
+                logger.error(f"HTTP connection error: {e}")
+            finally:
+                self.active_connections -= 1
+                await self._close_writer(writer)
+    
+    async def _read_http_request(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        """Parse one HTTP/1.1 request; None when the client closed the connection"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _version = request_line.decode("latin-1").strip().split(" ", 2)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+        
+        headers: Dict[str, str] = {}
+        for _ in range(self.MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+        
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HTTPError(HTTPStatus.NOT_IMPLEMENTED, "Chunked request bodies are not supported")
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > self.MAX_BODY_BYTES:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+    
+    async def _dispatch_http(self, method: str, target: str, headers: Dict[str, str], body: bytes,
+                             path: str) -> Tuple[HTTPStatus, bytes, Dict[str, str]]:
+        """Route an HTTP request to the shared JSON-RPC handler"""
+        if target.split("?", 1)[0] != path:
+            return HTTPStatus.NOT_FOUND, b"Not found", {}
+        if method != "POST":
+            # No server-initiated SSE stream: every response is returned on its POST
+            return HTTPStatus.METHOD_NOT_ALLOWED, b"Use POST", {"Allow": "POST"}
+        
+        try:
+            message = json.loads(body.decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            error = {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": f"Parse error: {e}"}}
+            return HTTPStatus.BAD_REQUEST, json.dumps(error).encode("utf-8"), {"Content-Type": "application/json"}
+        
+        batch = message if isinstance(message, list) else [message]
+        requests = [m for m in batch if isinstance(m, dict) and "id" in m]
+        if requests:
+            logger.info(f"Received request: {', '.join(str(m.get('method')) for m in requests)}")
+        responses = await asyncio.gather(*(self.handle_request(m) for m in requests))
+        
+        extra_headers: Dict[str, str] = {}
+        if any(m.get("method") == "initialize" for m in requests):
+            extra_headers["Mcp-Session-Id"] = uuid.uuid4().hex
+        if not responses:
+            # Only notifications / responses were posted
+            return HTTPStatus.ACCEPTED, b"", extra_headers
+        
+        payload = responses if isinstance(message, list) else responses[0]
+        extra_headers["Content-Type"] = "application/json"
+        return HTTPStatus.OK, json.dumps(payload).encode("utf-8"), extra_headers
+    
+    async def _write_http_response(self, writer: asyncio.StreamWriter, status: HTTPStatus, body: bytes,
+                                   keep_alive: bool = True, extra_headers: Optional[Dict[str, str]] = None):
+        headers = {
+            "Content-Type": "text/plain; charset=utf-8",
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive" if keep_alive else "close",
+        }
+        headers.update(extra_headers or {})
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+    
+    async def _close_writer(self, writer: asyncio.StreamWriter):
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except Exception:
+            pass
+
 async def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="MCP Calculator Server")
+    parser.add_argument("--transport", choices=["stdio", "http"], default="stdio",
+                        help="stdio (one client per process) or http (many clients per process)")
+    parser.add_argument("--host", default="127.0.0.1", help="HTTP bind address")
+    parser.add_argument("--port", type=int, default=8765, help="HTTP port")
+    parser.add_argument("--max-connections", type=int, default=64, help="Maximum concurrent HTTP connections")
+    parser.add_argument("--keepalive-timeout", type=float, default=15.0, help="Idle seconds before closing a keep-alive connection")
+    args = parser.parse_args()
+    
     server = MCPCalculatorServer()
-    await server.run()
+    if args.transport == "http":
+        await server.run_http(args.host, args.port, max_connections=args.max_connections,
+                              keepalive_timeout=args.keepalive_timeout)
+    else:
+        await server.run()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
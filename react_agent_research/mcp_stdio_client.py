@@ -0,0 +1,266 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#   "langchain-core>=0.2.0",
+# ]
+# ///
+
+"""
+Stdio MCP Client
+A reusable Model Context Protocol client that keeps one subprocess connection
+open and multiplexes many in-flight JSON-RPC requests over it.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    from tool_result_cache import ToolResultCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVER_SCRIPT = Path(__file__).parent / "mcp_calculator_server.py"
+PROTOCOL_VERSION = "2024-11-05"
+
+
+class MCPError(Exception):
+    """JSON-RPC error returned by an MCP server"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(f"MCP error {code}: {message}")
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+class StdioMCPClient:
+    """MCP client over a single long-lived stdio subprocess
+
+    Requests are written as newline-delimited JSON-RPC and responses are
+    matched back to their caller by ``id``, so any number of ``call_tool``
+    coroutines can be awaited concurrently on the same connection. The
+    ``tools/list`` result is cached after the first call.
+    """
+
+    def __init__(self, command: Optional[str] = None, args: Optional[Sequence[str]] = None,
+                 request_timeout: float = 30.0, client_name: str = "react-agent-research",
+                 server_stderr: Optional[int] = asyncio.subprocess.DEVNULL):
+        self.command = command or sys.executable
+        self.args = list(args) if args is not None else [str(DEFAULT_SERVER_SCRIPT)]
+        self.request_timeout = request_timeout
+        self.client_name = client_name
+        self.server_stderr = server_stderr
+        self.server_info: Dict[str, Any] = {}
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+        self._tools_cache: Optional[List[Dict[str, Any]]] = None
+        self._tools_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._process is not None and self._process.returncode is None
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests awaiting a response"""
+        return len(self._pending)
+
+    async def __aenter__(self) -> "StdioMCPClient":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def start(self) -> Dict[str, Any]:
+        """Spawn the server and perform the initialize handshake"""
+        if self.connected:
+            return self.server_info
+
+        self._write_lock = asyncio.Lock()
+        self._tools_lock = asyncio.Lock()
+        self._process = await asyncio.create_subprocess_exec(
+            self.command, *self.args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=self.server_stderr,
+            limit=2 ** 20,
+        )
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+        try:
+            self.server_info = await self.request("initialize", {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {},
+                "clientInfo": {"name": self.client_name, "version": "1.0.0"},
+            })
+            await self.notify("notifications/initialized")
+        except BaseException:
+            await self.close()
+            raise
+        return self.server_info
+
+    async def _send(self, message: Dict[str, Any]):
+        if not self.connected:
+            raise ConnectionError("MCP server is not running")
+        data = (json.dumps(message) + "\n").encode("utf-8")
+        async with self._write_lock:
+            self._process.stdin.write(data)
+            await self._process.stdin.drain()
+
+    async def request(self, method: str, params: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None) -> Any:
+        """Send a JSON-RPC request and await the response with the matching id"""
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        message = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            message["params"] = params
+
+        try:
+            await self._send(message)
+            return await asyncio.wait_for(future, timeout or self.request_timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def notify(self, method: str, params: Optional[Dict[str, Any]] = None):
+        """Send a JSON-RPC notification (no response expected)"""
+        message = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            message["params"] = params
+        await self._send(message)
+
+    async def _read_loop(self):
+        """Dispatch each response line to the future waiting on its id"""
+        error: BaseException = ConnectionError("MCP server closed the connection")
+        try:
+            while True:
+                line = await self._process.stdout.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Ignoring non-JSON line from server: {line[:200]!r}")
+                    continue
+
+                future = self._pending.get(message.get("id"))
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    err = message["error"]
+                    future.set_exception(MCPError(err.get("code", -32603), err.get("message", ""), err.get("data")))
+                else:
+                    future.set_result(message.get("result"))
+        except asyncio.CancelledError:
+            error = ConnectionError("MCP client closed")
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+
+    async def list_tools(self, refresh: bool = False) -> List[Dict[str, Any]]:
+        """Return the server's tools, cached after the first request"""
+        async with self._tools_lock:
+            if self._tools_cache is None or refresh:
+                result = await self.request("tools/list", {})
+                self._tools_cache = result.get("tools", [])
+            return self._tools_cache
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                        timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Call a tool and return the raw MCP result (``{"content": [...]}``)"""
+        result = await self.request("tools/call", {"name": name, "arguments": arguments or {}}, timeout)
+        # The calculator server reports tool-level errors inside the result
+        if isinstance(result, dict) and "error" in result and "content" not in result:
+            err = result["error"]
+            raise MCPError(err.get("code", -32603), err.get("message", ""))
+        return result
+
+    async def call_tool_text(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> str:
+        """Call a tool and join the text parts of its content"""
+        return result_text(await self.call_tool(name, arguments))
+
+    async def close(self):
+        """Terminate the server subprocess and fail any outstanding requests"""
+        process, self._process = self._process, None
+        if process is not None and process.returncode is None:
+            try:
+                process.stdin.close()
+                await asyncio.wait_for(process.wait(), timeout=2)
+            except (asyncio.TimeoutError, ProcessLookupError, BrokenPipeError, ConnectionResetError):
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader_task = None
+
+
+def result_text(result: Dict[str, Any]) -> str:
+    """Extract the text content from an MCP tool result"""
+    content = result.get("content", []) if isinstance(result, dict) else []
+    parts = [item.get("text", "") for item in content if isinstance(item, dict) and item.get("type") == "text"]
+    return "\n".join(parts) if parts else str(result)
+
+
+async def load_langchain_tools(client: StdioMCPClient, cache: Optional["ToolResultCache"] = None) -> List[Any]:
+    """Expose the client's MCP tools as LangChain StructuredTools
+
+    All returned tools share the client's single connection. Tool annotations
+    are kept in ``metadata``; with a ``cache``, tools annotated as pure are
+    served from it.
+    """
+    from langchain_core.tools import StructuredTool
+    from tool_result_cache import cache_pure_tools
+
+    tools = []
+    for tool_info in await client.list_tools():
+        name = tool_info["name"]
+
+        async def _call(_name=name, **kwargs) -> str:
+            return await client.call_tool_text(_name, kwargs)
+
+        tools.append(StructuredTool(
+            name=name,
+            description=tool_info.get("description", ""),
+            args_schema=tool_info.get("inputSchema", {"type": "object", "properties": {}}),
+            coroutine=_call,
+            metadata=tool_info.get("annotations"),
+        ))
+    return cache_pure_tools(tools, cache) if cache is not None else tools
+
+
+async def main():
+    """Smoke test: fire a batch of concurrent calls over one connection"""
+    async with StdioMCPClient() as client:
+        tools = await client.list_tools()
+        print(f"Connected to {client.server_info.get('serverInfo', {}).get('name')}; tools: {[t['name'] for t in tools]}")
+
+        expressions = [f"{i} * {i}" for i in range(10)]
+        results = await asyncio.gather(*(client.call_tool_text("calculate", {"expression": e}) for e in expressions))
+        for line in results:
+            print(line)
+        print(await client.call_tool_text("convert_units", {"value": 100, "from_unit": "meters", "to_unit": "feet"}))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
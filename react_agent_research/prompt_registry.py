@@ -0,0 +1,231 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#   "langchain>=0.1.0",
+# ]
+# ///
+
+"""
+Prompt Registry
+Resolves agent prompts without a LangChain Hub round trip on every agent
+construction: prompts are served from memory, then from a versioned disk
+cache of previously pulled prompts, and finally from copies bundled here.
+Pulling from the hub is explicit (pull()) or opt-in (remote=True).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import warnings
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.load import dumpd, load
+from langchain_core.prompts import (BasePromptTemplate, ChatPromptTemplate, MessagesPlaceholder, PromptTemplate,
+                                    SystemMessagePromptTemplate)
+
+# Same text as https://smith.langchain.com/hub/hwchase17/react
+REACT_PROMPT = """Answer the following questions as best you can. You have access to the following tools:
+
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+
+Begin!
+
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+BUNDLED_PROMPTS = {
+    "hwchase17/react": REACT_PROMPT,
+}
+
+BUNDLED_VERSION = "bundled"
+
+DEFAULT_CACHE_DIR = Path(os.getenv("REACT_AGENT_PROMPT_CACHE", Path.home() / ".cache" / "react_agent" / "prompts"))
+
+
+def _hub_pull(name: str) -> BasePromptTemplate:
+    from langchain import hub
+    return hub.pull(name)
+
+
+class PromptRegistry:
+    """Memory → disk → bundled prompt lookup with an optional hub pull
+
+    Pulled prompts are stored under ``cache_dir`` as one JSON file per
+    version (the hub commit hash when known, otherwise a content hash) plus a
+    ``latest`` pointer. ``get(name)`` returns the latest cached version; with
+    ``remote=True`` a copy older than ``max_age`` seconds is refreshed from
+    the hub first. A failed pull is not retried for ``retry_after`` seconds,
+    so offline agents do not pay for the failure on every construction.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, remote: bool = False, max_age: float = 7 * 24 * 3600,
+                 retry_after: float = 300.0, pull: Optional[Callable[[str], BasePromptTemplate]] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.remote = remote
+        self.max_age = max_age
+        self.retry_after = retry_after
+        self._pull = pull or _hub_pull
+        self._memory: Dict[Tuple[str, Optional[str]], BasePromptTemplate] = {}
+        self._failed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _dir(self, name: str) -> Path:
+        return self.cache_dir / name.replace("/", "__")
+
+    def get(self, name: str, version: Optional[str] = None) -> BasePromptTemplate:
+        """Return prompt ``name`` (the latest cached version unless ``version`` is given)"""
+        key = (name, version)
+        with self._lock:
+            prompt = self._memory.get(key)
+        if prompt is not None:
+            return prompt
+        if version == BUNDLED_VERSION:
+            return self._bundled(name, version)
+
+        cached = self._load(name, version)
+        fresh = cached is not None and (version is not None or time.time() - cached[1] < self.max_age)
+        if cached is not None and (fresh or not self.remote):
+            prompt = cached[0]
+        elif self.remote and time.monotonic() - self._failed.get(name, float("-inf")) >= self.retry_after:
+            try:
+                prompt = self.pull(name, version)
+            except Exception:
+                self._failed[name] = time.monotonic()
+        if prompt is None and cached is not None:
+            prompt = cached[0]  # stale, but better than nothing
+        if prompt is None and version is None:
+            return self._bundled(name, version)
+        if prompt is None:
+            raise KeyError(f"Prompt {name!r} version {version} is not cached"
+                           + (" and could not be pulled" if self.remote else "; pull() it first"))
+
+        with self._lock:
+            self._memory[key] = prompt
+        return prompt
+
+    def _bundled(self, name: str, version: Optional[str]) -> BasePromptTemplate:
+        if name not in BUNDLED_PROMPTS:
+            raise KeyError(f"Prompt {name!r} is not bundled or cached"
+                           + (" and could not be pulled" if self.remote else "; pull() it first"))
+        prompt = PromptTemplate.from_template(BUNDLED_PROMPTS[name])
+        with self._lock:
+            self._memory[(name, version)] = prompt
+        return prompt
+
+    def pull(self, name: str, version: Optional[str] = None) -> BasePromptTemplate:
+        """Fetch a prompt from the hub and cache it on disk; returns the prompt"""
+        prompt = self._pull(f"{name}:{version}" if version else name)
+        serialized = dumpd(prompt)
+        resolved = (version or (prompt.metadata or {}).get("lc_hub_commit_hash")
+                    or hashlib.sha256(json.dumps(serialized, sort_keys=True).encode()).hexdigest()[:12])
+        self._store(name, resolved, serialized)
+        self._failed.pop(name, None)
+        with self._lock:
+            self._memory[(name, resolved)] = prompt
+            if version is None:
+                self._memory[(name, None)] = prompt
+        return prompt
+
+    def _store(self, name: str, version: str, serialized: Dict[str, Any]):
+        directory = self._dir(name)
+        directory.mkdir(parents=True, exist_ok=True)
+        record = {"name": name, "version": version, "fetched_at": time.time(), "prompt": serialized}
+        for path, data in ((directory / f"{version}.json", record),
+                           (directory / "latest", {"version": version, "fetched_at": record["fetched_at"]})):
+            tmp_path = path.with_name(path.name + ".tmp")
+            tmp_path.write_text(json.dumps(data), encoding="utf-8")
+            os.replace(tmp_path, path)
+
+    def _load(self, name: str, version: Optional[str]) -> Optional[Tuple[BasePromptTemplate, float]]:
+        """Read (prompt, fetched_at) from the disk cache, or None"""
+        directory = self._dir(name)
+        try:
+            if version is None:
+                version = json.loads((directory / "latest").read_text(encoding="utf-8"))["version"]
+            record = json.loads((directory / f"{version}.json").read_text(encoding="utf-8"))
+            with warnings.catch_warnings():
+                # load() is flagged beta; the input is our own dumpd() output
+                warnings.simplefilter("ignore")
+                return load(record["prompt"]), record["fetched_at"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def versions(self, name: str) -> List[str]:
+        """Cached versions of ``name``, oldest first"""
+        directory = self._dir(name)
+        if not directory.is_dir():
+            return []
+        files = sorted(directory.glob("*.json"), key=lambda path: path.stat().st_mtime)
+        return [path.stem for path in files]
+
+    def clear(self, name: Optional[str] = None):
+        """Forget in-memory copies (all, or of ``name``); the disk cache is kept"""
+        with self._lock:
+            for key in [k for k in self._memory if name is None or k[0] == name]:
+                del self._memory[key]
+
+
+def with_chat_history(prompt: BasePromptTemplate, key: str = "chat_history") -> BasePromptTemplate:
+    """Chat version of ``prompt`` that sends the conversation so far before the question
+
+    The hub ReAct prompt has no history slot, so an agent memory would be
+    loaded and then dropped. History is inserted as messages (after any
+    leading system messages); a prompt that already uses ``key`` is returned
+    unchanged.
+    """
+    if key in prompt.input_variables or key in getattr(prompt, "optional_variables", []):
+        return prompt
+    history = MessagesPlaceholder(key, optional=True)
+    if isinstance(prompt, ChatPromptTemplate):
+        messages = list(prompt.messages)
+        split = 0
+        while split < len(messages) and isinstance(messages[split], SystemMessagePromptTemplate):
+            split += 1
+        return ChatPromptTemplate.from_messages(messages[:split] + [history] + messages[split:])
+    if isinstance(prompt, PromptTemplate):
+        return ChatPromptTemplate.from_messages([history, ("human", prompt.template)],
+                                                template_format=prompt.template_format)
+    raise TypeError(f"Cannot add chat history to {type(prompt).__name__}")
+
+
+_default_registry: Optional[PromptRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_default_registry() -> PromptRegistry:
+    """Process-wide registry shared by agents that are not given their own"""
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = PromptRegistry()
+        return _default_registry
+
+
+if __name__ == "__main__":
+    import sys
+
+    registry = PromptRegistry(remote=True)
+    name = sys.argv[1] if len(sys.argv) > 1 else "hwchase17/react"
+    try:
+        registry.pull(name)
+    except Exception as e:
+        print(f"Pull failed ({e}); showing the cached or bundled copy")
+    print(f"Cached versions of {name}: {registry.versions(name) or 'none'}")
+    prompt = registry.get(name)
+    print(getattr(prompt, "template", prompt))
@@ -109,8 +109,10 @@ class ReActAgentDemo:
                 self.agent = LangChainReactAgent(
                     llm_provider=self.current_provider,
                     model_name=self.current_model,
-                    verbose=True
+                    verbose=True,
+                    memory="summary"
                 )
+                self.agent.memory.add_hook(self.report_memory_turn)
                 
                 # Add tools
                 if tool_set == "basic":
@@ -205,6 +207,12 @@ class ReActAgentDemo:
             except ValueError:
                 console.print("[red]Invalid input. Please enter a number or 'skip'.[/red]")
     
+    def report_memory_turn(self, report):
+        """Show how much history the summarizing memory saved this turn"""
+        if report.full_tokens:
+            console.print(f"[dim]🧠 Memory: ~{report.sent_tokens} history tokens sent, "
+                          f"~{report.saved_tokens} saved by summarization[/dim]")
+    
     def interactive_mode(self):
         """Run interactive mode where user can ask questions"""
         console.print("\n[bold yellow]💬 Interactive Mode[/bold yellow]")
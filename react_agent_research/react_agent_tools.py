@@ -5,6 +5,8 @@
 # dependencies = [
 #   "langchain>=0.1.0",
 #   "requests>=2.31.0",
+#   "urllib3>=2.0.0",
+#   "httpx>=0.24.0",
 #   "beautifulsoup4>=4.12.0",
 #   "python-dotenv>=1.0.0",
 #   "rich>=13.0.0",
@@ -15,74 +17,140 @@
 import os
 import re
 import json
+import asyncio
+import contextlib
+import itertools
+import mmap
+import queue
+import shutil
+import sys
+import tempfile
+import threading
 import sqlite3
 import subprocess
 from typing import Dict, List, Any, Optional
 from pathlib import Path
+import httpx
 import requests
 from bs4 import BeautifulSoup
 from langchain.tools import Tool
 from rich.console import Console
 
+from code_index import CodeIndex, format_results
+from code_metrics import analyze_source
+from directory_analyzer import DirectoryAnalyzer
+from http_session import AsyncPooledHTTPClient, PooledHTTPClient, get_shared_async_client, get_shared_client
+
 console = Console()
 
+# Process umask, read once at import: os.umask() can only be queried by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
 class WebSearchTool:
     """Tool for searching and extracting information from web"""
     
-    def __init__(self):
+    SEARCH_URL = "https://api.duckduckgo.com/"
+    
+    def __init__(self, http_client: Optional[PooledHTTPClient] = None,
+                 async_http_client: Optional[AsyncPooledHTTPClient] = None):
         self.name = "web_search"
         self.description = "Search the web for information. Input should be a search query string."
+        self.http = http_client or get_shared_client()
+        self._async_http = async_http_client
+    
+    @property
+    def async_http(self) -> AsyncPooledHTTPClient:
+        """Async client for the running event loop (shared unless one was injected)"""
+        return self._async_http or get_shared_async_client()
+    
+    @staticmethod
+    def _params(query: str) -> Dict[str, Any]:
+        # Using DuckDuckGo Instant Answer API as a simple search
+        return {"q": query, "format": "json", "no_html": 1, "skip_disambig": 1}
     
     def search(self, query: str) -> str:
         """Search the web using a simple search engine"""
         try:
-            # Using DuckDuckGo Instant Answer API as a simple search
-            url = f"https://api.duckduckgo.com/?q={query}&format=json&no_html=1&skip_disambig=1"
-            response = requests.get(url, timeout=10)
+            response = self.http.get(self.SEARCH_URL, params=self._params(query), timeout=10)
+            return self._format_response(query, response)
+        
+        except Exception as e:
+            return f"Search error: {str(e)}"
+    
+    async def asearch(self, query: str) -> str:
+        """Async variant of search() on the shared async HTTP pool"""
+        try:
+            response = await self.async_http.get(self.SEARCH_URL, params=self._params(query), timeout=10)
+            return self._format_response(query, response)
+        
+        except Exception as e:
+            return f"Search error: {str(e)}"
+    
+    def _format_response(self, query: str, response: Any) -> str:
+        """Turn an Instant Answer response (requests or httpx) into tool output"""
+        if response.status_code == 200:
+            data = response.json()
             
-            if response.status_code == 200:
-                data = response.json()
-                
-                # Extract abstract if available
-                if data.get('Abstract'):
-                    return f"Search Results for '{query}':\n{data['Abstract']}\nSource: {data.get('AbstractURL', 'Unknown')}"
-                
-                # Extract definition if available
-                if data.get('Definition'):
-                    return f"Definition for '{query}':\n{data['Definition']}\nSource: {data.get('DefinitionURL', 'Unknown')}"
-                
-                # Extract instant answer if available
-                if data.get('Answer'):
-                    return f"Answer for '{query}':\n{data['Answer']}"
-                
-                # Extract related topics
-                if data.get('RelatedTopics'):
-                    topics = []
-                    for topic in data['RelatedTopics'][:3]:  # Limit to 3 topics
-                        if isinstance(topic, dict) and 'Text' in topic:
-                            topics.append(topic['Text'])
-                    
-                    if topics:
-                        return f"Related information for '{query}':\n" + "\n".join(topics)
+            # Extract abstract if available
+            if data.get('Abstract'):
+                return f"Search Results for '{query}':\n{data['Abstract']}\nSource: {data.get('AbstractURL', 'Unknown')}"
+            
+            # Extract definition if available
+            if data.get('Definition'):
+                return f"Definition for '{query}':\n{data['Definition']}\nSource: {data.get('DefinitionURL', 'Unknown')}"
+            
+            # Extract instant answer if available
+            if data.get('Answer'):
+                return f"Answer for '{query}':\n{data['Answer']}"
+            
+            # Extract related topics
+            if data.get('RelatedTopics'):
+                topics = []
+                for topic in data['RelatedTopics'][:3]:  # Limit to 3 topics
+                    if isinstance(topic, dict) and 'Text' in topic:
+                        topics.append(topic['Text'])
                 
-                return f"No specific information found for '{query}'. Try a more specific search term."
+                if topics:
+                    return f"Related information for '{query}':\n" + "\n".join(topics)
             
-            return f"Search failed with status code: {response.status_code}"
+            return f"No specific information found for '{query}'. Try a more specific search term."
         
-        except Exception as e:
-            return f"Search error: {str(e)}"
+        return f"Search failed with status code: {response.status_code}"
 
 
 class CodeAnalysisTool:
     """Tool for analyzing code files and directories"""
     
-    def __init__(self):
+    QUERY_MODES = ("where", "importers", "refs", "search")
+    
+    def __init__(self, analyzer: Optional[DirectoryAnalyzer] = None, index: Optional[CodeIndex] = None,
+                 index_root: str = "."):
         self.name = "code_analysis"
-        self.description = "Analyze code files and directories. Input should be a file path or directory path."
+        self.description = (
+            "Analyze code files and directories. Input should be a file path or directory path, "
+            "or an index query: 'where:Name' (definitions), 'importers:module', 'refs:Name' (uses) "
+            "or 'search:words' (symbol search)."
+        )
+        # Keeps per-file results between calls, so re-analysing a tree only reads changed files
+        self.analyzer = analyzer or DirectoryAnalyzer()
+        # The symbol index is opened on the first query and refreshed incrementally
+        self._index = index
+        self.index_root = index_root
+    
+    @property
+    def index(self) -> CodeIndex:
+        if self._index is None:
+            self._index = CodeIndex(self.index_root)
+        return self._index
     
     def analyze(self, path: str) -> str:
-        """Analyze code at the given path"""
+        """Analyze code at the given path, or answer an index query"""
         try:
+            mode, sep, term = path.partition(':')
+            if sep and mode.strip().lower() in self.QUERY_MODES and not Path(path).exists():
+                return self._query(mode.strip().lower(), term.strip())
+            
             path_obj = Path(path)
             
             if not path_obj.exists():
@@ -98,6 +166,23 @@ class CodeAnalysisTool:
         except Exception as e:
             return f"Analysis error: {str(e)}"
     
+    def _query(self, mode: str, term: str) -> str:
+        """Answer where/importers/refs/search from the persistent code index"""
+        if not term:
+            return f"Query requires a name, e.g. '{mode}:get_basic_tools'"
+        
+        if mode == "where":
+            return format_results(self.index.definitions(term), f"No definition of {term} found")
+        if mode == "importers":
+            return format_results(self.index.importers(term), f"No files import {term}")
+        if mode == "refs":
+            return format_results(self.index.references(term), f"No references to {term} found")
+        return format_results(self.index.search(term), f"No symbols match {term}")
+    
+    async def aanalyze(self, path: str) -> str:
+        """Async variant of analyze(); the filesystem walk runs in a worker thread"""
+        return await asyncio.to_thread(self.analyze, path)
+    
     def _analyze_file(self, file_path: Path) -> str:
         """Analyze a single file"""
         try:
@@ -105,22 +190,28 @@ class CodeAnalysisTool:
                 content = f.read()
             
             lines = content.split('\n')
-            analysis = {
-                'file': str(file_path),
-                'lines': len(lines),
-                'size': len(content),
-                'extension': file_path.suffix,
-                'functions': self._count_functions(content, file_path.suffix),
-                'classes': self._count_classes(content, file_path.suffix),
-                'imports': self._count_imports(content, file_path.suffix)
-            }
+            metrics = analyze_source(content, file_path.suffix)
             
             result = f"File Analysis: {file_path.name}\n"
-            result += f"Lines: {analysis['lines']}\n"
-            result += f"Size: {analysis['size']} bytes\n"
-            result += f"Functions: {analysis['functions']}\n"
-            result += f"Classes: {analysis['classes']}\n"
-            result += f"Imports: {analysis['imports']}\n"
+            result += f"Lines: {len(lines)}\n"
+            result += f"Source lines: {metrics.sloc}\n"
+            result += f"Size: {len(content)} bytes\n"
+            result += f"Functions: {metrics.functions}\n"
+            result += f"Classes: {metrics.classes}\n"
+            result += f"Imports: {len(metrics.imports)}\n"
+            result += f"Cyclomatic complexity: {metrics.complexity}\n"
+            
+            if metrics.error:
+                result += f"Parse error: {metrics.error}\n"
+            
+            functions = [s for s in metrics.symbols if s.kind != 'class']
+            if functions:
+                result += "\nMost complex functions:\n"
+                for symbol in sorted(functions, key=lambda s: s.complexity, reverse=True)[:5]:
+                    result += f"  {symbol.qualname} (line {symbol.line}): {symbol.complexity}\n"
+            
+            if metrics.imports:
+                result += f"\nImported modules: {', '.join(dict.fromkeys(metrics.imports))}\n"
             
             return result
         
@@ -130,64 +221,47 @@ class CodeAnalysisTool:
     def _analyze_directory(self, dir_path: Path) -> str:
         """Analyze a directory"""
         try:
-            files = list(dir_path.glob('**/*'))
-            code_files = [f for f in files if f.is_file() and f.suffix in ['.py', '.js', '.ts', '.java', '.cpp', '.c', '.h']]
-            
-            result = f"Directory Analysis: {dir_path.name}\n"
-            result += f"Total files: {len([f for f in files if f.is_file()])}\n"
-            result += f"Code files: {len(code_files)}\n"
-            result += f"Subdirectories: {len([f for f in files if f.is_dir()])}\n"
-            
-            if code_files:
-                result += "\nCode files by type:\n"
-                extensions = {}
-                for file in code_files:
-                    ext = file.suffix
-                    extensions[ext] = extensions.get(ext, 0) + 1
-                
-                for ext, count in extensions.items():
-                    result += f"  {ext}: {count} files\n"
-            
-            return result
+            return self.analyzer.analyze(str(dir_path)).format()
         
         except Exception as e:
             return f"Directory analysis error: {str(e)}"
-    
-    def _count_functions(self, content: str, extension: str) -> int:
-        """Count functions in code"""
-        if extension == '.py':
-            return len(re.findall(r'^def\s+\w+', content, re.MULTILINE))
-        elif extension in ['.js', '.ts']:
-            return len(re.findall(r'function\s+\w+|^\s*\w+\s*:\s*function|\w+\s*=\s*function', content, re.MULTILINE))
-        return 0
-    
-    def _count_classes(self, content: str, extension: str) -> int:
-        """Count classes in code"""
-        if extension == '.py':
-            return len(re.findall(r'^class\s+\w+', content, re.MULTILINE))
-        elif extension in ['.js', '.ts']:
-            return len(re.findall(r'^class\s+\w+', content, re.MULTILINE))
-        return 0
-    
-    def _count_imports(self, content: str, extension: str) -> int:
-        """Count imports in code"""
-        if extension == '.py':
-            return len(re.findall(r'^(?:import|from)\s+', content, re.MULTILINE))
-        elif extension in ['.js', '.ts']:
-            return len(re.findall(r'^import\s+', content, re.MULTILINE))
-        return 0
 
 
 class FileSystemTool:
-    """Tool for safe file system operations"""
+    """Tool for safe file system operations
     
-    def __init__(self):
+    Besides whole-file reads, supports reading a slice of a large file
+    (byte range, line range, tail) and grepping it. Files at or above
+    ``mmap_threshold`` bytes are memory-mapped rather than read into memory,
+    and every read returns at most ``max_return_bytes`` with a marker when
+    the output was cut.
+    """
+    
+    READ_OPERATIONS = ('read', 'read_bytes', 'read_lines', 'tail', 'grep')
+    
+    def __init__(self, max_return_bytes: int = 64 * 1024, mmap_threshold: int = 1024 * 1024,
+                 max_matches: int = 200):
         self.name = "file_system"
-        self.description = "Read or write files safely. Input format: 'read:path' or 'write:path:content'"
+        self.description = (
+            "Read or write files safely. Input format: 'read:path' or 'write:path:content'. "
+            "For large files read only a slice: 'read_lines:path:START-END' (1-based), "
+            "'read_bytes:path:START-END', 'tail:path:N' (last N lines) or 'grep:path:regex'. "
+            "To write several files in one call use 'write_batch:' followed by JSON "
+            "{\"files\": [{\"path\": ..., \"content\": ...}], \"atomic\": true}; with atomic "
+            "either every file is written or none is."
+        )
+        self.max_return_bytes = max_return_bytes
+        self.mmap_threshold = mmap_threshold
+        self.max_matches = max_matches
     
     def operate(self, operation: str) -> str:
         """Perform file system operation"""
         try:
+            op_type, _, payload = operation.partition(':')
+            if op_type.strip().lower() == 'write_batch':
+                # JSON payload, so paths and content may contain colons
+                return self._write_batch(payload)
+            
             parts = operation.split(':', 2)
             
             if len(parts) < 2:
@@ -198,61 +272,377 @@ class FileSystemTool:
             
             if op_type == 'read':
                 return self._read_file(path)
+            elif op_type in self.READ_OPERATIONS:
+                return self._read_slice(op_type, path, parts[2] if len(parts) > 2 else '')
             elif op_type == 'write':
                 if len(parts) < 3:
                     return "Write operation requires content. Use 'write:path:content'"
                 content = parts[2]
                 return self._write_file(path, content)
             else:
-                return f"Unknown operation: {op_type}. Use 'read' or 'write'"
+                return f"Unknown operation: {op_type}. Use 'read', 'read_lines', 'read_bytes', 'tail', 'grep', 'write' or 'write_batch'"
         
         except Exception as e:
             return f"File system error: {str(e)}"
     
+    async def aoperate(self, operation: str) -> str:
+        """Async variant of operate(); blocking file I/O runs in a worker thread"""
+        return await asyncio.to_thread(self.operate, operation)
+    
+    def _resolve_readable(self, path: str):
+        """Return the resolved Path, or an error message string"""
+        # Security check - prevent reading outside current directory
+        path_obj = Path(path).resolve()
+        current_dir = Path.cwd().resolve()
+        
+        if not str(path_obj).startswith(str(current_dir)):
+            return "Access denied: Cannot read files outside current directory"
+        
+        if not path_obj.exists():
+            return f"File does not exist: {path}"
+        
+        if path_obj.is_dir():
+            return f"Path is a directory, not a file: {path}"
+        
+        return path_obj
+    
+    @contextlib.contextmanager
+    def _buffer(self, path_obj: Path):
+        """Yield the file's bytes: an mmap for large files, a bytes object otherwise"""
+        with open(path_obj, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size >= self.mmap_threshold and size > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    yield mm
+            else:
+                yield f.read()
+    
+    def _truncate(self, data: bytes, total: int, hint: str = "") -> str:
+        """Decode at most max_return_bytes of ``data`` and mark any cut"""
+        text = data[:self.max_return_bytes].decode('utf-8', errors='replace')
+        if len(data) > self.max_return_bytes:
+            text += f"\n... [truncated: returned {self.max_return_bytes} of {total} bytes{hint}]"
+        return text
+    
     def _read_file(self, path: str) -> str:
-        """Read a file safely"""
+        """Read a file safely, returning at most max_return_bytes"""
         try:
-            # Security check - prevent reading outside current directory
-            path_obj = Path(path).resolve()
-            current_dir = Path.cwd().resolve()
-            
-            if not str(path_obj).startswith(str(current_dir)):
-                return "Access denied: Cannot read files outside current directory"
+            path_obj = self._resolve_readable(path)
+            if isinstance(path_obj, str):
+                return path_obj
             
-            if not path_obj.exists():
-                return f"File does not exist: {path}"
-            
-            if path_obj.is_dir():
-                return f"Path is a directory, not a file: {path}"
+            size = path_obj.stat().st_size
+            with open(path_obj, 'rb') as f:
+                head = f.read(self.max_return_bytes + 1)
             
-            with open(path_obj, 'r', encoding='utf-8') as f:
-                content = f.read()
+            hint = "; use read_lines, read_bytes, tail or grep for the rest"
+            return f"File content of {path}:\n{self._truncate(head, size, hint)}"
+        
+        except Exception as e:
+            return f"Read error: {str(e)}"
+    
+    def _read_slice(self, op_type: str, path: str, arg: str) -> str:
+        """Byte range, line range, tail or grep without loading the whole file"""
+        try:
+            path_obj = self._resolve_readable(path)
+            if isinstance(path_obj, str):
+                return path_obj
             
-            return f"File content of {path}:\n{content}"
+            with self._buffer(path_obj) as buf:
+                if op_type == 'read_bytes':
+                    return self._read_bytes(path, buf, arg)
+                if op_type == 'read_lines':
+                    return self._read_lines(path, buf, arg)
+                if op_type == 'tail':
+                    return self._tail(path, buf, arg)
+                return self._grep(path, buf, arg)
         
+        except ValueError as e:
+            return f"Invalid {op_type} argument: {str(e)}"
         except Exception as e:
             return f"Read error: {str(e)}"
     
+    @staticmethod
+    def _parse_range(spec: str, default_end: int):
+        """'10-20' -> (10, 20); '10-' or '10' -> (10, default_end)"""
+        start, _, end = spec.strip().partition('-')
+        start = int(start) if start.strip() else 0
+        end = int(end) if end.strip() else default_end
+        if start < 0 or end < start:
+            raise ValueError(f"bad range {spec!r}")
+        return start, end
+    
+    def _read_bytes(self, path: str, buf, spec: str) -> str:
+        size = len(buf)
+        start, end = self._parse_range(spec or '0-', sys.maxsize)
+        if start > size:
+            raise ValueError(f"start offset {start} is beyond end of file (size {size})")
+        end = min(end, size)
+        data = buf[start:min(end, start + self.max_return_bytes + 1)]
+        return f"Bytes {start}-{end} of {path} ({size} bytes total):\n{self._truncate(data, end - start)}"
+    
+    def _read_lines(self, path: str, buf, spec: str) -> str:
+        first, last = self._parse_range(spec or '1-', sys.maxsize)
+        first = max(first, 1)
+        lines = []
+        used = 0
+        truncated = False
+        number = 0
+        for number, line in self._iter_lines(buf):
+            if number < first:
+                continue
+            if number > last:
+                break
+            text = f"{number:>6}  {line.decode('utf-8', errors='replace')}"
+            if used + len(text) > self.max_return_bytes:
+                truncated = True
+                break
+            lines.append(text)
+            used += len(text) + 1
+        
+        if not lines:
+            return f"No lines in range {spec} of {path} (file has {number} lines)"
+        result = f"Lines {first}-{first + len(lines) - 1} of {path}:\n" + "\n".join(lines)
+        if truncated:
+            result += f"\n... [truncated at {self.max_return_bytes} bytes; continue with read_lines:{path}:{first + len(lines)}-]"
+        return result
+    
+    def _tail(self, path: str, buf, spec: str) -> str:
+        count = int(spec) if spec.strip() else 50
+        if count <= 0:
+            raise ValueError("line count must be positive")
+        end = len(buf)
+        if end and buf[end - 1:end] == b'\n':
+            end -= 1  # a trailing newline does not start another line
+        start = end
+        for _ in range(count):
+            newline = buf.rfind(b'\n', 0, start)
+            if newline < 0:
+                start = 0
+                break
+            start = newline
+        else:
+            start += 1
+        # Keep the end of the file if the slice is too big
+        data = buf[max(start, end - self.max_return_bytes):end]
+        text = data.decode('utf-8', errors='replace')
+        if end - start > self.max_return_bytes:
+            text = f"... [truncated: returned the last {self.max_return_bytes} of {end - start} bytes]\n" + text
+        return f"Last {count} lines of {path}:\n{text}"
+    
+    def _grep(self, path: str, buf, pattern: str) -> str:
+        if not pattern:
+            raise ValueError("grep requires a pattern")
+        regex = re.compile(pattern.encode('utf-8'), re.MULTILINE)
+        matches = []
+        used = 0
+        line_number = 1
+        counted_to = 0
+        last_line_start = -1
+        limited = False
+        for match in regex.finditer(buf):
+            line_start = buf.rfind(b'\n', 0, match.start()) + 1
+            if line_start == last_line_start:
+                continue  # one result per line
+            line_number += buf[counted_to:line_start].count(b'\n')
+            counted_to = line_start
+            last_line_start = line_start
+            line_end = buf.find(b'\n', match.start())
+            line = buf[line_start:line_end if line_end >= 0 else len(buf)]
+            text = f"{line_number}: {line.decode('utf-8', errors='replace')}"
+            if len(matches) >= self.max_matches or used + len(text) > self.max_return_bytes:
+                limited = True
+                break
+            matches.append(text)
+            used += len(text) + 1
+        
+        if not matches:
+            return f"No matches for /{pattern}/ in {path}"
+        result = f"{len(matches)} matching lines for /{pattern}/ in {path}:\n" + "\n".join(matches)
+        if limited:
+            result += f"\n... [stopped after {len(matches)} matches; narrow the pattern or use read_lines]"
+        return result
+    
+    @staticmethod
+    def _iter_lines(buf):
+        """Yield (line_number, line_bytes) using find() so mmaps are never copied whole"""
+        position = 0
+        number = 0
+        size = len(buf)
+        while position < size:
+            newline = buf.find(b'\n', position)
+            end = newline if newline >= 0 else size
+            number += 1
+            yield number, buf[position:end].rstrip(b'\r')
+            position = end + 1
+    
+    def _resolve_writable(self, path: str):
+        """Return the resolved Path, or an error message string"""
+        # Security check - prevent writing outside current directory
+        path_obj = Path(path).resolve()
+        current_dir = Path.cwd().resolve()
+        
+        if not str(path_obj).startswith(str(current_dir)):
+            return "Access denied: Cannot write files outside current directory"
+        
+        if path_obj.is_dir():
+            return f"Path is a directory, not a file: {path}"
+        
+        return path_obj
+    
+    @staticmethod
+    def _stage(path_obj: Path, content: str) -> str:
+        """Write ``content`` to a temp file beside ``path_obj`` and fsync it; returns the temp path"""
+        # Create parent directories if they don't exist
+        path_obj.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path_obj.parent, prefix=f".{path_obj.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+            if path_obj.exists():
+                shutil.copymode(path_obj, tmp_path)
+            else:
+                # mkstemp creates 0600; give new files the mode open() would
+                os.chmod(tmp_path, 0o666 & ~_UMASK)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return tmp_path
+    
+    @staticmethod
+    def _fsync_dir(directory: Path):
+        """Persist a rename by syncing its directory (not supported on Windows)"""
+        if os.name == 'nt':
+            return
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    
+    def _replace(self, tmp_path: str, path_obj: Path):
+        os.replace(tmp_path, path_obj)
+        self._fsync_dir(path_obj.parent)
+    
     def _write_file(self, path: str, content: str) -> str:
-        """Write a file safely"""
+        """Write a file safely: temp file + fsync + rename, so readers never see a partial file"""
         try:
-            # Security check - prevent writing outside current directory
-            path_obj = Path(path).resolve()
-            current_dir = Path.cwd().resolve()
+            path_obj = self._resolve_writable(path)
+            if isinstance(path_obj, str):
+                return path_obj
             
-            if not str(path_obj).startswith(str(current_dir)):
-                return "Access denied: Cannot write files outside current directory"
-            
-            # Create parent directories if they don't exist
-            path_obj.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(path_obj, 'w', encoding='utf-8') as f:
-                f.write(content)
+            self._replace(self._stage(path_obj, content), path_obj)
             
             return f"Successfully wrote to {path}"
         
         except Exception as e:
             return f"Write error: {str(e)}"
+    
+    def _write_batch(self, payload: str) -> str:
+        """Write many files in one call, each atomically; optionally all-or-nothing"""
+        try:
+            spec = json.loads(payload)
+        except json.JSONDecodeError as e:
+            return f"Invalid write_batch JSON: {str(e)}"
+        
+        if isinstance(spec, list):
+            spec = {"files": spec}
+        files = spec.get("files") if isinstance(spec, dict) else None
+        if not files or not all(isinstance(f, dict) and isinstance(f.get("path"), str)
+                                and isinstance(f.get("content"), str) for f in files):
+            return 'write_batch requires {"files": [{"path": "...", "content": "..."}, ...]}'
+        atomic = spec.get("atomic", True)
+        if not isinstance(atomic, bool):
+            return f'write_batch "atomic" must be true or false, not {json.dumps(atomic)}'
+        
+        targets = []
+        for entry in files:
+            path_obj = self._resolve_writable(entry["path"])
+            if isinstance(path_obj, str) and atomic:
+                return f"Batch write aborted, no files changed: {entry['path']}: {path_obj}"
+            targets.append((entry, path_obj))
+        if atomic and len({path_obj for _, path_obj in targets}) != len(targets):
+            return "Batch write aborted, no files changed: the same path appears more than once"
+        
+        if atomic:
+            return self._write_all_or_nothing(targets)
+        
+        results = []
+        for entry, path_obj in targets:
+            if isinstance(path_obj, str):
+                results.append(f"  failed {entry['path']}: {path_obj}")
+                continue
+            try:
+                self._replace(self._stage(path_obj, entry["content"]), path_obj)
+                results.append(f"  wrote {entry['path']}")
+            except Exception as e:
+                results.append(f"  failed {entry['path']}: {str(e)}")
+        written = sum(line.startswith("  wrote") for line in results)
+        return f"Wrote {written} of {len(targets)} files:\n" + "\n".join(results)
+    
+    def _write_all_or_nothing(self, targets) -> str:
+        """Stage every file first, then swap them in; undo the swaps if any rename fails"""
+        # Parent directories _stage() will create, removed again on rollback
+        created = set()
+        for _, path_obj in targets:
+            parent = path_obj.parent
+            while not parent.exists():
+                created.add(parent)
+                parent = parent.parent
+        
+        staged = []
+        try:
+            for entry, path_obj in targets:
+                staged.append((path_obj, self._stage(path_obj, entry["content"])))
+        except Exception as e:
+            for _, tmp_path in staged:
+                os.unlink(tmp_path)
+            self._remove_dirs(created)
+            return f"Batch write aborted, no files changed: {str(e)}"
+        
+        committed = []  # (path, backup or None if the file is new)
+        try:
+            for path_obj, tmp_path in staged:
+                backup = None
+                if path_obj.exists():
+                    # Hard link keeps the old content reachable without a window where the path is missing
+                    backup = f"{tmp_path}.bak"
+                    try:
+                        os.link(path_obj, backup)
+                    except OSError:
+                        shutil.copy2(path_obj, backup)
+                os.replace(tmp_path, path_obj)
+                committed.append((path_obj, backup))
+        except Exception as e:
+            for path_obj, backup in reversed(committed):
+                if backup is None:
+                    path_obj.unlink()
+                else:
+                    os.replace(backup, path_obj)
+            for path_obj, tmp_path in staged:
+                for leftover in (tmp_path, f"{tmp_path}.bak"):
+                    if os.path.exists(leftover):
+                        os.unlink(leftover)
+            self._remove_dirs(created)
+            return f"Batch write failed and was rolled back, no files changed: {str(e)}"
+        
+        for path_obj, backup in committed:
+            if backup is not None:
+                os.unlink(backup)
+        for directory in {path_obj.parent for path_obj, _ in committed}:
+            self._fsync_dir(directory)
+        return f"Wrote {len(committed)} files atomically: " + ", ".join(entry["path"] for entry, _ in targets)
+    
+    @staticmethod
+    def _remove_dirs(directories):
+        """Remove directories a rolled-back batch created, deepest first, if they are empty"""
+        for directory in sorted(directories, key=lambda d: len(d.parts), reverse=True):
+            try:
+                directory.rmdir()
+            except OSError:
+                pass
 
 
 class CalculatorTool:
@@ -283,18 +673,74 @@ class CalculatorTool:
             return "Error: Division by zero"
         except Exception as e:
             return f"Calculation error: {str(e)}"
+    
+    async def acalculate(self, expression: str) -> str:
+        """Async variant of calculate() (CPU-bound and tiny, so it runs inline)"""
+        return self.calculate(expression)
 
 
 class PythonREPLTool:
-    """Tool for executing Python code safely"""
+    """Tool for executing Python code safely
     
-    def __init__(self):
+    By default code runs in-process. Pass a ``repl_sandbox.SandboxPool`` as
+    ``sandbox`` to run it in isolated worker processes instead, with CPU,
+    memory and wall-clock limits; concurrent executions then run in
+    parallel rather than one at a time. With a ``repl_sandbox.SessionManager``
+    as ``sessions``, input whose first line is ``session:<name>`` runs in a
+    named session whose variables persist between calls.
+    """
+    
+    _SESSION_HEADER = re.compile(r'\s*session:([\w.-]+)(?::(close))?[ \t]*(?:\n|$)')
+    
+    SAFE_BUILTINS = {
+        'print': print,
+        'len': len,
+        'range': range,
+        'sum': sum,
+        'max': max,
+        'min': min,
+        'abs': abs,
+        'round': round,
+        'sorted': sorted,
+        'list': list,
+        'dict': dict,
+        'set': set,
+        'tuple': tuple,
+        'str': str,
+        'int': int,
+        'float': float,
+        'bool': bool,
+    }
+    
+    # redirect_stdout swaps the process-wide sys.stdout, so in-process
+    # executions must not overlap across threads, whichever instance runs them
+    _exec_lock = threading.Lock()
+    
+    def __init__(self, sandbox=None, sessions=None):
         self.name = "python_repl"
         self.description = "Execute Python code safely. Input should be Python code to execute."
+        if sessions is not None:
+            self.description += (
+                " Start the input with a line 'session:<name>' to run it in a persistent session: "
+                "variables defined there are still available in later calls to the same session. "
+                "'session:<name>:close' discards a session."
+            )
+        self.sandbox = sandbox
+        self.sessions = sessions
     
     def execute(self, code: str) -> str:
         """Execute Python code safely"""
         try:
+            header = self._SESSION_HEADER.match(code)
+            if header and self.sessions is None:
+                return "Error: REPL sessions are not enabled for this tool"
+            if header:
+                session, close = header.group(1), header.group(2)
+                if close:
+                    closed = self.sessions.close_session(session)
+                    return f"Closed session '{session}'" if closed else f"No open session named '{session}'"
+                code = code[header.end():]
+            
             # Security checks
             dangerous_imports = ['os', 'sys', 'subprocess', 'shutil', 'glob', 'pathlib']
             dangerous_functions = ['open', 'exec', 'eval', 'compile', '__import__']
@@ -304,35 +750,26 @@ class PythonREPLTool:
                 if danger in code_lower:
                     return f"Error: Dangerous operation detected: {danger}"
             
+            if header:
+                outcome = self.sessions.execute(session, code, builtins=self.SAFE_BUILTINS)
+                timing = (f"[session '{session}' step {outcome.step}: {outcome.elapsed:.2f}s wall, "
+                          f"{outcome.cpu_time:.2f}s CPU, peak {outcome.peak_memory_mb:.0f} MB]")
+                if outcome.worker_lost:
+                    timing += " Session state was lost; the next call starts a fresh namespace."
+                return f"{self._format_outcome(outcome)}\n{timing}"
+            
+            if self.sandbox is not None:
+                return self._format_outcome(self.sandbox.execute(code, builtins=self.SAFE_BUILTINS))
+            
             # Create a restricted environment
-            safe_globals = {
-                '__builtins__': {
-                    'print': print,
-                    'len': len,
-                    'range': range,
-                    'sum': sum,
-                    'max': max,
-                    'min': min,
-                    'abs': abs,
-                    'round': round,
-                    'sorted': sorted,
-                    'list': list,
-                    'dict': dict,
-                    'set': set,
-                    'tuple': tuple,
-                    'str': str,
-                    'int': int,
-                    'float': float,
-                    'bool': bool,
-                }
-            }
+            safe_globals = {'__builtins__': dict(self.SAFE_BUILTINS)}
             
             # Capture output
             import io
             import contextlib
             
             output = io.StringIO()
-            with contextlib.redirect_stdout(output):
+            with self._exec_lock, contextlib.redirect_stdout(output):
                 exec(code, safe_globals)
             
             result = output.getvalue()
@@ -340,55 +777,196 @@ class PythonREPLTool:
         
         except Exception as e:
             return f"Python execution error: {str(e)}"
+    
+    @staticmethod
+    def _format_outcome(outcome) -> str:
+        """Render a repl_sandbox.SandboxResult like an in-process execution"""
+        result = outcome.output
+        if outcome.truncated:
+            result += "\n[output truncated]"
+        if outcome.error is not None:
+            error = f"Python execution error: {outcome.error}"
+            return f"{error}\nOutput before the error:\n{result}" if result else error
+        return f"Python execution result:\n{result}" if result else "Code executed successfully (no output)"
+    
+    async def aexecute(self, code: str) -> str:
+        """Async variant of execute(); user code runs in a worker thread so it cannot stall the loop"""
+        return await asyncio.to_thread(self.execute, code)
+
+
+class _InvalidRequest(Exception):
+    """APITool input that cannot be turned into a request"""
 
 
 class APITool:
     """Tool for making HTTP requests to external APIs"""
     
-    def __init__(self):
+    def __init__(self, http_client: Optional[PooledHTTPClient] = None,
+                 async_http_client: Optional[AsyncPooledHTTPClient] = None):
         self.name = "api_request"
         self.description = "Make HTTP requests to APIs. Input format: 'GET:url' or 'POST:url:json_data'"
+        self.http = http_client or get_shared_client()
+        self._async_http = async_http_client
+    
+    @property
+    def async_http(self) -> AsyncPooledHTTPClient:
+        """Async client for the running event loop (shared unless one was injected)"""
+        return self._async_http or get_shared_async_client()
+    
+    @staticmethod
+    def _split_post_target(target: str):
+        """Split 'url:json_data' where both the URL and the JSON may contain colons"""
+        match = re.search(r':\s*[\[{]', target)
+        if not match:
+            return target, None
+        return target[:match.start()], target[match.start() + 1:]
+    
+    def _parse(self, request_info: str):
+        """Parse tool input into (method, url, json_data); raises _InvalidRequest with a user-facing message"""
+        method, sep, target = request_info.partition(':')
+        
+        if not sep or not target:
+            raise _InvalidRequest("Invalid request format. Use 'GET:url' or 'POST:url:json_data'")
+        
+        method = method.strip().upper()
+        
+        if method == 'GET':
+            return method, target.strip(), None
+        
+        if method == 'POST':
+            url, payload = self._split_post_target(target.strip())
+            if payload is None:
+                if ':' not in url.split('://', 1)[-1]:
+                    raise _InvalidRequest("POST request requires data. Use 'POST:url:json_data'")
+                # Data present but not a JSON object/array
+                url, payload = url.rsplit(':', 1)
+            return method, url, json.loads(payload)
+        
+        raise _InvalidRequest(f"Unsupported method: {method}. Use GET or POST")
     
     def request(self, request_info: str) -> str:
         """Make HTTP request"""
         try:
-            parts = request_info.split(':', 2)
-            
-            if len(parts) < 2:
-                return "Invalid request format. Use 'GET:url' or 'POST:url:json_data'"
-            
-            method = parts[0].upper()
-            url = parts[1]
+            method, url, data = self._parse(request_info)
             
             if method == 'GET':
-                response = requests.get(url, timeout=10)
-                return f"GET {url}\nStatus: {response.status_code}\nResponse: {response.text[:500]}"
-            
-            elif method == 'POST':
-                if len(parts) < 3:
-                    return "POST request requires data. Use 'POST:url:json_data'"
-                
-                data = json.loads(parts[2])
-                response = requests.post(url, json=data, timeout=10)
-                return f"POST {url}\nStatus: {response.status_code}\nResponse: {response.text[:500]}"
-            
+                response = self.http.get(url, timeout=10)
             else:
-                return f"Unsupported method: {method}. Use GET or POST"
+                response = self.http.post(url, json=data, timeout=10)
+            return f"{method} {url}\nStatus: {response.status_code}\nResponse: {response.text[:500]}"
         
         except json.JSONDecodeError:
             return "Error: Invalid JSON data for POST request"
+        except _InvalidRequest as e:
+            return str(e)
         except requests.RequestException as e:
             return f"Request error: {str(e)}"
         except Exception as e:
             return f"API request error: {str(e)}"
+    
+    async def arequest(self, request_info: str) -> str:
+        """Async variant of request() on the shared async HTTP pool"""
+        try:
+            method, url, data = self._parse(request_info)
+            
+            if method == 'GET':
+                response = await self.async_http.get(url, timeout=10)
+            else:
+                response = await self.async_http.post(url, json=data, timeout=10)
+            return f"{method} {url}\nStatus: {response.status_code}\nResponse: {response.text[:500]}"
+        
+        except json.JSONDecodeError:
+            return "Error: Invalid JSON data for POST request"
+        except _InvalidRequest as e:
+            return str(e)
+        except httpx.HTTPError as e:
+            return f"Request error: {str(e)}"
+        except Exception as e:
+            return f"API request error: {str(e)}"
 
 
 class DatabaseTool:
-    """Tool for simple SQLite database operations"""
+    """Tool for simple SQLite database operations
     
-    def __init__(self):
+    Calls share one database for the lifetime of the tool: a private
+    shared-cache in-memory database by default, or a file when ``database``
+    is given (opened in WAL mode). Connections come from a small pool and
+    keep their prepared-statement cache between calls.
+    """
+    
+    _IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+    _memory_ids = itertools.count(1)
+    FETCH_BATCH = 64
+    
+    def __init__(self, database: Optional[str] = None, pool_size: int = 4,
+                 max_rows: int = 100, cached_statements: int = 128):
         self.name = "database"
-        self.description = "Perform SQLite database operations. Input format: 'CREATE:table_name' or 'SELECT:query' or 'INSERT:table:data'"
+        self.description = "Perform SQLite database operations. Input format: 'CREATE:table_name' or 'SELECT:query' or 'INSERT:table:data' (data may be a JSON array to insert several rows)"
+        self.max_rows = max_rows
+        self.cached_statements = cached_statements
+        if database is None:
+            # Session-scoped: lives as long as one pooled connection stays open
+            self.database = f"file:react_agent_db_{os.getpid()}_{next(self._memory_ids)}?mode=memory&cache=shared"
+            self.in_memory = True
+        else:
+            self.database = str(database)
+            self.in_memory = False
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._open = 0
+        self._pool_size = pool_size
+        self._pool_lock = threading.Lock()
+        self._write_lock = threading.Lock() if self.in_memory else contextlib.nullcontext()
+        self._closed = False
+        # Open one connection eagerly so the in-memory database exists from the start
+        self._open = 1
+        self._pool.put(self._connect())
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a pooled connection (the caller has already reserved its slot)"""
+        conn = sqlite3.connect(
+            self.database,
+            uri=self.in_memory,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        if self.in_memory:
+            # Shared-cache table locks fail immediately instead of honouring
+            # busy_timeout; readers skip them and writers take _write_lock
+            conn.execute("PRAGMA read_uncommitted=1")
+        else:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+    
+    @contextlib.contextmanager
+    def _connection(self):
+        """Borrow a pooled connection, opening a new one while under pool_size"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Database tool is closed")
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                can_open = self._open < self._pool_size
+                if can_open:
+                    self._open += 1
+            if can_open:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._pool_lock:
+                        self._open -= 1
+                    raise
+            else:
+                conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._pool.put(conn)
     
     def operate(self, operation: str) -> str:
         """Perform database operation"""
@@ -400,46 +978,103 @@ class DatabaseTool:
             
             op_type = parts[0].upper()
             
-            # Use in-memory database for safety
-            conn = sqlite3.connect(':memory:')
-            cursor = conn.cursor()
-            
-            if op_type == 'CREATE':
-                table_name = parts[1]
-                cursor.execute(f"CREATE TABLE {table_name} (id INTEGER PRIMARY KEY, data TEXT)")
-                conn.commit()
-                return f"Created table: {table_name}"
-            
-            elif op_type == 'SELECT':
-                query = parts[1]
-                cursor.execute(query)
-                results = cursor.fetchall()
-                return f"Query results: {results}"
-            
-            elif op_type == 'INSERT':
-                if len(parts) < 3:
-                    return "INSERT operation requires table and data"
+            with self._connection() as conn:
+                if op_type == 'CREATE':
+                    table_name = self._table_name(parts[1])
+                    with self._write_lock, conn:
+                        conn.execute(f"CREATE TABLE {table_name} (id INTEGER PRIMARY KEY, data TEXT)")
+                    return f"Created table: {table_name}"
                 
-                table_name = parts[1]
-                data = parts[2]
-                cursor.execute(f"INSERT INTO {table_name} (data) VALUES (?)", (data,))
-                conn.commit()
-                return f"Inserted data into {table_name}"
-            
-            else:
-                return f"Unknown operation: {op_type}"
+                elif op_type == 'SELECT':
+                    # The query itself may contain colons
+                    return self._select(conn, operation.split(':', 1)[1])
+                
+                elif op_type == 'INSERT':
+                    if len(parts) < 3:
+                        return "INSERT operation requires table and data"
+                    
+                    table_name = self._table_name(parts[1])
+                    rows = self._rows(parts[2])
+                    with self._write_lock, conn:
+                        conn.executemany(f"INSERT INTO {table_name} (data) VALUES (?)", rows)
+                    if len(rows) == 1:
+                        return f"Inserted data into {table_name}"
+                    return f"Inserted {len(rows)} rows into {table_name}"
+                
+                else:
+                    return f"Unknown operation: {op_type}"
         
         except Exception as e:
             return f"Database error: {str(e)}"
+    
+    async def aoperate(self, operation: str) -> str:
+        """Async variant of operate(); sqlite calls run in a worker thread"""
+        return await asyncio.to_thread(self.operate, operation)
+    
+    def _table_name(self, name: str) -> str:
+        name = name.strip()
+        if not self._IDENTIFIER.match(name):
+            raise ValueError(f"Invalid table name: {name!r}")
+        return name
+    
+    @staticmethod
+    def _rows(data: str) -> List[tuple]:
+        """A JSON array becomes one row per element; anything else is a single row"""
+        if data.lstrip().startswith('['):
+            try:
+                items = json.loads(data)
+            except json.JSONDecodeError:
+                items = None
+            if isinstance(items, list) and items:
+                return [(item if isinstance(item, str) else json.dumps(item),) for item in items]
+        return [(data,)]
+    
+    def _select(self, conn: sqlite3.Connection, query: str) -> str:
+        """Stream rows in batches and stop at max_rows instead of fetchall()
+        
+        The query runs with ``query_only`` set, so a "SELECT:" that is really a
+        DROP or DELETE fails instead of changing the (possibly on-disk) database.
+        """
+        conn.execute("PRAGMA query_only=1")
+        try:
+            cursor = conn.execute(query)
+        except Exception:
+            conn.execute("PRAGMA query_only=0")
+            raise
+        try:
+            results = []
+            while len(results) < self.max_rows:
+                batch = cursor.fetchmany(min(self.FETCH_BATCH, self.max_rows - len(results)))
+                if not batch:
+                    break
+                results.extend(batch)
+            truncated = len(results) >= self.max_rows and cursor.fetchone() is not None
         finally:
-            if 'conn' in locals():
-                conn.close()
+            cursor.close()
+            # Don't hand a connection back to the pool mid-transaction
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute("PRAGMA query_only=0")
+        
+        output = f"Query results: {results}"
+        if truncated:
+            output += f"\n(showing first {self.max_rows} rows; refine the query or add LIMIT to see more)"
+        return output
+    
+    def close(self):
+        """Close every pooled connection (drops a session-scoped database)"""
+        self._closed = True
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
 
 
 def get_basic_tools() -> List[Tool]:
     """Get a list of basic tools for the ReAct agent"""
     
-    # Initialize tool instances
+    # Initialize tool instances (HTTP tools share one pooled session)
     web_search = WebSearchTool()
     code_analysis = CodeAnalysisTool()
     file_system = FileSystemTool()
@@ -448,42 +1083,50 @@ def get_basic_tools() -> List[Tool]:
     api_tool = APITool()
     database = DatabaseTool()
     
-    # Create LangChain Tool objects
+    # Create LangChain Tool objects; coroutine= lets async agents await the
+    # tools on their own event loop instead of a thread per call
     tools = [
         Tool(
             name=web_search.name,
             description=web_search.description,
-            func=web_search.search
+            func=web_search.search,
+            coroutine=web_search.asearch
         ),
         Tool(
             name=code_analysis.name,
             description=code_analysis.description,
-            func=code_analysis.analyze
+            func=code_analysis.analyze,
+            coroutine=code_analysis.aanalyze
         ),
         Tool(
             name=file_system.name,
             description=file_system.description,
-            func=file_system.operate
+            func=file_system.operate,
+            coroutine=file_system.aoperate
         ),
         Tool(
             name=calculator.name,
             description=calculator.description,
-            func=calculator.calculate
+            func=calculator.calculate,
+            coroutine=calculator.acalculate
         ),
         Tool(
             name=python_repl.name,
             description=python_repl.description,
-            func=python_repl.execute
+            func=python_repl.execute,
+            coroutine=python_repl.aexecute
         ),
         Tool(
             name=api_tool.name,
             description=api_tool.description,
-            func=api_tool.request
+            func=api_tool.request,
+            coroutine=api_tool.arequest
         ),
         Tool(
             name=database.name,
             description=database.description,
-            func=database.operate
+            func=database.operate,
+            coroutine=database.aoperate
         )
     ]
     
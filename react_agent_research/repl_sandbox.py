@@ -0,0 +1,479 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = []
+# ///
+
+"""
+REPL Sandbox
+Runs untrusted Python snippets in a pool of pre-started worker processes.
+Each execution gets a CPU-time and memory rlimit, a wall-clock timeout
+(the worker is killed and replaced when it is exceeded) and its own output
+buffer. Workers are recycled after a number of executions so the pool stays
+warm without letting state or leaked memory pile up.
+
+SessionManager runs named sessions instead: each session owns one worker
+whose namespace survives between calls, so data loaded in one ReAct step
+is still there in the next. Idle sessions are evicted.
+"""
+
+import contextlib
+import io
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows: only the wall-clock timeout applies
+    resource = None
+
+
+@dataclass
+class SandboxResult:
+    """Outcome of one SandboxPool.execute() call"""
+    output: str = ""
+    error: Optional[str] = None
+    timed_out: bool = False
+    worker_lost: bool = False
+    truncated: bool = False
+    elapsed: float = 0.0
+    cpu_time: float = 0.0
+    peak_memory_mb: float = 0.0
+    worker_pid: Optional[int] = None
+    session: Optional[str] = None
+    step: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _CPULimitExceeded(BaseException):
+    """Raised inside a worker when its per-execution CPU budget runs out"""
+
+
+class _CappedOutput(io.TextIOBase):
+    """stdout/stderr replacement that keeps at most ``limit`` characters"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.truncated = False
+        self._parts = []
+        self._size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        room = self.limit - self._size
+        if len(text) > room:
+            text = text[:max(room, 0)]
+            self.truncated = True
+        self._parts.append(text)
+        self._size += len(text)
+        return len(text)
+
+    def getvalue(self) -> str:
+        return ''.join(self._parts)
+
+
+def _address_space() -> int:
+    """Current virtual memory size of this process in bytes (0 if unknown)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _set_soft_limit(kind: int, soft: int):
+    _, hard = resource.getrlimit(kind)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(kind, (soft, hard))
+
+
+def _peak_memory_mb() -> float:
+    """Peak resident set size of this process in MB (0 if unknown)"""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _on_cpu_limit(signum, frame):
+    raise _CPULimitExceeded()
+
+
+def _worker_main(conn, cpu_seconds: Optional[float], memory_mb: Optional[int], max_output: int,
+                 persistent: bool = False):
+    """Worker loop: receive (code, builtins), execute, send (output, error, truncated, cpu, peak)
+
+    With ``persistent`` the namespace is kept between executions.
+    """
+    # The parent owns Ctrl-C handling; a stray SIGINT must not kill idle workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if resource is not None:
+        if memory_mb:
+            # Relative to the idle footprint, so the limit means the same on every platform
+            _set_soft_limit(resource.RLIMIT_AS, _address_space() + memory_mb * 1024 * 1024)
+        if cpu_seconds:
+            signal.signal(signal.SIGXCPU, _on_cpu_limit)
+
+    namespace: Dict[str, Any] = {}
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        code, builtins = message
+
+        output = _CappedOutput(max_output)
+        error = None
+        if not persistent:
+            namespace = {}
+        if builtins is not None:
+            namespace['__builtins__'] = builtins
+        cpu_start = time.process_time()
+        if resource is not None and cpu_seconds:
+            # RLIMIT_CPU counts the whole process lifetime, so grant a fresh budget each time
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            _set_soft_limit(resource.RLIMIT_CPU, int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1)
+        try:
+            with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+                exec(compile(code, '<sandbox>', 'exec'), namespace)
+        except _CPULimitExceeded:
+            error = f"CPU time limit exceeded ({cpu_seconds}s)"
+        except MemoryError:
+            error = f"Memory limit exceeded ({memory_mb} MB)"
+        except BaseException as e:
+            error = str(e) or type(e).__name__
+        finally:
+            if resource is not None and cpu_seconds:
+                _set_soft_limit(resource.RLIMIT_CPU, resource.RLIM_INFINITY)
+
+        try:
+            conn.send((output.getvalue(), error, output.truncated,
+                       time.process_time() - cpu_start, _peak_memory_mb()))
+        except (OSError, ValueError):
+            break
+
+
+def _default_context():
+    # forkserver workers fork from a small clean process instead of the agent
+    # itself, which may hold threads, sockets and a large heap
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class _Worker:
+    def __init__(self, context, cpu_seconds, memory_mb, max_output, persistent=False):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, cpu_seconds, memory_mb, max_output, persistent),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.executions = 0
+
+    def run(self, code: str, builtins, timeout: float) -> Tuple[SandboxResult, bool]:
+        """Execute one snippet; returns the result and whether the worker must be replaced"""
+        start = time.perf_counter()
+        result = SandboxResult(worker_pid=self.process.pid)
+        replace = False
+        try:
+            self.conn.send((code, builtins))
+            if self.conn.poll(timeout):
+                (result.output, result.error, result.truncated,
+                 result.cpu_time, result.peak_memory_mb) = self.conn.recv()
+            else:
+                result.timed_out = True
+                result.error = f"Execution timed out after {timeout}s"
+                replace = True
+        except (EOFError, OSError) as e:
+            # The worker died mid-run, e.g. SIGKILL from the OS on a hard limit
+            result.error = f"Sandbox worker exited unexpectedly ({e.__class__.__name__})"
+            replace = True
+        except Exception as e:
+            # Typically an unpicklable builtins mapping; the worker is still idle
+            result.error = f"Could not send code to the sandbox: {e}"
+        result.elapsed = time.perf_counter() - start
+        result.worker_lost = replace
+        self.executions += 1
+        return result, replace
+
+    def stop(self, timeout: float = 1.0):
+        """Ask the worker to exit, killing it if it does not"""
+        with contextlib.suppress(OSError, ValueError):
+            self.conn.send(None)
+        self.process.join(timeout)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class SandboxPool:
+    """A fixed-size pool of sandboxed Python worker processes
+
+    ``execute`` blocks until a worker is free, so the pool also bounds how
+    many snippets run at once. ``cpu_seconds`` and ``memory_mb`` are
+    enforced with rlimits where the ``resource`` module exists (POSIX);
+    ``timeout`` is wall-clock time measured by the parent, which kills and
+    replaces the worker when it is exceeded. A worker is replaced after
+    ``max_executions`` runs.
+    """
+
+    def __init__(self, workers: int = 2, timeout: float = 10.0, cpu_seconds: Optional[float] = 5.0,
+                 memory_mb: Optional[int] = 256, max_executions: int = 50, max_output: int = 64 * 1024,
+                 context=None):
+        self.size = workers
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_executions = max_executions
+        self.max_output = max_output
+        self._context = context or _default_context()
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(workers):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._context, self.cpu_seconds, self.memory_mb, self.max_output)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _retire(self, worker: _Worker, kill: bool = False):
+        with self._lock:
+            self._workers.discard(worker)
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+
+    def execute(self, code: str, builtins: Optional[Dict[str, Any]] = None) -> SandboxResult:
+        """Run ``code`` in a worker with a fresh namespace
+
+        ``builtins`` replaces the namespace's ``__builtins__``; ``None`` leaves
+        the worker's standard builtins available.
+        """
+        if self._closed:
+            raise RuntimeError("SandboxPool is closed")
+        worker = self._idle.get()
+        result, replace = worker.run(code, builtins, self.timeout)
+        if replace or worker.executions >= self.max_executions or self._closed:
+            self._retire(worker, kill=replace)
+            if not self._closed:
+                worker = self._spawn()
+            else:
+                return result
+        self._idle.put(worker)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pids = sorted(worker.process.pid for worker in self._workers)
+        return {"workers": self.size, "idle": self._idle.qsize(), "pids": pids}
+
+    def close(self):
+        """Stop every worker; executions in progress finish first"""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._retire(worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@dataclass
+class _Session:
+    name: str
+    worker: _Worker
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    created: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    steps: List[SandboxResult] = field(default_factory=list)
+
+
+class SessionManager:
+    """Named REPL sessions whose namespaces persist in their own worker process
+
+    Each session gets a dedicated worker with the same CPU, memory and
+    wall-clock limits as SandboxPool; ``memory_mb`` therefore caps what one
+    session's namespace can grow to. Calls to the same session run one at a
+    time, different sessions run in parallel. Sessions unused for
+    ``idle_timeout`` seconds are stopped by a background reaper, and when
+    ``max_sessions`` are open the least recently used one is evicted to make
+    room. A timeout or crash loses that session's state; the next call
+    starts it again from an empty namespace.
+    """
+
+    def __init__(self, max_sessions: int = 8, idle_timeout: float = 600.0, timeout: float = 30.0,
+                 cpu_seconds: Optional[float] = 30.0, memory_mb: Optional[int] = 512,
+                 max_output: int = 64 * 1024, max_steps: int = 100, context=None):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_output = max_output
+        self.max_steps = max_steps
+        self._context = context or _default_context()
+        self._sessions: Dict[str, _Session] = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+
+    def _start_reaper(self):
+        if self._reaper is None and self.idle_timeout:
+            self._reaper = threading.Thread(target=self._reap, name="repl-session-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap(self):
+        interval = max(min(self.idle_timeout / 4, 30.0), 0.05)
+        while not self._closed.wait(interval):
+            self.evict_idle()
+
+    def _session(self, name: str) -> _Session:
+        """Return the named session, starting it (and evicting if full) as needed"""
+        evicted = []
+        with self._lock:
+            if self._closed.is_set():
+                raise RuntimeError("SessionManager is closed")
+            session = self._sessions.get(name)
+            if session is None:
+                while len(self._sessions) >= self.max_sessions:
+                    oldest = min(self._sessions.values(), key=lambda s: s.last_used)
+                    evicted.append(self._sessions.pop(oldest.name))
+                worker = _Worker(self._context, self.cpu_seconds, self.memory_mb, self.max_output,
+                                 persistent=True)
+                session = self._sessions[name] = _Session(name, worker)
+                self._start_reaper()
+            session.last_used = time.monotonic()
+        for old in evicted:
+            with old.lock:
+                old.worker.stop()
+        return session
+
+    def execute(self, name: str, code: str, builtins: Optional[Dict[str, Any]] = None) -> SandboxResult:
+        """Run ``code`` in session ``name``, creating the session on first use"""
+        while True:
+            session = self._session(name)
+            with session.lock:
+                if self._sessions.get(name) is not session:
+                    continue  # evicted while we waited for the lock
+                result, replace = session.worker.run(code, builtins, self.timeout)
+                result.session = name
+                result.step = session.worker.executions
+                session.steps.append(result)
+                del session.steps[:-self.max_steps]
+                session.last_used = time.monotonic()
+                if replace:
+                    self._drop(name, session, kill=True)
+                return result
+
+    def _drop(self, name: str, session: _Session, kill: bool = False):
+        with self._lock:
+            if self._sessions.get(name) is session:
+                del self._sessions[name]
+        if kill:
+            session.worker.kill()
+        else:
+            session.worker.stop()
+
+    def close_session(self, name: str) -> bool:
+        """Stop a session and discard its namespace; False if it did not exist"""
+        with self._lock:
+            session = self._sessions.get(name)
+        if session is None:
+            return False
+        with session.lock:
+            self._drop(name, session)
+        return True
+
+    def evict_idle(self) -> List[str]:
+        """Stop sessions idle for longer than ``idle_timeout``; returns their names"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [s for s in self._sessions.values() if now - s.last_used > self.idle_timeout]
+        evicted = []
+        for session in idle:
+            # Skip sessions that are running right now
+            if session.lock.acquire(blocking=False):
+                try:
+                    if time.monotonic() - session.last_used > self.idle_timeout:
+                        self._drop(session.name, session)
+                        evicted.append(session.name)
+                finally:
+                    session.lock.release()
+        return evicted
+
+    def report(self, name: str) -> List[Dict[str, Any]]:
+        """Per-step timing for a session: wall time, CPU time, peak memory and outcome"""
+        session = self._sessions.get(name)
+        if session is None:
+            return []
+        return [
+            {"step": r.step, "elapsed": r.elapsed, "cpu_time": r.cpu_time,
+             "peak_memory_mb": r.peak_memory_mb, "ok": r.ok, "timed_out": r.timed_out}
+            for r in list(session.steps)
+        ]
+
+    def sessions(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {"pid": s.worker.process.pid, "steps": s.worker.executions,
+                       "idle": now - s.last_used, "age": now - s.created}
+                for name, s in self._sessions.items()
+            }
+
+    def close(self):
+        """Stop the reaper and every session"""
+        self._closed.set()
+        with self._lock:
+            sessions = list(self._sessions.items())
+        for name, session in sessions:
+            with session.lock:
+                self._drop(name, session)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    with SandboxPool(workers=2, timeout=2.0) as pool:
+        for snippet in ("print(sum(range(10)))", "while True: pass", "x = 'a' * (1 << 34)", "print('ok')"):
+            outcome = pool.execute(snippet)
+            print(f"{snippet!r}: output={outcome.output!r} error={outcome.error!r} "
+                  f"pid={outcome.worker_pid} {outcome.elapsed:.2f}s")
@@ -0,0 +1,213 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#   "langchain>=0.1.0",
+# ]
+# ///
+
+"""
+Summarizing Memory
+A bounded conversation memory for LangChainReactAgent: recent messages are
+kept verbatim within a token budget, older ones are folded into a running
+summary by a background thread so the next turn never waits for the LLM.
+Per-turn hooks report how many tokens the summary saved.
+"""
+
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.prompt import SUMMARY_PROMPT
+from langchain_core.messages import BaseMessage, SystemMessage, get_buffer_string
+from pydantic import PrivateAttr
+
+
+def approximate_tokens(messages: List[BaseMessage]) -> int:
+    """Rough token count (4 characters per token); needs no tokenizer download"""
+    return sum(len(get_buffer_string([message])) for message in messages) // 4
+
+
+@dataclass
+class MemoryTurnReport:
+    """What one turn's prompt history cost compared with keeping everything"""
+    turn: int
+    full_tokens: int
+    sent_tokens: int
+    summarized_messages: int
+    pending_messages: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(self.full_tokens - self.sent_tokens, 0)
+
+
+class SummarizingMemory(BaseChatMemory):
+    """Token-budgeted chat memory with background summarization
+
+    ``chat_memory`` holds only the verbatim tail. Once it exceeds
+    ``max_token_limit``, the oldest messages are moved out, in chunks, and
+    queued for summarization on a single background thread. Until a chunk
+    has been folded into the summary it is still sent verbatim, so nothing is
+    lost while the summarizer catches up. Summaries are cached by content, so
+    replaying the same history does not call the LLM again.
+    """
+
+    llm: Any
+    memory_key: str = "chat_history"
+    max_token_limit: int = 2000
+    token_counter: Callable[[List[BaseMessage]], int] = approximate_tokens
+    summary_prefix: str = "Summary of the earlier conversation:"
+
+    _summary: str = PrivateAttr(default="")
+    _pending: Deque[List[BaseMessage]] = PrivateAttr(default_factory=deque)
+    _summary_cache: Dict[str, str] = PrivateAttr(default_factory=dict)
+    _hooks: List[Callable[[MemoryTurnReport], None]] = PrivateAttr(default_factory=list)
+    _executor: Optional[ThreadPoolExecutor] = PrivateAttr(default=None)
+    _future: Optional[Future] = PrivateAttr(default=None)
+    _draining: bool = PrivateAttr(default=False)
+    _lock: Any = PrivateAttr(default_factory=threading.RLock)
+    _generation: int = PrivateAttr(default=0)
+    _turns: int = PrivateAttr(default=0)
+    _full_tokens: int = PrivateAttr(default=0)
+    _summarized: int = PrivateAttr(default=0)
+    _errors: int = PrivateAttr(default=0)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    @property
+    def summary(self) -> str:
+        return self._summary
+
+    def add_hook(self, hook: Callable[[MemoryTurnReport], None]):
+        """Call ``hook(report)`` each time the history is loaded for a turn"""
+        self._hooks.append(hook)
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            messages: List[BaseMessage] = []
+            if self._summary:
+                messages.append(SystemMessage(content=f"{self.summary_prefix}\n{self._summary}"))
+            pending = [message for chunk in self._pending for message in chunk]
+            messages.extend(pending)
+            messages.extend(self.chat_memory.messages)
+            self._turns += 1
+            report = MemoryTurnReport(
+                turn=self._turns,
+                full_tokens=self._full_tokens,
+                sent_tokens=self.token_counter(messages),
+                summarized_messages=self._summarized,
+                pending_messages=len(pending),
+            )
+        for hook in list(self._hooks):
+            hook(report)
+
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        before = len(self.chat_memory.messages)
+        super().save_context(inputs, outputs)
+        with self._lock:
+            self._full_tokens += self.token_counter(self.chat_memory.messages[before:])
+            self._compact()
+
+    def _compact(self):
+        """Move the oldest verbatim messages out until the tail fits the budget"""
+        buffer = self.chat_memory.messages
+        if self.token_counter(buffer) <= self.max_token_limit:
+            return
+        # Trim to half the budget so compaction does not run on every turn
+        remaining = self.token_counter(buffer)
+        target = self.max_token_limit // 2
+        cut = 0
+        while cut < len(buffer) - 1 and remaining > target:
+            remaining -= self.token_counter([buffer[cut]])
+            cut += 1
+        chunk = list(buffer[:cut])
+        self.chat_memory.messages = list(buffer[cut:])
+        self._pending.append(chunk)
+        self._schedule()
+
+    def _schedule(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summarizer")
+        # Called under the lock; _drain clears the flag under the same lock
+        if not self._draining:
+            self._draining = True
+            self._future = self._executor.submit(self._drain)
+
+    def _drain(self):
+        """Fold pending chunks into the summary, oldest first (runs on the background thread)"""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._draining = False
+                    return
+                chunk = self._pending[0]
+                base = self._summary
+                generation = self._generation
+            new_lines = get_buffer_string(chunk)
+            key = hashlib.sha256(f"{base}\0{new_lines}".encode()).hexdigest()
+            summary = self._summary_cache.get(key)
+            if summary is None:
+                try:
+                    summary = self._summarize(base, new_lines)
+                except Exception:
+                    # Leave the chunk verbatim; the next compaction retries it
+                    with self._lock:
+                        self._errors += 1
+                        self._draining = False
+                    return
+                self._summary_cache[key] = summary
+            with self._lock:
+                if generation != self._generation:
+                    continue  # cleared meanwhile; drop this result and start on the new history
+                self._summary = summary
+                self._pending.popleft()
+                self._summarized += len(chunk)
+
+    def _summarize(self, summary: str, new_lines: str) -> str:
+        result = self.llm.invoke(SUMMARY_PROMPT.format(summary=summary, new_lines=new_lines))
+        return getattr(result, "content", result).strip()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until queued summaries are done; False on timeout"""
+        future = self._future
+        if future is None:
+            return True
+        try:
+            future.result(timeout)
+        except FutureTimeoutError:
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "turns": self._turns,
+                "verbatim_messages": len(self.chat_memory.messages),
+                "pending_messages": sum(len(chunk) for chunk in self._pending),
+                "summarized_messages": self._summarized,
+                "summary_tokens": self.token_counter([SystemMessage(content=self._summary)]) if self._summary else 0,
+                "full_history_tokens": self._full_tokens,
+                "summary_errors": self._errors,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            super().clear()
+            self._summary = ""
+            self._pending.clear()
+            # Results of summaries still running for the old history are discarded
+            self._generation += 1
+            self._turns = self._full_tokens = self._summarized = 0
@@ -0,0 +1,502 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#   "pytest>=7.0.0",
+#   "langchain-core>=0.2.0",
+#   "langchain>=0.1.0",
+#   "langchain-openai>=0.1.0",
+#   "python-dotenv>=1.0.0",
+#   "rich>=13.0.0",
+#   "mcp>=1.0.0",
+# ]
+# ///
+
+import asyncio
+import contextvars
+import json
+import sys
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from mcp_stdio_client import StdioMCPClient, MCPError, result_text, load_langchain_tools
+from mcp_calculator_server import MCPCalculatorServer
+from tool_result_cache import ToolCacheMiddleware, ToolResultCache, canonical_key, is_pure_tool, cache_pure_tools
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestStdioMCPClient:
+    """Test the StdioMCPClient against mcp_calculator_server.py"""
+
+    def test_initialize_handshake(self):
+        """Test the client completes initialize and reports server info"""
+        async def scenario():
+            async with StdioMCPClient() as client:
+                return client.server_info, client.connected
+
+        server_info, connected = run(scenario())
+
+        assert server_info["serverInfo"]["name"] == "calculator"
+        assert connected
+
+    def test_concurrent_calls_matched_by_id(self):
+        """Test many in-flight calls each get their own response"""
+        async def scenario():
+            async with StdioMCPClient() as client:
+                calls = [client.call_tool_text("calculate", {"expression": f"{i} * 3"}) for i in range(50)]
+                return await asyncio.gather(*calls)
+
+        results = run(scenario())
+
+        for i, text in enumerate(results):
+            assert text == f"{i} * 3 = {i * 3}"
+
+    def test_list_tools_cached(self):
+        """Test tools/list is only requested once"""
+        async def scenario():
+            async with StdioMCPClient() as client:
+                first = await client.list_tools()
+                second = await client.list_tools()
+                return first, second
+
+        first, second = run(scenario())
+
+        assert first is second
+        assert {tool["name"] for tool in first} == {"calculate", "convert_units"}
+
+    def test_unknown_tool_raises(self):
+        """Test tool-level errors surface as MCPError"""
+        async def scenario():
+            async with StdioMCPClient() as client:
+                await client.call_tool("missing_tool", {})
+
+        with pytest.raises(MCPError) as exc_info:
+            run(scenario())
+        assert exc_info.value.code == -32602
+
+    def test_pending_requests_fail_when_server_exits(self):
+        """Test outstanding requests fail instead of hanging if the server dies"""
+        async def scenario():
+            client = StdioMCPClient(command=sys.executable, args=["-c", "import sys; sys.stdin.readline()"])
+            await client.start()
+
+        with pytest.raises(ConnectionError):
+            run(scenario())
+
+    def test_result_text(self):
+        """Test extracting text from an MCP result"""
+        result = {"content": [{"type": "text", "text": "a"}, {"type": "text", "text": "b"}]}
+        assert result_text(result) == "a\nb"
+
+
+class TestPersistentMCPClient:
+    """Test the demo's long-lived MCP session against mcp_calculator_server.py"""
+
+    @pytest.fixture
+    def server(self, tmp_path):
+        """A launcher for the calculator server that records each server process's pid"""
+        from pathlib import Path
+
+        pids = tmp_path / "pids"
+        launcher = tmp_path / "server.py"
+        launcher.write_text(
+            "import os, runpy\n"
+            f"with open({str(pids)!r}, 'a') as f:\n"
+            "    f.write(f'{os.getpid()}\\n')\n"
+            f"runpy.run_path({str(Path(__file__).parent / 'mcp_calculator_server.py')!r}, run_name='__main__')\n"
+        )
+        return str(launcher), lambda: [int(pid) for pid in pids.read_text().split()]
+
+    @staticmethod
+    def alive(pid):
+        import os
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        return True
+
+    def test_session_is_reused(self, server):
+        """Test tool calls share one server process and session"""
+        from deepseek_mcp_demo import PersistentMCPClient, create_mcp_tools
+
+        script, pids = server
+        client = PersistentMCPClient(server_script=script)
+        try:
+            client.initialize_sync()
+            session = client._session
+            tools = {tool.name: tool for tool in run(create_mcp_tools(client))}
+
+            results = [tools["calculate"].func(f"{i} + 1") for i in range(5)]
+            assert results == [f"{i} + 1 = {i + 1}" for i in range(5)]
+            assert client._session is session and len(pids()) == 1
+            # Protocol errors are reported, not mistaken for a lost connection
+            with pytest.raises(Exception, match="missing_tool"):
+                client.call_tool_sync("missing_tool", {})
+            assert client.reconnects == 0
+        finally:
+            client.close()
+
+    def test_reconnects_after_server_dies(self, server):
+        """Test the next call after the server is killed starts a new server and succeeds"""
+        import os
+        import signal
+        from deepseek_mcp_demo import PersistentMCPClient
+
+        script, pids = server
+        client = PersistentMCPClient(server_script=script)
+        try:
+            client.initialize_sync()
+            os.kill(pids()[0], signal.SIGKILL)
+
+            result = client.call_tool_sync("calculate", {"expression": "6 * 7"}, timeout=30)
+            assert result["content"][0]["text"] == "6 * 7 = 42"
+            assert client.reconnects == 1 and len(pids()) == 2
+        finally:
+            client.close()
+
+    def test_close_stops_server_and_loop(self, server):
+        """Test close() ends the server process and the bridge thread, and is idempotent"""
+        from deepseek_mcp_demo import PersistentMCPClient
+
+        script, pids = server
+        client = PersistentMCPClient(server_script=script)
+        client.initialize_sync()
+        client.close()
+        client.close()
+
+        deadline = time.monotonic() + 5
+        while self.alive(pids()[0]) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not self.alive(pids()[0])
+        assert client.bridge.loop.is_closed() and not client.bridge._thread.is_alive()
+        with pytest.raises(RuntimeError):
+            client.call_tool_sync("calculate", {"expression": "1 + 1"})
+
+
+class TestToolResultCache:
+    """Test the pure-tool result cache"""
+
+    def test_canonical_key_ignores_argument_order(self):
+        """Test argument order does not change the key"""
+        a = canonical_key("convert_units", {"value": 1, "from_unit": "m", "to_unit": "ft"})
+        b = canonical_key("convert_units", {"to_unit": "ft", "value": 1, "from_unit": "m"})
+        assert a == b
+
+    def test_lru_eviction(self):
+        """Test least recently used entries are evicted first"""
+        cache = ToolResultCache(max_entries=2)
+        cache.set("t:a", 1)
+        cache.set("t:b", 2)
+        cache.get("t:a")
+        cache.set("t:c", 3)
+
+        assert cache.get("t:b") is None
+        assert cache.get("t:a") == 1
+        assert cache.stats.evictions == 1
+
+    def test_ttl_expiry(self, monkeypatch):
+        """Test entries expire after their TTL"""
+        now = [100.0]
+        monkeypatch.setattr("tool_result_cache.time.monotonic", lambda: now[0])
+        cache = ToolResultCache(default_ttl=10)
+        cache.set("t:a", "x")
+
+        assert cache.get("t:a") == "x"
+        now[0] += 11
+        assert cache.get("t:a") is None
+        assert cache.stats.expirations == 1
+
+    def test_none_ttl_never_expires(self, monkeypatch):
+        """Test an explicit ttl=None overrides the cache's default TTL"""
+        now = [100.0]
+        monkeypatch.setattr("tool_result_cache.time.monotonic", lambda: now[0])
+        cache = ToolResultCache(default_ttl=10)
+        cache.set("t:a", "x", ttl=None)
+        cache.get_or_call("t", "b", lambda: "y", ttl=None)
+
+        now[0] += 11
+        assert cache.get("t:a") == "x"
+        assert cache.get(canonical_key("t", "b")) == "y"
+        assert cache.stats.expirations == 0
+
+    def test_hit_rate_reporting(self):
+        """Test hits and misses are counted per tool"""
+        cache = ToolResultCache()
+        calls = []
+        for _ in range(4):
+            cache.get_or_call("calculate", {"expression": "1+1"}, lambda: calls.append(1) or "2")
+
+        report = cache.report()
+        assert len(calls) == 1
+        assert report["hits"] == 3 and report["misses"] == 1
+        assert report["tools"]["calculate"]["hit_rate"] == 0.75
+
+    def test_errors_are_not_cached(self):
+        """Test a failing call is retried on the next lookup"""
+        cache = ToolResultCache()
+
+        def fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_call("calculate", {"expression": "1/0"}, fail)
+        assert cache.get_or_call("calculate", {"expression": "1/0"}, lambda: "ok") == "ok"
+
+    def test_is_pure_tool(self):
+        """Test purity detection from MCP annotations and schema"""
+        assert is_pure_tool({"annotations": {"readOnlyHint": True, "idempotentHint": True, "openWorldHint": False}})
+        assert is_pure_tool({"inputSchema": {"x-pure": True}})
+        assert not is_pure_tool({"annotations": {"readOnlyHint": True}})
+        assert not is_pure_tool({"annotations": {"pure": False, "readOnlyHint": True,
+                                                 "idempotentHint": True, "openWorldHint": False}})
+
+    def test_calculator_tools_cached_over_mcp(self):
+        """Test calculator tools are annotated pure and served from the cache"""
+        async def scenario():
+            cache = ToolResultCache()
+            async with StdioMCPClient() as client:
+                tools = {tool.name: tool for tool in await load_langchain_tools(client, cache=cache)}
+                first = await tools["calculate"].ainvoke({"expression": "6 * 7"})
+                second = await tools["calculate"].ainvoke({"expression": "6 * 7"})
+            return cache, first, second
+
+        cache, first, second = run(scenario())
+
+        assert first == second == "6 * 7 = 42"
+        assert cache.stats.hits == 1
+
+    def test_impure_tools_pass_through(self):
+        """Test tools without a purity annotation are not wrapped"""
+        from langchain_core.tools import Tool
+
+        tool = Tool(name="web_search", description="search", func=lambda q: q)
+        assert cache_pure_tools([tool], ToolResultCache())[0] is tool
+
+
+class TestToolCacheMiddleware:
+    """Test the agent tool middleware: scopes, single-flight and write invalidation"""
+
+    @staticmethod
+    def counting_tool(name, calls, delay=0.0):
+        from langchain_core.tools import Tool
+
+        def func(query):
+            calls.append(query)
+            time.sleep(delay)
+            return f"{name}:{query}"
+
+        async def coroutine(query):
+            calls.append(query)
+            await asyncio.sleep(delay)
+            return f"{name}:{query}"
+
+        return Tool(name=name, description=name, func=func, coroutine=coroutine)
+
+    def test_run_scope_resets_between_runs(self):
+        """Test results are reused within a run only, with per-run statistics"""
+        calls = []
+        middleware = ToolCacheMiddleware(ttls={"web_search": 60})
+        (search,) = middleware.wrap([self.counting_tool("web_search", calls)])
+
+        with middleware.run_scope() as scope:
+            search.invoke("python")
+            search.invoke("python")
+        with middleware.run_scope() as second:
+            search.invoke("python")
+        search.invoke("python")  # outside a run: no caching
+
+        assert len(calls) == 3
+        assert (scope.stats.hits, scope.stats.calls) == (1, 1)
+        assert (second.stats.hits, second.stats.calls) == (0, 1)
+
+    def test_agent_scope_and_error_results(self):
+        """Test agent scope keeps results across runs but never caches errors"""
+        calls = []
+        middleware = ToolCacheMiddleware(ttls={"web_search": 60}, scope="agent",
+                                         should_cache=lambda result: "error" not in result)
+        (search,) = middleware.wrap([self.counting_tool("web_search", calls)])
+
+        for query in ("python", "python", "error", "error"):
+            with middleware.run_scope():
+                search.invoke(query)
+
+        assert calls == ["python", "error", "error"]
+
+    def test_concurrent_calls_are_coalesced(self):
+        """Test identical in-flight calls share one tool invocation, sync and async"""
+        calls = []
+        middleware = ToolCacheMiddleware(ttls={"web_search": 60})
+        (search,) = middleware.wrap([self.counting_tool("web_search", calls, delay=0.2)])
+
+        with middleware.run_scope() as scope:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                # Threads see the run scope through a copied context, as LangChain's executor does
+                futures = [pool.submit(contextvars.copy_context().run, search.invoke, "q") for _ in range(4)]
+                results = [future.result() for future in futures]
+        assert results == ["web_search:q"] * 4 and len(calls) == 1
+        assert scope.stats.calls == 1 and scope.stats.coalesced + scope.stats.hits == 3
+
+        async def scenario():
+            with middleware.run_scope() as scope:
+                results = await asyncio.gather(*(search.ainvoke("q") for _ in range(4)))
+            return scope, results
+
+        scope, results = run(scenario())
+        assert results == ["web_search:q"] * 4 and len(calls) == 2
+        assert scope.stats.coalesced == 3
+
+    def test_writes_invalidate_cached_reads(self):
+        """Test a mixed read/write tool caches reads and clears the cache on writes"""
+        calls = []
+        middleware = ToolCacheMiddleware(ttls={"file_system": 60},
+                                         read_only={"file_system": lambda q: q.startswith("read:")})
+        (files,) = middleware.wrap([self.counting_tool("file_system", calls)])
+
+        with middleware.run_scope():
+            files.invoke("read:a.txt")
+            files.invoke("read:a.txt")
+            files.invoke("write:a.txt:new")
+            files.invoke("write:a.txt:new")
+            files.invoke("read:a.txt")
+
+        assert calls == ["read:a.txt", "write:a.txt:new", "write:a.txt:new", "read:a.txt"]
+
+
+async def http_post(reader, writer, message, connection="keep-alive"):
+    """Send one JSON-RPC POST over an open connection and read the response"""
+    body = json.dumps(message).encode()
+    writer.write(
+        b"POST /mcp HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        + f"Connection: {connection}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode().strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        headers[name.lower()] = value.strip()
+    payload = await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers, payload
+
+
+class TestHTTPTransport:
+    """Test MCPCalculatorServer over streamable HTTP"""
+
+    def test_keep_alive_session(self):
+        """Test several requests share one keep-alive connection"""
+        async def scenario():
+            server = MCPCalculatorServer()
+            listener = await server.start_http(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                init = await http_post(reader, writer, {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}})
+                note = await http_post(reader, writer, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+                call = await http_post(reader, writer, {"jsonrpc": "2.0", "id": 2, "method": "tools/call",
+                                                        "params": {"name": "calculate", "arguments": {"expression": "7 * 6"}}})
+                writer.close()
+                return init, note, call
+
+        init, note, call = run(scenario())
+
+        assert init[0] == 200 and "mcp-session-id" in init[1]
+        assert note[0] == 202
+        assert json.loads(call[2])["result"]["content"][0]["text"] == "7 * 6 = 42"
+
+    def test_concurrent_clients(self):
+        """Test many clients are served concurrently by one server"""
+        async def client(port, i):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            status, _, payload = await http_post(reader, writer, {"jsonrpc": "2.0", "id": i, "method": "tools/call",
+                                                                  "params": {"name": "calculate", "arguments": {"expression": f"{i} + 1"}}},
+                                                 connection="close")
+            writer.close()
+            return json.loads(payload)
+
+        async def scenario():
+            listener = await MCPCalculatorServer().start_http(port=0, max_connections=32)
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                return await asyncio.gather(*(client(port, i) for i in range(20)))
+
+        for i, response in enumerate(run(scenario())):
+            assert response["id"] == i
+            assert response["result"]["content"][0]["text"] == f"{i} + 1 = {i + 1}"
+
+    def test_connection_limit(self):
+        """Test connections beyond the limit get 503"""
+        async def scenario():
+            listener = await MCPCalculatorServer().start_http(port=0, max_connections=1)
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                first = await asyncio.open_connection("127.0.0.1", port)
+                await http_post(*first, {"jsonrpc": "2.0", "id": 1, "method": "tools/list"})
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                status_line = await reader.readline()
+                first[1].close()
+                writer.close()
+                return status_line
+
+        assert b"503" in run(scenario())
+
+    def test_negative_content_length(self):
+        """Test a negative Content-Length is answered with 400 instead of dropping the connection"""
+        async def scenario():
+            listener = await MCPCalculatorServer().start_http(port=0)
+            port = listener.sockets[0].getsockname()[1]
+            async with listener:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(b"POST /mcp HTTP/1.1\r\nHost: localhost\r\nContent-Length: -1\r\n\r\n")
+                await writer.drain()
+                status_line = await reader.readline()
+                writer.close()
+                return status_line
+
+        assert b"400" in run(scenario())
+
+
+class TestLoadBenchmark:
+    """Test the server load benchmark helpers"""
+
+    def test_parse_mix_normalises_weights(self):
+        """Test mix weights are normalised to fractions"""
+        from benchmark_mcp_server import parse_mix
+
+        assert parse_mix("tools/call=3,tools/list=1") == {"tools/call": 0.75, "tools/list": 0.25}
+
+    def test_percentile_interpolates(self):
+        """Test percentiles on a sorted sample"""
+        from benchmark_mcp_server import percentile
+
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == pytest.approx(50.5)
+        assert percentile(values, 99) == pytest.approx(99.01)
+        assert percentile([], 95) == 0.0
+
+    def test_fixed_concurrency_run(self):
+        """Test a short closed-loop run records every request"""
+        from benchmark_mcp_server import LoadGenerator, parse_mix
+
+        async def scenario():
+            generator = LoadGenerator("stdio", parse_mix("tools/call=1,tools/list=1,initialize=1"))
+            await generator.start()
+            try:
+                elapsed = await generator.run_fixed_concurrency(4, 60, None)
+            finally:
+                await generator.stop()
+            return generator.results(elapsed)
+
+        results = run(scenario())
+
+        assert results["overall"]["requests"] == 60
+        assert results["overall"]["errors"] == 0
+        assert results["overall"]["latency_ms"]["p99"] >= results["overall"]["latency_ms"]["p50"]
@@ -10,15 +10,27 @@
 #   "python-dotenv>=1.0.0",
 #   "rich>=13.0.0",
 #   "requests>=2.31.0",
+#   "httpx>=0.24.0",
 # ]
 # ///
 
 import os
+import asyncio
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from pathlib import Path
 import tempfile
 import shutil
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Literal, Optional, Union
+
+from langchain.agents import Tool
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
 
 # Import the modules we're testing
 from react_agent_tools import (
@@ -26,6 +38,13 @@ from react_agent_tools import (
     CalculatorTool, PythonREPLTool, APITool, DatabaseTool,
     get_basic_tools, get_advanced_tools
 )
+from code_index import CodeIndex
+from code_metrics import analyze_source
+from directory_analyzer import DirectoryAnalyzer
+from http_session import AsyncPooledHTTPClient, PooledHTTPClient
+from prompt_registry import PromptRegistry
+from repl_sandbox import SandboxPool, SessionManager
+from summarizing_memory import SummarizingMemory
 
 class TestWebSearchTool:
     """Test the WebSearchTool"""
@@ -36,7 +55,7 @@ class TestWebSearchTool:
         assert tool.name == "web_search"
         assert "search" in tool.description.lower()
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_search_with_abstract(self, mock_get):
         """Test search with abstract response"""
         mock_response = Mock()
@@ -53,7 +72,7 @@ class TestWebSearchTool:
         assert "Python is a programming language" in result
         assert "https://example.com" in result
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_search_with_definition(self, mock_get):
         """Test search with definition response"""
         mock_response = Mock()
@@ -70,7 +89,7 @@ class TestWebSearchTool:
         assert "Python: A high-level programming language" in result
         assert "https://example.com/def" in result
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_search_network_error(self, mock_get):
         """Test search with network error"""
         mock_get.side_effect = Exception("Network error")
@@ -143,6 +162,228 @@ from pathlib import Path
             assert ".py: 2 files" in result
 
 
+class TestCodeMetrics:
+    """Test the AST / tokenizer metrics engine"""
+    
+    PYTHON_SOURCE = """
+import os
+from . import sibling
+
+@dataclass
+class Config:
+    async def load(self, path):
+        if path and os.path.exists(path):
+            return [line for line in open(path) if line]
+        return None
+
+def outer():
+    def inner():
+        pass
+    return inner
+"""
+    
+    def test_python_symbols(self):
+        """Test methods, async, nested functions and decorated classes are all found"""
+        metrics = analyze_source(self.PYTHON_SOURCE, ".py")
+        
+        assert [(s.qualname, s.kind) for s in metrics.symbols] == [
+            ("Config", "class"), ("Config.load", "method"), ("outer", "function"), ("outer.inner", "function"),
+        ]
+        assert metrics.symbols[1].is_async
+        assert metrics.imports == ["os", "."]
+        assert (metrics.functions, metrics.classes) == (3, 1)
+    
+    def test_python_complexity_and_sloc(self):
+        """Test cyclomatic complexity counts branches, boolean operators and comprehensions"""
+        metrics = analyze_source(self.PYTHON_SOURCE, ".py")
+        load = metrics.symbols[1]
+        
+        # 1 + if + and + comprehension + comprehension if
+        assert load.complexity == 5
+        assert metrics.sloc == 12
+    
+    def test_python_syntax_error(self):
+        """Test unparsable files still report line counts"""
+        metrics = analyze_source("def broken(:\n    pass\n", ".py")
+        
+        assert metrics.error and metrics.loc == 2 and metrics.symbols == []
+    
+    def test_javascript_scanner(self):
+        """Test the JS/TS tokenizer ignores comments and strings and finds methods and arrows"""
+        source = """
+import React from 'react';
+const helper = require("./helper");
+// function commented() {}
+const text = "function fake() {}";
+class Widget extends Base {
+  constructor(props) { super(props); }
+  async render() { return this.ok ? a : b; }
+}
+export const add = (a, b) => a + b;
+function run(x) { if (x || y) { return 1; } }
+"""
+        metrics = analyze_source(source, ".ts")
+        
+        assert [(s.qualname, s.kind) for s in metrics.symbols] == [
+            ("Widget", "class"), ("Widget.constructor", "method"), ("Widget.render", "method"),
+            ("add", "function"), ("run", "function"),
+        ]
+        assert metrics.imports == ["react", "./helper"]
+        assert metrics.symbols[2].complexity == 2
+        assert metrics.symbols[4].complexity == 3
+
+
+class TestDirectoryAnalyzer:
+    """Test the incremental directory analyzer behind CodeAnalysisTool"""
+    
+    def _make_tree(self, root):
+        root = Path(root)
+        (root / "pkg").mkdir()
+        (root / "pkg" / "a.py").write_text("def a(): pass\n")
+        (root / "pkg" / "b.js").write_text("import x from 'y'\nfunction b() {}\n")
+        (root / "node_modules" / "dep").mkdir(parents=True)
+        (root / "node_modules" / "dep" / "index.js").write_text("function dep() {}")
+        (root / ".git").mkdir()
+        (root / ".git" / "hook.py").write_text("def hook(): pass")
+        (root / "generated").mkdir()
+        (root / "generated" / "out.py").write_text("def gen(): pass")
+        (root / ".gitignore").write_text("# build output\ngenerated/\n*.log\n")
+        (root / "debug.log").write_text("noise")
+        return root
+    
+    def test_ignore_rules(self):
+        """Test VCS, dependency and .gitignore'd paths are skipped"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = self._make_tree(temp_dir)
+            report = DirectoryAnalyzer().analyze(str(root))
+        
+        assert sorted(Path(p).name for p in report.files) == ["a.py", "b.js"]
+        assert report.total_files == 3  # a.py, b.js, .gitignore
+        assert report.subdirectories == 1
+    
+    def test_only_changed_files_are_reanalyzed(self):
+        """Test unchanged files are served from the (path, mtime, size) cache"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = self._make_tree(temp_dir)
+            analyzer = DirectoryAnalyzer()
+            first = analyzer.analyze(str(root))
+            second = analyzer.analyze(str(root))
+            (root / "pkg" / "a.py").write_text("def a(): pass\ndef c(): pass\n")
+            third = analyzer.analyze(str(root))
+        
+        assert (first.analyzed, first.from_cache) == (2, 0)
+        assert (second.analyzed, second.from_cache) == (0, 2)
+        assert (third.analyzed, third.from_cache) == (1, 1)
+        assert third.totals()["functions"] == 3
+    
+    def test_process_pool_matches_inline(self):
+        """Test the parallel path returns the same metrics as inline analysis"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = self._make_tree(temp_dir)
+            for i in range(40):
+                (root / "pkg" / f"m{i}.py").write_text(f"import os\nclass C{i}:\n    pass\n")
+            inline = DirectoryAnalyzer(workers=1).analyze(str(root))
+            parallel = DirectoryAnalyzer(workers=2, parallel_threshold=1).analyze(str(root))
+        
+        assert parallel.files == inline.files
+        assert parallel.totals()["classes"] == 40
+    
+    def test_persistent_cache(self):
+        """Test the cache survives across analyzer instances via its JSON file"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir) / "src"
+            root.mkdir()
+            self._make_tree(root)
+            cache_path = str(Path(temp_dir) / "analysis-cache.json")
+            DirectoryAnalyzer(cache_path=cache_path).analyze(str(root))
+            report = DirectoryAnalyzer(cache_path=cache_path).analyze(str(root))
+        
+        assert report.from_cache == 2 and report.analyzed == 0
+
+
+class TestCodeIndex:
+    """Test the persistent symbol/import index and code_analysis query modes"""
+    
+    def _make_repo(self, root):
+        root = Path(root)
+        (root / "pkg").mkdir()
+        (root / "pkg" / "tools.py").write_text("class Tool:\n    def run(self):\n        return helper()\n\ndef helper():\n    pass\n")
+        (root / "pkg" / "agent.py").write_text("from pkg.tools import Tool\nimport json\n\nagent_tool = Tool()\n")
+        (root / "web.js").write_text("import { Tool } from './pkg/tools';\nfunction render() { return new Tool(); }\n")
+        return root
+    
+    def test_definitions_importers_and_references(self):
+        """Test the basic index queries"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = self._make_repo(temp_dir)
+            with CodeIndex(str(root), str(root / "index.db")) as index:
+                defs = index.definitions("Tool")
+                method = index.definitions("Tool.run")
+                importers = index.importers("pkg")
+                refs = index.references("helper")
+                found = index.search("render")
+        
+        assert defs == [{"path": "pkg/tools.py", "qualname": "Tool", "kind": "class", "line": 1, "end_line": 3}]
+        assert method[0]["kind"] == "method"
+        assert [r["path"] for r in importers] == ["pkg/agent.py"]
+        assert refs == [{"path": "pkg/tools.py", "line": 3}]
+        assert found[0]["path"] == "web.js"
+    
+    def test_incremental_update(self):
+        """Test only changed files are reindexed and deleted files are dropped"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = self._make_repo(temp_dir)
+            with CodeIndex(str(root), str(root / "index.db"), max_staleness=None) as index:
+                first = index.update()
+                second = index.update()
+                (root / "pkg" / "tools.py").write_text("def renamed():\n    pass\n")
+                (root / "web.js").unlink()
+                third = index.update()
+                
+                assert (first["reindexed"], second["reindexed"]) == (3, 0)
+                assert (third["reindexed"], third["removed"]) == (1, 1)
+                assert index.definitions("Tool") == []
+                assert index.definitions("renamed")[0]["path"] == "pkg/tools.py"
+            
+            # The index persists on disk between instances
+            with CodeIndex(str(root), str(root / "index.db"), max_staleness=None) as reopened:
+                assert reopened.definitions("renamed")
+    
+    def test_tool_query_modes(self):
+        """Test code_analysis answers where:/importers: from the index"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = self._make_repo(temp_dir)
+            tool = CodeAnalysisTool(index=CodeIndex(str(root), str(root / "index.db")))
+            where = tool.analyze("where:helper")
+            importers = tool.analyze("importers:json")
+            missing = tool.analyze("where:Nope")
+            tool.index.close()
+        
+        assert where == "pkg/tools.py:5  helper (function)"
+        assert importers == "pkg/agent.py  json"
+        assert "No definition of Nope" in missing
+    
+    def test_repomap_keeps_descriptions(self):
+        """Test repomap.json export merges with hand-written entries"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = self._make_repo(temp_dir)
+            output = root / "repomap.json"
+            output.write_text(json.dumps({"project_name": "demo", "files": [
+                {"path": "pkg/tools.py", "description": "Tool base classes", "type": "main"},
+                {"path": "gone.py", "description": "Deleted file", "type": "example"},
+            ]}))
+            with CodeIndex(str(root), str(root / "index.db")) as index:
+                index.export_repomap(str(output))
+            document = json.loads(output.read_text())
+        
+        files = {entry["path"]: entry for entry in document["files"]}
+        assert document["project_name"] == "demo"
+        assert set(files) == {"pkg/agent.py", "pkg/tools.py", "web.js"}
+        assert files["pkg/tools.py"]["description"] == "Tool base classes"
+        assert files["pkg/tools.py"]["symbols"] == ["Tool", "helper"]
+        assert files["pkg/agent.py"]["imports"] == ["pkg.tools", "json"]
+
+
 class TestFileSystemTool:
     """Test the FileSystemTool"""
     
@@ -202,6 +443,126 @@ class TestFileSystemTool:
         result = tool.operate("read:../../../etc/passwd")
         
         assert "Access denied" in result
+    
+    @pytest.fixture
+    def log_file(self):
+        """A 1000-line log inside the current directory"""
+        with tempfile.TemporaryDirectory(dir=".") as temp_dir:
+            path = os.path.join(os.path.relpath(temp_dir), "app.log")
+            with open(path, "w") as f:
+                for i in range(1, 1001):
+                    f.write(f"{i:04d} {'ERROR: disk full' if i % 250 == 0 else 'ok'}\n")
+            yield path
+    
+    @pytest.mark.parametrize("mmap_threshold", [0, 1 << 30])
+    def test_ranged_reads(self, log_file, mmap_threshold):
+        """Test line range, byte range and tail, with and without mmap"""
+        tool = FileSystemTool(mmap_threshold=mmap_threshold)
+        
+        lines = tool.operate(f"read_lines:{log_file}:10-12")
+        assert lines.splitlines()[1:] == ["    10  0010 ok", "    11  0011 ok", "    12  0012 ok"]
+        assert tool.operate(f"read_bytes:{log_file}:8-15").endswith("\n0002 ok")
+        assert tool.operate(f"tail:{log_file}:2").splitlines()[1:] == ["0999 ok", "1000 ERROR: disk full"]
+    
+    @pytest.mark.parametrize("mmap_threshold", [0, 1 << 30])
+    def test_grep(self, log_file, mmap_threshold):
+        """Test grep reports matching lines with their line numbers"""
+        tool = FileSystemTool(mmap_threshold=mmap_threshold, max_matches=3)
+        result = tool.operate(f"grep:{log_file}:ERROR: disk")
+        
+        assert result.splitlines()[1:4] == ["250: 0250 ERROR: disk full", "500: 0500 ERROR: disk full",
+                                            "750: 0750 ERROR: disk full"]
+        assert "stopped after 3 matches" in result
+    
+    def test_reads_are_capped(self, log_file):
+        """Test whole-file and ranged reads stop at max_return_bytes with a marker"""
+        tool = FileSystemTool(max_return_bytes=100)
+        
+        whole = tool.operate(f"read:{log_file}")
+        ranged = tool.operate(f"read_lines:{log_file}:1-")
+        
+        assert "[truncated: returned 100 of 8056 bytes" in whole
+        assert "continue with read_lines" in ranged and len(ranged) < 300
+    
+    def test_invalid_range(self, log_file):
+        """Test malformed ranges are reported rather than raised"""
+        tool = FileSystemTool()
+        
+        assert "Invalid read_lines argument" in tool.operate(f"read_lines:{log_file}:20-10")
+        size = os.path.getsize(log_file)
+        result = tool.operate(f"read_bytes:{log_file}:{size + 10}-")
+        assert f"start offset {size + 10} is beyond end of file (size {size})" in result
+
+    @pytest.fixture
+    def work_dir(self):
+        """An empty directory inside the current directory"""
+        with tempfile.TemporaryDirectory(dir=".") as temp_dir:
+            yield os.path.relpath(temp_dir)
+
+    def test_write_batch(self, work_dir):
+        """Test a batch write creates every file, including colons in paths and content"""
+        tool = FileSystemTool()
+        files = [
+            {"path": os.path.join(work_dir, "pkg", "a.py"), "content": "x = {'k': 1}\n"},
+            {"path": os.path.join(work_dir, "b:c.txt"), "content": "time: 12:00"},
+        ]
+        result = tool.operate("write_batch:" + json.dumps({"files": files, "atomic": True}))
+
+        assert "Wrote 2 files atomically" in result
+        umask = os.umask(0)
+        os.umask(umask)
+        for entry in files:
+            with open(entry["path"]) as f:
+                assert f.read() == entry["content"]
+            assert os.stat(entry["path"]).st_mode & 0o777 == 0o666 & ~umask  # not mkstemp's 0600
+        assert sorted(os.listdir(work_dir)) == ["b:c.txt", "pkg"]  # no temp files left behind
+
+    def test_write_batch_all_or_nothing(self, work_dir, monkeypatch):
+        """Test a failing rename rolls back the files already replaced and the directories created"""
+        existing = os.path.join(work_dir, "keep.txt")
+        with open(existing, "w") as f:
+            f.write("original")
+        new_file = os.path.join(work_dir, "new", "dir", "new.txt")
+
+        real_replace = os.replace
+        calls = []
+
+        def flaky_replace(src, dst):
+            calls.append(dst)
+            if len(calls) == 2:
+                raise OSError("disk full")
+            return real_replace(src, dst)
+
+        monkeypatch.setattr(os, "replace", flaky_replace)
+        tool = FileSystemTool()
+        result = tool.operate("write_batch:" + json.dumps([
+            {"path": existing, "content": "changed"},
+            {"path": new_file, "content": "new"},
+        ]))
+        monkeypatch.undo()
+
+        assert "rolled back" in result
+        with open(existing) as f:
+            assert f.read() == "original"
+        assert os.listdir(work_dir) == ["keep.txt"]
+
+    def test_write_batch_validation(self, work_dir):
+        """Test atomic batches are refused up front when any path is outside the directory"""
+        tool = FileSystemTool()
+        inside = os.path.join(work_dir, "inside.txt")
+        batch = [{"path": inside, "content": "a"}, {"path": "/tmp/outside.txt", "content": "b"}]
+
+        result = tool.operate("write_batch:" + json.dumps({"files": batch}))
+        assert "no files changed" in result and not os.path.exists(inside)
+
+        result = tool.operate("write_batch:" + json.dumps({"files": batch, "atomic": False}))
+        assert "Wrote 1 of 2 files" in result and "Access denied" in result
+        assert "requires" in tool.operate('write_batch:{"files": []}')
+        
+        other = os.path.join(work_dir, "other.txt")
+        result = tool.operate("write_batch:" + json.dumps({"files": [{"path": other, "content": "c"}],
+                                                           "atomic": "false"}))
+        assert "must be true or false" in result and not os.path.exists(other)
 
 
 class TestCalculatorTool:
@@ -300,6 +661,92 @@ class TestPythonREPLTool:
         
         assert "execution error" in result
 
+    def test_separate_instances_keep_their_output(self):
+        """Test in-process runs on different tool instances do not capture each other's output"""
+        tools = [PythonREPLTool() for _ in range(4)]
+        code = "for i in range(20000):\n    print('{}')"
+        results = [None] * len(tools)
+
+        def run(i):
+            results[i] = tools[i].execute(code.format(i))
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(len(tools))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for i, result in enumerate(results):
+            assert result == "Python execution result:\n" + f"{i}\n" * 20000
+
+    @pytest.fixture
+    def sandbox(self):
+        """A small worker pool with short limits"""
+        pool = SandboxPool(workers=2, timeout=2.0, cpu_seconds=1, memory_mb=128, max_executions=3)
+        yield pool
+        pool.close()
+    
+    def test_sandboxed_execution(self, sandbox):
+        """Test sandboxed code runs out of process with the restricted builtins"""
+        tool = PythonREPLTool(sandbox=sandbox)
+        
+        assert "Python execution result:\n5" in tool.execute("print(2 + 3)")
+        assert "name 'input' is not defined" in tool.execute("input()")
+        assert "Dangerous operation" in tool.execute("import os")
+    
+    def test_sandbox_timeout_replaces_worker(self):
+        """Test a runaway snippet is killed and the pool keeps serving"""
+        # The CPU limit is well above the timeout, so the wall-clock kill is what stops it
+        with SandboxPool(workers=1, timeout=1.0, cpu_seconds=30, max_executions=3) as pool:
+            result = pool.execute("while True: pass")
+            
+            assert result.timed_out and "timed out" in result.error
+            assert result.worker_pid not in pool.stats()["pids"]
+            assert pool.execute("print('still alive')").output == "still alive\n"
+    
+    @pytest.mark.skipif(os.name == "nt", reason="rlimits need POSIX")
+    def test_sandbox_memory_limit(self, sandbox):
+        """Test allocations beyond memory_mb fail inside the worker"""
+        result = sandbox.execute("x = bytearray(512 * 1024 * 1024)")
+        
+        assert "Memory limit exceeded" in result.error
+    
+    def test_sandbox_recycles_workers(self):
+        """Test workers are replaced after max_executions runs"""
+        with SandboxPool(workers=1, max_executions=2) as pool:
+            pids = [pool.execute("pass").worker_pid for _ in range(4)]
+        
+        assert pids[0] == pids[1] and pids[2] == pids[3] and pids[1] != pids[2]
+    
+    def test_persistent_sessions(self):
+        """Test session namespaces persist across calls and stay isolated from each other"""
+        with SessionManager(timeout=5.0) as sessions:
+            tool = PythonREPLTool(sessions=sessions)
+            
+            tool.execute("session:load\ndata = [x * x for x in range(100)]")
+            result = tool.execute("session:load\nprint(sum(data))")
+            assert "328350" in result and "[session 'load' step 2:" in result
+            assert "name 'data' is not defined" in tool.execute("session:other\nprint(data)")
+            assert "name 'data' is not defined" in tool.execute("print(data)")
+            
+            assert [step["step"] for step in sessions.report("load")] == [1, 2]
+            assert tool.execute("session:load:close") == "Closed session 'load'"
+            assert "name 'data' is not defined" in tool.execute("session:load\nprint(data)")
+        
+        assert "not enabled" in PythonREPLTool().execute("session:load\nprint(1)")
+    
+    def test_session_eviction(self):
+        """Test least recently used and idle sessions are stopped"""
+        with SessionManager(max_sessions=2, idle_timeout=0.3) as sessions:
+            for name in ("a", "b", "c"):
+                sessions.execute(name, "x = 1")
+            assert sorted(sessions.sessions()) == ["b", "c"]
+            
+            deadline = time.monotonic() + 5
+            while sessions.sessions() and time.monotonic() < deadline:
+                time.sleep(0.1)
+            assert sessions.sessions() == {}
+
 
 class TestAPITool:
     """Test the APITool"""
@@ -317,7 +764,7 @@ class TestAPITool:
         
         assert "Invalid request format" in result
     
-    @patch('requests.get')
+    @patch('requests.Session.request')
     def test_get_request(self, mock_get):
         """Test GET request"""
         mock_response = Mock()
@@ -331,7 +778,7 @@ class TestAPITool:
         assert "Status: 200" in result
         assert '{"success": true}' in result
     
-    @patch('requests.post')
+    @patch('requests.Session.request')
     def test_post_request(self, mock_post):
         """Test POST request"""
         mock_response = Mock()
@@ -353,6 +800,200 @@ class TestAPITool:
         assert "Invalid JSON data" in result
 
 
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Local stand-in for external HTTP APIs"""
+    
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        server = self.server
+        server.client_ports.append(self.client_address[1])
+        if self.path.startswith("/flaky") and server.failures_left > 0:
+            server.failures_left -= 1
+            self._send_json(503, {"error": "busy"})
+        elif self.path.startswith("/search"):
+            self._send_json(200, {"Abstract": "Python is a programming language", "AbstractURL": "https://python.org"})
+        else:
+            self._send_json(200, {"path": self.path})
+    
+    def do_POST(self):
+        self.server.client_ports.append(self.client_address[1])
+        length = int(self.headers.get("Content-Length", 0))
+        self._send_json(201, {"received": json.loads(self.rfile.read(length))})
+
+
+@pytest.fixture
+def stand_in_server():
+    """Run the stand-in HTTP server on a free localhost port"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+    server.client_ports = []
+    server.failures_left = 0
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestPooledHTTPClient:
+    """Test the shared pooled HTTP layer against a local stand-in server"""
+    
+    def _url(self, server, path):
+        return f"http://127.0.0.1:{server.server_address[1]}{path}"
+    
+    def test_keep_alive_reuses_connection(self, stand_in_server):
+        """Test consecutive requests reuse one pooled connection"""
+        client = PooledHTTPClient()
+        client.get(self._url(stand_in_server, "/a"))
+        client.get(self._url(stand_in_server, "/b"))
+        
+        first, second = client.timings
+        assert len(set(stand_in_server.client_ports)) == 1
+        assert not first.reused_connection and first.connect_ms is not None and first.dns_ms is not None
+        assert second.reused_connection and second.connect_ms is None
+        assert second.ttfb_ms <= second.total_ms
+    
+    def test_retries_on_503(self, stand_in_server):
+        """Test 5xx responses are retried with backoff until success"""
+        stand_in_server.failures_left = 2
+        client = PooledHTTPClient(backoff_factor=0, backoff_jitter=0.01)
+        
+        response = client.get(self._url(stand_in_server, "/flaky"))
+        
+        assert response.status_code == 200
+        assert client.timings[-1].attempts == 3
+        assert client.stats()["retried_requests"] == 1
+    
+    def test_gives_up_after_retry_budget(self, stand_in_server):
+        """Test the last error response is returned once retries are exhausted"""
+        stand_in_server.failures_left = 10
+        client = PooledHTTPClient(retries=1, backoff_factor=0)
+        
+        response = client.get(self._url(stand_in_server, "/flaky"))
+        
+        assert response.status_code == 503
+    
+    def test_timing_listener(self, stand_in_server):
+        """Test listeners receive every request timing"""
+        client = PooledHTTPClient()
+        seen = []
+        client.add_listener(seen.append)
+        client.get(self._url(stand_in_server, "/a"))
+        
+        assert len(seen) == 1
+        assert seen[0].status == 200 and seen[0].method == "GET"
+    
+    def test_tools_share_pool(self, stand_in_server):
+        """Test WebSearchTool and APITool run through the pooled client"""
+        client = PooledHTTPClient()
+        web = WebSearchTool(http_client=client)
+        web.SEARCH_URL = self._url(stand_in_server, "/search")
+        api = APITool(http_client=client)
+        
+        search_result = web.search("python")
+        post_result = api.request(f'POST:{self._url(stand_in_server, "/items")}:{{"name": "x"}}')
+        
+        assert "Python is a programming language" in search_result
+        assert "Status: 201" in post_result and '"received": {"name": "x"}' in post_result
+        assert len(set(stand_in_server.client_ports)) == 1
+
+
+class TestAsyncTools:
+    """Test the native async tool variants"""
+    
+    def _url(self, server, path):
+        return f"http://127.0.0.1:{server.server_address[1]}{path}"
+    
+    def test_async_client_retries_and_reuses_connection(self, stand_in_server):
+        """Test the async client retries 503s and keeps its connection alive"""
+        stand_in_server.failures_left = 1
+        
+        async def scenario():
+            client = AsyncPooledHTTPClient(backoff_factor=0, backoff_jitter=0.01)
+            try:
+                first = await client.get(self._url(stand_in_server, "/flaky"))
+                second = await client.get(self._url(stand_in_server, "/a"))
+            finally:
+                await client.aclose()
+            return client, first, second
+        
+        client, first, second = asyncio.run(scenario())
+        
+        assert first.status_code == 200 and second.status_code == 200
+        assert client.timings[0].attempts == 2
+        assert client.timings[1].reused_connection
+        assert len(set(stand_in_server.client_ports)) == 1
+    
+    def test_concurrent_async_tools(self, stand_in_server):
+        """Test many async tool calls run concurrently on one event loop"""
+        async def scenario():
+            client = AsyncPooledHTTPClient()
+            web = WebSearchTool(async_http_client=client)
+            web.SEARCH_URL = self._url(stand_in_server, "/search")
+            api = APITool(async_http_client=client)
+            try:
+                searches = [web.asearch(f"python {i}") for i in range(10)]
+                posts = [api.arequest(f'POST:{self._url(stand_in_server, "/items")}:{{"n": {i}}}') for i in range(10)]
+                return await asyncio.gather(*searches, *posts)
+            finally:
+                await client.aclose()
+        
+        results = asyncio.run(scenario())
+        
+        assert all("Python is a programming language" in r for r in results[:10])
+        for i, result in enumerate(results[10:]):
+            assert "Status: 201" in result and f'"received": {{"n": {i}}}' in result
+    
+    def test_async_api_input_errors(self):
+        """Test arequest reports malformed input like request()"""
+        api = APITool()
+        
+        assert "Invalid request format" in asyncio.run(api.arequest("invalid"))
+        assert "Invalid JSON data" in asyncio.run(api.arequest("POST:https://example.com:{invalid json}"))
+    
+    def test_async_local_tools(self):
+        """Test file, code, database, calculator and REPL coroutines"""
+        with tempfile.TemporaryDirectory(dir=".") as temp_dir:
+            rel_path = os.path.join(os.path.relpath(temp_dir), "note.txt")
+            
+            async def scenario():
+                fs = FileSystemTool()
+                write = await fs.aoperate(f"write:{rel_path}:hello")
+                return await asyncio.gather(
+                    fs.aoperate(f"read:{rel_path}"),
+                    CodeAnalysisTool().aanalyze(temp_dir),
+                    DatabaseTool().aoperate("CREATE:notes"),
+                    CalculatorTool().acalculate("6 * 7"),
+                    PythonREPLTool().aexecute("print(sum(range(4)))"),
+                ), write
+            
+            (read, analysis, database, calc, repl), write = asyncio.run(scenario())
+        
+        assert "Successfully wrote" in write and "hello" in read
+        assert "Total files: 1" in analysis
+        assert "Created table: notes" in database
+        assert "42" in calc and "6" in repl
+    
+    def test_basic_tools_expose_coroutines(self):
+        """Test every basic tool can be awaited natively"""
+        for tool in get_basic_tools():
+            assert tool.coroutine is not None
+        
+        calculator = next(tool for tool in get_basic_tools() if tool.name == "calculator")
+        assert asyncio.run(calculator.ainvoke("2 + 2")) == "Result: 2 + 2 = 4"
+
+
 class TestDatabaseTool:
     """Test the DatabaseTool"""
     
@@ -382,6 +1023,73 @@ class TestDatabaseTool:
         result = tool.operate("UNKNOWN:operation")
         
         assert "Unknown operation" in result
+    
+    def test_session_persists_between_calls(self):
+        """Test CREATE, INSERT and SELECT see the same session database"""
+        tool = DatabaseTool()
+        tool.operate("CREATE:notes")
+        tool.operate("INSERT:notes:first note")
+        
+        assert tool.operate("SELECT:SELECT data FROM notes") == "Query results: [('first note',)]"
+        assert "no such table" in DatabaseTool().operate("SELECT:SELECT data FROM notes")
+    
+    def test_batch_insert_and_row_limit(self):
+        """Test JSON arrays insert many rows and SELECT stops at max_rows"""
+        tool = DatabaseTool(max_rows=2)
+        tool.operate("CREATE:items")
+        
+        assert tool.operate('INSERT:items:["a", "b", {"c": 1}]') == "Inserted 3 rows into items"
+        result = tool.operate("SELECT:SELECT data FROM items ORDER BY id")
+        assert result.startswith("Query results: [('a',), ('b',)]")
+        assert "showing first 2 rows" in result
+    
+    def test_file_backed_database(self):
+        """Test a file database uses WAL and outlives the tool"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "agent.db")
+            tool = DatabaseTool(path)
+            tool.operate("CREATE:notes")
+            tool.operate("INSERT:notes:kept")
+            tool.close()
+            
+            reopened = DatabaseTool(path)
+            assert reopened.operate("SELECT:PRAGMA journal_mode") == "Query results: [('wal',)]"
+            assert reopened.operate("SELECT:SELECT data FROM notes") == "Query results: [('kept',)]"
+            reopened.close()
+    
+    def test_concurrent_access(self):
+        """Test pooled connections serve concurrent readers and writers"""
+        tool = DatabaseTool()
+        tool.operate("CREATE:log")
+        
+        async def scenario():
+            writes = [tool.aoperate(f'INSERT:log:{json.dumps(list(range(10)))}') for _ in range(20)]
+            reads = [tool.aoperate("SELECT:SELECT count(*) FROM log") for _ in range(20)]
+            return await asyncio.gather(*writes, *reads)
+        
+        results = asyncio.run(scenario())
+        
+        assert not any("error" in result for result in results)
+        assert tool.operate("SELECT:SELECT count(*) FROM log") == "Query results: [(200,)]"
+    
+    def test_select_is_read_only(self):
+        """Test SELECT: refuses statements that change a file database"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tool = DatabaseTool(os.path.join(temp_dir, "agent.db"))
+            tool.operate("CREATE:notes")
+            tool.operate("INSERT:notes:kept")
+            
+            for statement in ("DROP TABLE notes", "DELETE FROM notes", "INSERT INTO notes (data) VALUES ('x')"):
+                assert "readonly" in tool.operate(f"SELECT:{statement}")
+            assert tool.operate("SELECT:SELECT data FROM notes") == "Query results: [('kept',)]"
+            assert tool.operate("INSERT:notes:still writable") == "Inserted data into notes"
+            tool.close()
+    
+    def test_rejects_invalid_table_name(self):
+        """Test table names are restricted to identifiers"""
+        result = DatabaseTool().operate("CREATE:t; DROP TABLE x")
+        
+        assert "Invalid table name" in result
 
 
 class TestToolIntegration:
@@ -426,6 +1134,749 @@ class TestToolIntegration:
             assert tool.name is not None
             assert tool.description is not None
             assert callable(tool.func)
+    
+    def test_error_results_are_not_cached(self):
+        """Test only the tools' own error messages count as errors for the tool cache"""
+        from langchain_react_agent import _cacheable_result
+        
+        for error in ("Search error: timed out", "File system error: denied", "Database error: locked",
+                      "Error: Division by zero", "Python execution error: NameError"):
+            assert not _cacheable_result(error)
+        assert _cacheable_result("Python error handling best practices: use specific exceptions")
+        assert _cacheable_result("Query results: [('error',)]")
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Offline stand-in for a provider's chat model
+
+    Replies come from ``responses`` in order (strings or AIMessages), or from
+    ``respond(messages)`` when it is set. Each request's messages are kept in
+    ``requests``; text replies carry ``usage`` as their token usage, every
+    call takes ``delay`` seconds and fails with ``error`` when it is set.
+    With ``disable_streaming=False`` streamed calls replay the reply word by
+    word; otherwise agents, which stream by default, get it in one piece.
+    """
+    responses: list = []
+    respond: Optional[Callable[[list], Any]] = None
+    usage: Optional[Dict[str, int]] = None
+    delay: float = 0.0
+    error: Optional[str] = None
+    temperature: float = 0.0
+    disable_streaming: Union[bool, Literal["tool_calling"]] = True
+    calls: int = 0
+    requests: list = []
+
+    @property
+    def _llm_type(self):
+        return "scripted"
+
+    @property
+    def _identifying_params(self):
+        return {"temperature": self.temperature}
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _reply(self, messages):
+        self.calls += 1
+        self.requests.append(messages)
+        time.sleep(self.delay)
+        if self.error:
+            raise RuntimeError(self.error)
+        reply = self.respond(messages) if self.respond else self.responses.pop(0)
+        if isinstance(reply, str):
+            usage = {**self.usage, "total_tokens": sum(self.usage.values())} if self.usage else None
+            reply = AIMessage(content=reply, usage_metadata=usage)
+        return reply
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for word in self._reply(messages).content.split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+
+@pytest.fixture
+def openai_key(monkeypatch):
+    """Agents default to OpenAI; a placeholder key lets them be built offline"""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+
+
+@pytest.fixture
+def make_agent(openai_key):
+    """Build offline agents: make_agent(llm, tools, **agent_kwargs) -> LangChainReactAgent"""
+    from langchain_react_agent import LangChainReactAgent
+
+    def make(llm, tools, **kwargs):
+        agent = LangChainReactAgent(**{"verbose": False, "tool_cache": None, **kwargs})
+        agent.llm = llm
+        agent.add_tools(tools)
+        return agent
+    return make
+
+
+class TestParallelToolCalls:
+    """Test the tool_calling agent mode runs one step's tool calls concurrently"""
+    
+    @staticmethod
+    def build(make_agent, max_parallel_tools, spans):
+        def slow_tool(name):
+            async def coroutine(query):
+                start = time.perf_counter()
+                await asyncio.sleep(0.1)
+                spans[name] = (start, time.perf_counter())
+                return f"{name}: {query}"
+            return Tool(name=name, description=name, func=lambda query: name, coroutine=coroutine)
+        
+        llm = ScriptedChatModel(responses=[
+            AIMessage(content="", tool_calls=[
+                {"name": "weather", "args": {"__arg1": "San Francisco"}, "id": "call_1"},
+                {"name": "calculator", "args": {"__arg1": "25 * 4"}, "id": "call_2"},
+            ]),
+            AIMessage(content="Sunny, and 25 * 4 = 100"),
+        ])
+        return make_agent(llm, [slow_tool("weather"), slow_tool("calculator")], agent_mode="tool_calling",
+                          max_parallel_tools=max_parallel_tools)
+    
+    @pytest.mark.parametrize("max_parallel_tools, overlap", [(4, True), (1, False)])
+    def test_step_runs_tools_concurrently(self, make_agent, max_parallel_tools, overlap):
+        """Test a step's tool calls overlap when uncapped and run one after another when capped at one"""
+        spans = {}
+        agent = self.build(make_agent, max_parallel_tools, spans)
+        
+        result = agent.run("What is the weather like in San Francisco and what is 25 * 4?")
+        
+        assert result == "Sunny, and 25 * 4 = 100"
+        (_, first_end), (second_start, _) = sorted(spans.values())
+        assert (second_start < first_end) == overlap
+
+
+class TestPromptRegistry:
+    """Test prompt resolution without a hub round trip"""
+    
+    @staticmethod
+    def hub(calls, fail=False):
+        from langchain_core.prompts import PromptTemplate
+        
+        def pull(name):
+            calls.append(name)
+            if fail:
+                raise ConnectionError("offline")
+            prompt = PromptTemplate.from_template("Pulled {input} {agent_scratchpad} {tools} {tool_names}")
+            prompt.metadata = {"lc_hub_commit_hash": "abc123"}
+            return prompt
+        return pull
+    
+    def test_bundled_react_prompt(self, tmp_path):
+        """Test the bundled prompt has every variable create_react_agent needs"""
+        calls = []
+        registry = PromptRegistry(cache_dir=tmp_path, pull=self.hub(calls))
+        prompt = registry.get("hwchase17/react")
+        
+        assert set(prompt.input_variables) == {"tools", "tool_names", "input", "agent_scratchpad"}
+        assert calls == []
+        with pytest.raises(KeyError):
+            registry.get("someone/unknown")
+    
+    def test_pulled_prompts_are_versioned_on_disk(self, tmp_path):
+        """Test a pulled prompt is served from disk by a new registry, by version or as latest"""
+        calls = []
+        PromptRegistry(cache_dir=tmp_path, pull=self.hub(calls)).pull("hwchase17/react")
+        
+        registry = PromptRegistry(cache_dir=tmp_path, remote=True, pull=self.hub(calls))
+        assert registry.versions("hwchase17/react") == ["abc123"]
+        assert registry.get("hwchase17/react").template.startswith("Pulled")
+        assert registry.get("hwchase17/react", version="abc123").template.startswith("Pulled")
+        assert registry.get("hwchase17/react", version="bundled").template.startswith("Answer")
+        assert calls == ["hwchase17/react"]
+    
+    def test_failed_pull_falls_back_and_is_not_retried(self, tmp_path):
+        """Test an offline registry uses the bundled copy and backs off"""
+        calls = []
+        registry = PromptRegistry(cache_dir=tmp_path, remote=True, pull=self.hub(calls, fail=True))
+        
+        assert registry.get("hwchase17/react").template.startswith("Answer")
+        registry.clear()
+        registry.get("hwchase17/react")
+        assert calls == ["hwchase17/react"]
+    
+    def test_add_tools_does_not_refetch(self, monkeypatch, openai_key, tmp_path):
+        """Test repeated add_tools() resolves the prompt once and only wraps new tools"""
+        from langchain_react_agent import LangChainReactAgent
+        
+        registry = PromptRegistry(cache_dir=tmp_path)
+        lookups = []
+        real_get = registry.get
+        monkeypatch.setattr(registry, "get", lambda *args, **kwargs: lookups.append(args) or real_get(*args, **kwargs))
+        agent = LangChainReactAgent(verbose=False, prompt_registry=registry)
+        
+        tools = get_basic_tools()
+        agent.add_tools(tools[:3])
+        first = agent._agent_tools[0]
+        agent.add_tools(tools[3:])
+        
+        assert len(lookups) == 1
+        assert len(agent.agent_executor.tools) == 7 and agent._agent_tools[0] is first
+
+
+class TestSummarizingMemory:
+    """Test the bounded, summarizing conversation memory"""
+    
+    @staticmethod
+    def converse(memory, turns):
+        for i in range(turns):
+            memory.load_memory_variables({})
+            memory.save_context({"input": f"question {i} " + "q" * 80}, {"output": f"answer {i} " + "a" * 80})
+    
+    def test_history_stays_within_budget(self):
+        """Test older turns are replaced by the summary and recent ones kept verbatim"""
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        
+        memory = SummarizingMemory(llm=FakeListChatModel(responses=["the user asked questions"] * 20),
+                                   max_token_limit=100, return_messages=True)
+        reports = []
+        memory.add_hook(reports.append)
+        self.converse(memory, 8)
+        assert memory.wait(10)
+        
+        history = memory.load_memory_variables({})["chat_history"]
+        assert history[0].content.endswith("the user asked questions")
+        assert history[-1].content.startswith("answer 7")
+        assert memory.token_counter(history[1:]) <= 100
+        assert reports[-1].saved_tokens > 0 and reports[-1].summarized_messages > 0
+    
+    def test_summarizer_failure_keeps_messages(self):
+        """Test messages stay verbatim when the summarizer fails"""
+        llm = Mock()
+        llm.invoke.side_effect = RuntimeError("rate limited")
+        memory = SummarizingMemory(llm=llm, max_token_limit=100, return_messages=True)
+        self.converse(memory, 4)
+        memory.wait(10)
+        
+        history = memory.load_memory_variables({})["chat_history"]
+        assert len(history) == 8 and memory.stats()["summary_errors"] >= 1
+    
+    @pytest.mark.parametrize("memory", ["buffer", "summary"])
+    def test_react_prompt_sends_history(self, make_agent, memory):
+        """Test earlier turns reach the LLM in the default ReAct mode"""
+        llm = ScriptedChatModel(responses=["Final Answer: Paris", "Final Answer: about 2 million"])
+        agent = make_agent(llm, [Tool(name="noop", description="Does nothing", func=lambda query: query)],
+                           memory=memory)
+        agent.run("What is the capital of France?")
+        agent.run("How many people live there?")
+        
+        first, second = llm.requests
+        assert len(first) == 1 and "What is the capital of France?" in first[0].content
+        assert [message.content for message in second[:-1]] == ["What is the capital of France?", "Paris"]
+        assert "Question: How many people live there?" in second[-1].content
+    
+    def test_clear(self):
+        """Test clear() drops the summary, queued chunks and counters"""
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+        
+        memory = SummarizingMemory(llm=FakeListChatModel(responses=["summary"] * 20), max_token_limit=100,
+                                   return_messages=True)
+        self.converse(memory, 4)
+        memory.wait(10)
+        memory.clear()
+        
+        assert memory.load_memory_variables({})["chat_history"] == []
+        assert memory.stats()["full_history_tokens"] == 0
+
+
+class TestAgentEvents:
+    """Test stream()/astream() yield typed events for a ReAct run"""
+
+    @staticmethod
+    def build(make_agent, fail=False, **kwargs):
+        def lookup(query):
+            time.sleep(0.1)
+            return f"{query} is 42"
+
+        llm = ScriptedChatModel(error="model unavailable" if fail else None, disable_streaming=False, responses=[
+            "Thought: I should look it up\nAction: lookup\nAction Input: the answer",
+            "Thought: I now know the final answer\nFinal Answer: 42",
+        ])
+        return make_agent(llm, [Tool(name="lookup", description="Look things up", func=lookup)], **kwargs)
+
+    def test_stream_yields_events_in_order(self, make_agent):
+        """Test tokens, the timed action, its observation and the final answer arrive in order"""
+        events = list(self.build(make_agent).stream("What is the answer?"))
+        types = [event.type for event in events]
+
+        assert types.index("thought_token") < types.index("action_start") < types.index("action_end")
+        assert types.index("action_end") < types.index("observation") < types.index("final_answer")
+        assert types[-1] == "final_answer" and events[-1].text.strip() == "42"
+
+        tokens = "".join(event.text for event in events if event.type == "thought_token")
+        assert "Action: lookup" in tokens
+        action_end = events[types.index("action_end")]
+        assert action_end.tool == "lookup" and action_end.elapsed >= 0.1 and action_end.error is None
+        assert events[types.index("observation")].text == "the answer is 42"
+        assert events[types.index("final_answer")].step == 2
+        assert events[-1].stop_reason == "final_answer"
+
+    def test_consumer_can_stop_early(self, make_agent):
+        """Test breaking out of astream() ends the run without touching the consumer's context"""
+        from langchain_react_agent import _tool_slots
+
+        agent = self.build(make_agent, tool_cache="run")
+        errors = []
+
+        async def consume():
+            asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+            async for event in agent.astream("What is the answer?"):
+                break
+            await asyncio.sleep(0.2)
+            return event
+
+        assert asyncio.run(consume()).type == "thought_token"
+        assert errors == [] and _tool_slots.get() is None
+        assert agent.last_tool_cache_stats is not None
+
+    def test_closing_sync_stream_cancels_run(self):
+        """Test closing a stream() generator cancels the background run instead of waiting for it"""
+        from agent_events import iterate_in_thread
+
+        finished = []
+
+        async def slow_stream():
+            yield "first"
+            await asyncio.sleep(5)
+            finished.append(True)
+            yield "second"
+
+        stream = iterate_in_thread(slow_stream)
+        start = time.perf_counter()
+        assert next(stream) == "first"
+        stream.close()
+
+        assert time.perf_counter() - start < 2 and finished == []
+
+    def test_astream_reports_failure_as_event(self, make_agent):
+        """Test a failing run ends with an error event that encodes as SSE"""
+        async def collect():
+            return [event async for event in self.build(make_agent, fail=True).astream("Hi")]
+
+        events = asyncio.run(collect())
+        assert events[-1].type == "error" and "model unavailable" in events[-1].message
+        frame = events[-1].to_sse()
+        assert frame.startswith("event: error\ndata: {") and frame.endswith("\n\n")
+        assert json.loads(frame.split("data: ", 1)[1])["message"] == events[-1].message
+
+
+class TestBatchRunner:
+    """Test concurrent batch answering over an agent pool"""
+
+    @staticmethod
+    def make_runner(make_agent, **kwargs):
+        import re
+        from batch_runner import BatchRunner
+
+        def echo(messages):
+            question = re.findall(r"Question: (.*)", messages[-1].content)[-1]
+            if question == "fail":
+                raise RuntimeError("provider error")
+            return f"Thought: easy\nFinal Answer: echo {question}"
+
+        tools = [Tool(name="noop", description="Does nothing", func=lambda query: query)]
+        factory = lambda: make_agent(ScriptedChatModel(respond=echo, delay=0.2,
+                                                       usage={"input_tokens": 100, "output_tokens": 10}), tools)
+        return BatchRunner(agent_factory=factory, **kwargs)
+
+    def test_questions_run_concurrently_with_usage(self, make_agent):
+        """Test the pool overlaps questions and each JSONL line carries latency and tokens"""
+        import io
+
+        runner = self.make_runner(make_agent, pool_size=4, rate_limits={})
+        assert len(runner.agents) == 4  # build the pool before the timed run
+        out = io.StringIO()
+        summary = runner.run(iter(["a", {"id": "q-b", "question": "b"}, "c", "fail"]), out)
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert summary.wall_time < 0.6 and summary.questions == 4 and summary.errors == 1
+        by_index = {record["index"]: record for record in records}
+        assert by_index[0]["answer"] == "echo a" and by_index[0]["total_tokens"] == 110
+        assert by_index[1]["id"] == "q-b" and by_index[1]["latency"] >= 0.2
+        assert by_index[3]["answer"] is None and "provider error" in by_index[3]["error"]
+
+    def test_bad_items_fail_alone(self, make_agent):
+        """Test malformed input lines become error lines and the rest of the batch still runs"""
+        import io
+        from batch_runner import read_questions
+
+        runner = self.make_runner(make_agent, pool_size=2, rate_limits={})
+        lines = io.StringIO('a\n{"id": "no-question"}\n{not json\nb\n')
+        out = io.StringIO()
+        summary = runner.run(read_questions(lines), out)
+
+        by_index = {record["index"]: record for record in map(json.loads, out.getvalue().splitlines())}
+        assert summary.questions == 4 and summary.errors == 2
+        assert by_index[0]["answer"] == "echo a" and by_index[3]["answer"] == "echo b"
+        assert by_index[1]["id"] == "no-question" and "no 'question' field" in by_index[1]["error"]
+        assert "line 3 is not valid JSON" in by_index[2]["error"]
+
+    def test_rate_limiter_is_shared_per_provider(self, make_agent):
+        """Test all pooled agents share one limiter that spaces out LLM requests"""
+        import io
+
+        runner = self.make_runner(make_agent, pool_size=3, rate_limits={"openai": 5.0})
+        limiters = {id(agent.llm.rate_limiter) for agent in runner.agents}
+        assert len(limiters) == 1 and runner.rate_limiter("openai") is not None
+
+        start = time.perf_counter()
+        runner.run(["a", "b", "c"], io.StringIO())
+        # Three requests at 5/s with an empty bucket take at least 0.6s; unlimited they take 0.2s
+        assert time.perf_counter() - start >= 0.5
+
+    def test_routed_agents_are_limited_per_provider(self, make_agent):
+        """Test each provider behind a routed agent gets that provider's shared limiter"""
+        from batch_runner import BatchRunner
+        from llm_router import RoutedChatModel
+
+        tools = [Tool(name="noop", description="Does nothing", func=lambda query: query)]
+        factory = lambda: make_agent(RoutedChatModel(models={"openai": ScriptedChatModel(),
+                                                             "anthropic": ScriptedChatModel()}), tools)
+        runner = BatchRunner(agent_factory=factory, pool_size=2, rate_limits={"openai": 5.0, "anthropic": 2.0})
+
+        for agent in runner.agents:
+            for provider, model in agent.llm.models.items():
+                assert model.rate_limiter is runner.rate_limiter(provider)
+        assert runner.rate_limiter("openai") is not runner.rate_limiter("anthropic")
+
+
+class TestLLMResponseCache:
+    """Test the persistent cache for deterministic LLM calls"""
+
+    @staticmethod
+    def make_model(cache, temperature=0.0):
+        """A model that answers with a call counter, so cache hits are visible"""
+        answers = (f"answer {n}" for n in range(1, 1000))
+        return ScriptedChatModel(respond=lambda messages: next(answers), temperature=temperature, cache=cache)
+
+    def test_repeated_prompt_is_served_from_disk(self, tmp_path):
+        """Test a second process-level cache instance replays the stored answer"""
+        from langchain_core.messages import AIMessage, HumanMessage
+        from llm_cache import LLMResponseCache
+
+        db_path = str(tmp_path / "llm.db")
+        prompt = [HumanMessage(content="hi"), AIMessage(content="hello", id="run-1"), HumanMessage(content="2+2?")]
+        with LLMResponseCache(db_path) as cache:
+            model = self.make_model(cache)
+            assert model.invoke(prompt).content == "answer 1"
+        with LLMResponseCache(db_path) as cache:
+            model = self.make_model(cache)
+            # Message ids differ between runs but do not change the key
+            prompt[1] = AIMessage(content="hello", id="run-2")
+            assert model.invoke(prompt).content == "answer 1"
+            assert model.calls == 0 and cache.stats.hits == 1
+            assert cache.info()["models"] == {"scripted:?": {"hits": 1, "misses": 0}}
+
+    def test_sampled_calls_are_not_cached(self, tmp_path):
+        """Test calls with a non-zero temperature always reach the model"""
+        from llm_cache import LLMResponseCache
+
+        with LLMResponseCache(str(tmp_path / "llm.db")) as cache:
+            model = self.make_model(cache, temperature=0.7)
+            assert model.invoke("hi").content == "answer 1"
+            assert model.invoke("hi").content == "answer 2"
+            assert cache.skipped == 2 and cache.info()["entries"] == 0
+
+    def test_eviction_keeps_limits(self, tmp_path):
+        """Test least recently used responses are evicted in a batch past max_entries"""
+        from llm_cache import LLMResponseCache
+
+        with LLMResponseCache(str(tmp_path / "llm.db"), max_entries=10) as cache:
+            model = self.make_model(cache)
+            for prompt in ["p0", "p1", "p2", "p3", "p4", "p5", "p6", "p7", "p8", "p9", "p0", "p10"]:
+                model.invoke(prompt)
+            # Going over the limit evicts down to the low-water mark (90%), oldest first
+            assert cache.info()["entries"] == 9 and cache.stats.evictions == 2
+            model.invoke("p0")
+            assert model.calls == 11  # "p0" was recently used and survived
+            model.invoke("p1")
+            assert model.calls == 12  # "p1" was evicted
+
+    def test_agent_installs_cache(self, openai_key, tmp_path):
+        """Test llm_cache= makes the agent's LLM deterministic and cached"""
+        from langchain_react_agent import LangChainReactAgent
+
+        agent = LangChainReactAgent(verbose=False, llm_cache=str(tmp_path / "llm.db"))
+        assert agent.llm.temperature == 0 and agent.llm.cache is agent.llm_cache
+        assert LangChainReactAgent(verbose=False).llm.cache is None
+
+    def test_agent_runs_hit_cache_with_streaming_model(self, openai_key, tmp_path, monkeypatch):
+        """Test a second agent run on the same cache makes no provider calls, even for a streaming model"""
+        from langchain_react_agent import LangChainReactAgent
+
+        models = []
+
+        def initialize_llm(self, *args, **kwargs):
+            models.append(ScriptedChatModel(responses=["Thought: easy\nFinal Answer: 4"], disable_streaming=False))
+            return models[-1]
+
+        monkeypatch.setattr(LangChainReactAgent, "_initialize_llm", initialize_llm)
+        tool = Tool(name="lookup", description="lookup", func=lambda query: query)
+        answers = []
+        for _ in range(2):
+            agent = LangChainReactAgent(verbose=False, tool_cache=None, llm_cache=str(tmp_path / "llm.db"))
+            agent.add_tools([tool])
+            answers.append(agent.run("What is 2 + 2?"))
+
+        assert answers == ["4", "4"]
+        assert [model.calls for model in models] == [1, 0]
+        assert agent.llm_cache.stats.hits == 1
+
+
+class TestStepBudget:
+    """Test the budget controller stops the ReAct loop and reports why"""
+
+    @staticmethod
+    def build(make_agent, budget, tool_name="lookup", vary_input=False, tool_delay=0.0):
+        steps = iter(range(1, 1000))
+
+        def never_finish(messages):
+            """Answers only when the controller asks it to"""
+            if "You must stop using tools now" in messages[-1].content:
+                return "Forced answer"
+            query = f"item {next(steps)}" if vary_input else "same item"
+            return f"Thought: let me check\nAction: {tool_name}\nAction Input: {query}"
+
+        def lookup(query):
+            time.sleep(tool_delay)
+            return f"Result: {query}"
+
+        llm = ScriptedChatModel(respond=never_finish, usage={"input_tokens": 90, "output_tokens": 10})
+        return make_agent(llm, [Tool(name=tool_name, description="Look things up", func=lookup)], budget=budget)
+
+    @pytest.mark.parametrize("budget_kwargs, agent_kwargs, reason, iterations, answer", [
+        ({"max_repeats": 2}, {}, "repeated_action", 2, "Forced answer"),
+        ({"max_iterations": 3}, {"vary_input": True}, "max_iterations", 3, "Forced answer"),
+        ({"max_tokens": 150}, {"vary_input": True}, "token_budget", 2, "Stopped before reaching a final answer"),
+        ({"max_seconds": 0.1}, {"vary_input": True, "tool_delay": 0.2}, "deadline", 1,
+         "Stopped before reaching a final answer"),
+        ({"confidence_threshold": 0.9}, {"tool_name": "calculator"}, "confident_observation", 1, "Forced answer"),
+    ])
+    def test_stop_reasons(self, make_agent, budget_kwargs, agent_kwargs, reason, iterations, answer):
+        """Test each budget limit ends the run with its reason and a final answer"""
+        from agent_budget import StepBudget
+
+        agent = self.build(make_agent, StepBudget(**budget_kwargs), **agent_kwargs)
+        result = agent.run("What is the item?")
+        report = agent.last_run_report
+
+        assert result.startswith(answer)
+        assert report.stop_reason == reason and report.iterations == iterations and report.forced
+        # Deadline and token stops return the last observation instead of calling the LLM again
+        assert agent.llm.calls == iterations + (answer == "Forced answer")
+        assert report.tokens == 100 * agent.llm.calls
+
+    def test_repeats_are_counted_across_steps(self):
+        """Test loop detection is opt-in and identical calls in one step count once"""
+        from langchain_core.agents import AgentAction
+        from agent_budget import StepBudget, _RunBudget
+
+        assert StepBudget().max_repeats is None
+        read = (AgentAction("file_system", "read:notes.txt", ""), "contents")
+        assert _RunBudget(StepBudget(), None).record([read]) is None
+
+        tracker = _RunBudget(StepBudget(max_repeats=2), None)
+        assert tracker.record([read, read]) is None
+        assert tracker.record([read]) == "repeated_action"
+
+
+class _FakeProviderHandler(BaseHTTPRequestHandler):
+    """Local stand-in for an OpenAI-compatible chat completions endpoint"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        server.requests += 1
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(server.delay)
+        if server.status != 200:
+            payload = {"error": {"message": "provider unavailable", "type": "server_error"}}
+        else:
+            payload = {
+                "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "fake",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": server.reply}}],
+                "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+            }
+        body = json.dumps(payload).encode()
+        self.send_response(server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def fake_providers():
+    """Start OpenAI-compatible fake providers: make(reply, delay=0, status=200) -> ChatOpenAI"""
+    from langchain_openai import ChatOpenAI
+
+    servers = []
+
+    def make(reply, delay=0.0, status=200):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeProviderHandler)
+        server.daemon_threads = True
+        server.requests, server.reply, server.delay, server.status = 0, reply, delay, status
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        servers.append(server)
+        model = ChatOpenAI(model="fake", api_key="test-key", temperature=0, max_retries=0,
+                           base_url=f"http://127.0.0.1:{server.server_address[1]}/v1")
+        return server, model
+
+    yield make
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class TestRoutedChatModel:
+    """Test provider failover and hedged requests against local fake providers"""
+
+    def test_failover_and_cooldown(self, fake_providers):
+        """Test errors fail over to the next provider and repeated errors take a provider out of rotation"""
+        from llm_router import ProviderHealth, RoutedChatModel
+
+        down, primary = fake_providers("primary", status=500)
+        _, backup = fake_providers("backup")
+        router = RoutedChatModel(models={"primary": primary, "backup": backup},
+                                 health=ProviderHealth(failure_threshold=2, cooldown=60))
+
+        for _ in range(3):
+            message = router.invoke("hi")
+            assert message.content == "backup" and message.response_metadata["provider"] == "backup"
+        # The third call went straight to the backup
+        assert down.requests == 2
+        stats = router.stats()
+        assert stats["primary"]["errors"] == 2 and not stats["primary"]["available"]
+        assert message.usage_metadata["total_tokens"] == 7
+
+    def test_all_providers_failing(self, fake_providers):
+        """Test the error names every provider that failed"""
+        from llm_router import RoutedChatModel
+
+        _, first = fake_providers("a", status=500)
+        _, second = fake_providers("b", status=503)
+        with pytest.raises(RuntimeError, match="All LLM providers failed: first: .*; second: "):
+            RoutedChatModel(models={"first": first, "second": second}).invoke("hi")
+
+    @pytest.mark.parametrize("use_async", [False, True])
+    def test_hedge_beats_slow_provider(self, fake_providers, use_async):
+        """Test a slow provider is hedged after the delay and the faster answer wins"""
+        from llm_router import RoutedChatModel
+
+        _, slow = fake_providers("slow", delay=1.0)
+        _, fast = fake_providers("fast", delay=0.05)
+        router = RoutedChatModel(models={"slow": slow, "fast": fast}, hedge=True, hedge_default_delay=0.2)
+
+        start = time.perf_counter()
+        message = asyncio.run(router.ainvoke("hi")) if use_async else router.invoke("hi")
+        elapsed = time.perf_counter() - start
+
+        assert message.content == "fast" and elapsed < 0.8
+        assert router.stats()["fast"]["hedges"] == 1 and router.stats()["fast"]["hedge_wins"] == 1
+
+    def test_agent_routes_across_configured_providers(self, monkeypatch, openai_key):
+        """Test llm_provider="routed" builds a model per provider with an API key"""
+        from langchain_react_agent import LangChainReactAgent
+        from llm_router import RoutedChatModel
+
+        monkeypatch.setenv("DEEPSEEK_API_KEY", "test-key")
+        monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+        agent = LangChainReactAgent(llm_provider="routed", verbose=False)
+
+        assert isinstance(agent.llm, RoutedChatModel)
+        assert list(agent.llm.models) == ["deepseek", "openai"]
+
+    def test_cache_identity_covers_models_and_tools(self, openai_key):
+        """Test routers over different models, or with different tools bound, get different cache keys"""
+        from langchain_openai import ChatOpenAI
+        from llm_router import RoutedChatModel
+
+        def router(model_name):
+            return RoutedChatModel(models={"openai": ChatOpenAI(model=model_name, temperature=0)})
+
+        foo = Tool(name="foo", description="foo", func=lambda query: query)
+        bar = Tool(name="bar", description="bar", func=lambda query: query)
+
+        assert router("gpt-4o")._get_llm_string() != router("gpt-4o-mini")._get_llm_string()
+        assert router("gpt-4o").bind_tools([foo])._get_llm_string() != router("gpt-4o").bind_tools([bar])._get_llm_string()
+        assert router("gpt-4o").bind_tools([foo])._get_llm_string() == router("gpt-4o").bind_tools([foo])._get_llm_string()
+
+
+class TestAgentTracing:
+    """Test the tracing callback records spans and exports them"""
+
+    @staticmethod
+    def build(make_agent):
+        def lookup(query):
+            time.sleep(0.1)
+            return f"{query} is 42"
+
+        llm = ScriptedChatModel(delay=0.05, usage={"input_tokens": 90, "output_tokens": 10}, responses=[
+            "Thought: I should look it up\nAction: lookup\nAction Input: the answer",
+            "Thought: I now know the final answer\nFinal Answer: 42",
+        ])
+        return make_agent(llm, [Tool(name="lookup", description="Look things up", func=lookup)], tracing=True)
+
+    def test_run_records_spans_and_breakdown(self, make_agent):
+        """Test a run is traced with LLM, tool, prompt and parser spans and token counts"""
+        agent = self.build(make_agent)
+        assert agent.run("What is the answer?").strip() == "42"
+        trace = agent.last_trace
+        spans = list(trace.spans.values())
+
+        kinds = {span.kind for span in spans}
+        assert {"llm", "tool", "prompt", "parser", "chain"} <= kinds
+        assert all(span.end_ns is not None for span in spans)
+        tool = next(span for span in spans if span.kind == "tool")
+        assert tool.name == "lookup" and tool.duration >= 0.1 and tool.attributes["tool.output"] == "the answer is 42"
+
+        breakdown = trace.breakdown()
+        assert breakdown["llm"]["calls"] == 2 and breakdown["llm"]["input_tokens"] == 180
+        assert breakdown["llm"]["output_tokens"] == 20 and breakdown["tool"]["calls"] == 1
+        assert breakdown["total"]["seconds"] >= breakdown["llm"]["seconds"] + breakdown["tool"]["seconds"]
+        report = trace.format_report()
+        assert "180 in / 20 out tokens" in report and "lookup" in report
+
+    def test_chrome_and_otel_export(self, make_agent, tmp_path):
+        """Test both export formats are well formed and nest spans properly"""
+        agent = self.build(make_agent)
+        agent.run("What is the answer?")
+        trace = agent.last_trace
+
+        chrome = json.loads(open(trace.export(str(tmp_path / "trace.json")), encoding="utf-8").read())
+        events = chrome["traceEvents"]
+        assert len(events) == len(trace.spans) and all(event["ph"] == "X" for event in events)
+        # Complete events on one thread must not partially overlap
+        for tid in {event["tid"] for event in events}:
+            lane = sorted((e for e in events if e["tid"] == tid), key=lambda e: (e["ts"], -e["dur"]))
+            open_ends = []
+            for event in lane:
+                open_ends = [end for end in open_ends if end > event["ts"]]
+                assert all(event["ts"] + event["dur"] <= end + 1e-3 for end in open_ends)
+                open_ends.append(event["ts"] + event["dur"])
+
+        otel = json.loads(open(trace.export(str(tmp_path / "otel.json"), format="otel"), encoding="utf-8").read())
+        spans = otel["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        ids = {span["spanId"] for span in spans}
+        assert len(spans) == len(trace.spans) and len({span["traceId"] for span in spans}) == 1
+        assert sum("parentSpanId" not in span for span in spans) == 1
+        assert all(span.get("parentSpanId", next(iter(ids))) in ids for span in spans)
+        llm = next(span for span in spans if span["kind"] == 3 and span["name"] == "ScriptedChatModel")
+        attributes = {item["key"]: item["value"] for item in llm["attributes"]}
+        assert attributes["gen_ai.usage.input_tokens"] == {"intValue": "90"}
+        with pytest.raises(ValueError):
+            trace.export(str(tmp_path / "x.json"), format="zipkin")
 
 
 # Integration tests (require actual API keys)
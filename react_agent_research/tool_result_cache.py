@@ -0,0 +1,430 @@
+#!/usr/bin/env -S uv run --script
+#
+# /// script
+# requires-python = ">=3.9"
+# dependencies = [
+#   "langchain-core>=0.2.0",
+# ]
+# ///
+
+"""
+Tool Result Cache
+A TTL/LRU cache for results of pure tools, keyed by tool name and
+canonicalised JSON arguments, with hit-rate reporting. Identical calls that
+arrive while the first one is still running wait for its result instead of
+calling the tool again.
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field, fields
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+_MISSING = object()
+# Default for ``ttl`` arguments: use the cache's default_ttl (None means never expire)
+_DEFAULT_TTL = object()
+
+
+def canonical_key(tool_name: str, arguments: Any) -> str:
+    """Build a cache key that ignores argument order and whitespace in the JSON"""
+    try:
+        args = json.dumps(arguments, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    except (TypeError, ValueError):
+        args = repr(arguments)
+    return f"{tool_name}:{args}"
+
+
+def is_pure_tool(tool_info: Any) -> bool:
+    """Whether a tool opted in to result caching
+
+    Accepts an MCP tool dict (``annotations`` / ``inputSchema``) or a LangChain
+    tool whose ``metadata`` carries the MCP annotations. A tool is pure when it
+    sets ``pure: true`` explicitly (annotations, metadata or ``x-pure`` in its
+    input schema), or is annotated read-only, idempotent and closed-world.
+    """
+    if isinstance(tool_info, dict):
+        hints = dict(tool_info.get("annotations") or {})
+        hints.update(tool_info.get("_meta") or {})
+        schema = tool_info.get("inputSchema") or {}
+    else:
+        hints = dict(getattr(tool_info, "metadata", None) or {})
+        schema = {}
+
+    if "pure" in hints:
+        return bool(hints["pure"])
+    if "x-pure" in schema:
+        return bool(schema["x-pure"])
+    return (
+        hints.get("readOnlyHint") is True
+        and hints.get("idempotentHint") is True
+        and hints.get("openWorldHint") is False
+    )
+
+
+@dataclass
+class CacheStats:
+    """Counters for a ToolResultCache"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    coalesced: int = 0
+
+    @property
+    def lookups(self) -> int:
+        return self.hits + self.misses
+
+    @property
+    def calls(self) -> int:
+        """Tool invocations actually made: misses not served by an in-flight call"""
+        return self.misses - self.coalesced
+
+    def since(self, earlier: "CacheStats") -> "CacheStats":
+        """Counters accumulated after the ``earlier`` snapshot"""
+        return CacheStats(**{f.name: getattr(self, f.name) - getattr(earlier, f.name) for f in fields(self)})
+
+    def snapshot(self) -> "CacheStats":
+        return CacheStats(**{f.name: getattr(self, f.name) for f in fields(self)})
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "coalesced": self.coalesced,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class ToolResultCache:
+    """Thread-safe LRU cache with optional per-entry TTL"""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._per_tool: Dict[str, CacheStats] = {}
+        self._lock = threading.Lock()
+        # Calls currently running, so identical concurrent calls share one result
+        self._inflight: Dict[str, Future] = {}
+        self._ainflight: Dict[Tuple[int, str], "asyncio.Future"] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _tool_stats(self, key: str) -> CacheStats:
+        tool_name = key.split(":", 1)[0]
+        return self._per_tool.setdefault(tool_name, CacheStats())
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value for ``key`` or ``default`` (counts as a lookup)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is not None and time.monotonic() >= expires_at:
+                    del self._entries[key]
+                    self.stats.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    self._tool_stats(key).hits += 1
+                    return value
+            self.stats.misses += 1
+            self._tool_stats(key).misses += 1
+            return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = _DEFAULT_TTL):
+        """Store ``value``; ``ttl`` overrides the cache default (None = no expiry)"""
+        ttl = self.default_ttl if ttl is _DEFAULT_TTL else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self.stats.evictions += 1
+                self._tool_stats(evicted_key).evictions += 1
+
+    def invalidate(self, tool_name: Optional[str] = None):
+        """Drop all entries, or only those for ``tool_name``"""
+        with self._lock:
+            if tool_name is None:
+                self._entries.clear()
+                return
+            prefix = f"{tool_name}:"
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def _coalesced(self, key: str):
+        with self._lock:
+            self.stats.coalesced += 1
+            self._tool_stats(key).coalesced += 1
+
+    def get_or_call(self, tool_name: str, arguments: Any, call: Callable[[], Any],
+                    ttl: Optional[float] = _DEFAULT_TTL,
+                    should_cache: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Return a cached result or compute it with ``call()`` and store it
+
+        If the same call is already running in another thread, wait for its
+        result instead. ``should_cache(value)`` returning False (e.g. for an
+        error message) keeps the value out of the cache. ``ttl`` defaults to
+        the cache's ``default_ttl``; pass None to store the result without expiry.
+        """
+        key = canonical_key(tool_name, arguments)
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                pending = self._inflight[key] = Future()
+                leader = True
+            else:
+                leader = False
+        if not leader:
+            self._coalesced(key)
+            return pending.result()
+
+        try:
+            value = call()
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        else:
+            if should_cache is None or should_cache(value):
+                self.set(key, value, ttl)
+            pending.set_result(value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_call(self, tool_name: str, arguments: Any, call: Callable[[], Awaitable[Any]],
+                           ttl: Optional[float] = _DEFAULT_TTL,
+                           should_cache: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Async variant of get_or_call(); coalesces identical calls on the same event loop"""
+        key = canonical_key(tool_name, arguments)
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        loop = asyncio.get_running_loop()
+        inflight_key = (id(loop), key)
+        pending = self._ainflight.get(inflight_key)
+        if pending is not None:
+            self._coalesced(key)
+            # shield: a cancelled waiter must not cancel the shared call
+            return await asyncio.shield(pending)
+
+        pending = self._ainflight[inflight_key] = loop.create_future()
+        try:
+            value = await call()
+        except asyncio.CancelledError:
+            pending.cancel()
+            raise
+        except BaseException as e:
+            pending.set_exception(e)
+            # Retrieved here so an exception nobody else awaited is not logged
+            pending.exception()
+            raise
+        else:
+            if should_cache is None or should_cache(value):
+                self.set(key, value, ttl)
+            pending.set_result(value)
+            return value
+        finally:
+            self._ainflight.pop(inflight_key, None)
+
+    def report(self) -> Dict[str, Any]:
+        """Overall and per-tool hit statistics"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                **self.stats.as_dict(),
+                "tools": {name: stats.as_dict() for name, stats in self._per_tool.items()},
+            }
+
+    def format_report(self) -> str:
+        """One-line summary suitable for console output"""
+        s = self.stats
+        return (f"Tool cache: {s.hits}/{s.lookups} hits ({s.hit_rate:.0%}), {s.coalesced} coalesced, "
+                f"{len(self._entries)} entries, {s.evictions} evictions, {s.expirations} expired")
+
+
+def cache_tool(tool: Any, cache: ToolResultCache, ttl: Optional[float] = _DEFAULT_TTL,
+               should_cache: Optional[Callable[[Any], bool]] = None) -> Any:
+    """Return a copy of a LangChain tool whose results are served from ``cache``"""
+    from langchain_core.tools import StructuredTool, Tool
+
+    name = tool.name
+    func = getattr(tool, "func", None)
+    coroutine = getattr(tool, "coroutine", None)
+
+    if isinstance(tool, Tool):
+        # Single string input
+        def cached_func(tool_input: str) -> Any:
+            return cache.get_or_call(name, tool_input, lambda: func(tool_input), ttl, should_cache)
+
+        async def cached_coroutine(tool_input: str) -> Any:
+            return await cache.aget_or_call(name, tool_input, lambda: coroutine(tool_input), ttl,
+                                             should_cache)
+
+        return Tool(
+            name=name,
+            description=tool.description,
+            func=cached_func if func else None,
+            coroutine=cached_coroutine if coroutine else None,
+            metadata=tool.metadata,
+        )
+
+    def cached_structured_func(**kwargs) -> Any:
+        return cache.get_or_call(name, kwargs, lambda: func(**kwargs), ttl, should_cache)
+
+    async def cached_structured_coroutine(**kwargs) -> Any:
+        return await cache.aget_or_call(name, kwargs, lambda: coroutine(**kwargs), ttl, should_cache)
+
+    return StructuredTool(
+        name=name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        func=cached_structured_func if func else None,
+        coroutine=cached_structured_coroutine if coroutine else None,
+        response_format=getattr(tool, "response_format", "content"),
+        metadata=tool.metadata,
+    )
+
+
+def cache_pure_tools(tools: List[Any], cache: ToolResultCache, ttl: Optional[float] = _DEFAULT_TTL) -> List[Any]:
+    """Wrap every tool annotated as pure with the cache; others pass through unchanged"""
+    return [cache_tool(tool, cache, ttl) if is_pure_tool(tool) else tool for tool in tools]
+
+
+@dataclass
+class RunScope:
+    """The cache used by one agent run and, once the run ends, its counters"""
+    cache: ToolResultCache
+    start: CacheStats = field(default_factory=CacheStats)
+    stats: CacheStats = field(default_factory=CacheStats)
+
+    def format(self) -> str:
+        s = self.stats
+        return (f"Tool cache: {s.hits} hits, {s.coalesced} coalesced, {s.calls} tool calls "
+                f"({s.hit_rate:.0%} hit rate)")
+
+
+class ToolCacheMiddleware:
+    """Memoizes agent tool calls, per run or across runs, with per-tool TTLs
+
+    ``ttls`` maps tool names to a TTL in seconds (``None`` = never expires);
+    tools annotated as pure (see is_pure_tool) are cached with no expiry too.
+    ``read_only`` maps a tool with mixed operations to a predicate on its
+    input: matching calls are cached, any other call to it is treated as a
+    write and clears the cache, since it can change what other tools
+    observe. With ``scope="run"`` every ``run_scope()`` gets a fresh cache;
+    with ``scope="agent"`` they all share ``cache``. Outside a run scope the
+    wrapped tools call straight through.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, Optional[float]]] = None, scope: str = "run",
+                 cache: Optional[ToolResultCache] = None,
+                 read_only: Optional[Dict[str, Callable[[Any], bool]]] = None,
+                 should_cache: Optional[Callable[[Any], bool]] = None, max_entries: int = 1024):
+        if scope not in ("run", "agent"):
+            raise ValueError(f"scope must be 'run' or 'agent', not {scope!r}")
+        self.ttls = dict(ttls or {})
+        self.scope = scope
+        self.read_only = dict(read_only or {})
+        self.should_cache = should_cache
+        self.max_entries = max_entries
+        self.cache = cache if cache is not None else ToolResultCache(max_entries=max_entries)
+        self._current: contextvars.ContextVar[Optional[ToolResultCache]] = contextvars.ContextVar(
+            "tool_cache", default=None)
+
+    @contextlib.contextmanager
+    def run_scope(self):
+        """Activate caching for the calls made inside the ``with`` block"""
+        cache = self.cache if self.scope == "agent" else ToolResultCache(max_entries=self.max_entries)
+        scope = RunScope(cache, start=cache.stats.snapshot())
+        token = self._current.set(cache)
+        try:
+            yield scope
+        finally:
+            self._current.reset(token)
+            scope.stats = cache.stats.since(scope.start)
+
+    def get_or_call(self, tool_name: str, arguments: Any, call: Callable[[], Any],
+                    ttl: Optional[float] = _DEFAULT_TTL, should_cache: Optional[Callable[[Any], bool]] = None) -> Any:
+        cache = self._current.get()
+        if cache is None:
+            return call()
+        return cache.get_or_call(tool_name, arguments, call, ttl, should_cache)
+
+    async def aget_or_call(self, tool_name: str, arguments: Any, call: Callable[[], Awaitable[Any]],
+                           ttl: Optional[float] = _DEFAULT_TTL,
+                           should_cache: Optional[Callable[[Any], bool]] = None) -> Any:
+        cache = self._current.get()
+        if cache is None:
+            return await call()
+        return await cache.aget_or_call(tool_name, arguments, call, ttl, should_cache)
+
+    def invalidate(self, tool_name: Optional[str] = None):
+        cache = self._current.get()
+        if cache is not None:
+            cache.invalidate(tool_name)
+
+    def wrap(self, tools: List[Any]) -> List[Any]:
+        """Return the tools with caching applied where configured; others are returned unchanged"""
+        wrapped = []
+        for tool in tools:
+            if tool.name in self.read_only:
+                wrapped.append(self._wrap_mixed(tool))
+            elif tool.name in self.ttls or is_pure_tool(tool):
+                wrapped.append(cache_tool(tool, self, self.ttls.get(tool.name), self.should_cache))
+            else:
+                wrapped.append(tool)
+        return wrapped
+
+    def _wrap_mixed(self, tool: Any) -> Any:
+        """Cache the read-only calls of a tool that also writes; writes clear the cache"""
+        from langchain_core.tools import Tool
+
+        is_read = self.read_only[tool.name]
+        cached = cache_tool(tool, self, self.ttls.get(tool.name), self.should_cache)
+
+        def func(tool_input: str) -> Any:
+            if is_read(tool_input):
+                return cached.func(tool_input)
+            try:
+                return tool.func(tool_input)
+            finally:
+                self.invalidate()
+
+        async def coroutine(tool_input: str) -> Any:
+            if is_read(tool_input):
+                return await cached.coroutine(tool_input)
+            try:
+                return await tool.coroutine(tool_input)
+            finally:
+                self.invalidate()
+
+        return Tool(
+            name=tool.name,
+            description=tool.description,
+            func=func if tool.func else None,
+            coroutine=coroutine if tool.coroutine else None,
+            metadata=tool.metadata,
+        )